@@ -3,11 +3,13 @@ import smartpy as sp
 @sp.module
 def main():
     # Types de donnees pour le token par actions
+    # Ordre en attente: le cote est donne par la big_map qui le contient. La
+    # quantite restante reste dans le meme record: une cle de big_map de plus
+    # par ordre coute plus de stockage paye que la reecriture du record
     t_order: type = sp.record(
         trader=sp.address,
-        order_type=sp.string,  # "buy" ou "sell"
-        price=sp.mutez,        # Prix en mutez
-        quantity=sp.nat,       # Quantite de tokens
+        tick=sp.nat,           # Prix en ticks (multiple de tick_size)
+        quantity=sp.nat,       # Quantite restante
         timestamp=sp.timestamp
     )
     
@@ -19,80 +21,624 @@ def main():
         timestamp=sp.timestamp
     )
 
+    # Niveau de prix du carnet: file FIFO d'ordres + chainage vers les niveaux voisins
+    t_level: type = sp.record(
+        head=sp.nat,                # Premier ordre de la file (priorite temporelle)
+        tail=sp.nat,                # Dernier ordre de la file
+        quantity=sp.nat,            # Quantite totale en attente au niveau
+        better=sp.option[sp.nat],   # Tick voisin plus proche du meilleur prix
+        worse=sp.option[sp.nat]     # Tick voisin plus eloigne du meilleur prix
+    )
+
+    # Bougie OHLCV d'une periode de candle_seconds
+    t_candle: type = sp.record(
+        open=sp.mutez,
+        high=sp.mutez,
+        low=sp.mutez,
+        close=sp.mutez,
+        volume=sp.nat,
+        trades=sp.nat
+    )
+
+    # Niveau de prix agrege renvoye par les vues de profondeur
+    t_depth_level: type = sp.record(
+        price=sp.mutez,
+        quantity=sp.nat
+    )
+
+    # Case du volume glissant: volume echange pendant une periode donnee
+    t_volume_bucket: type = sp.record(
+        period=sp.nat,   # Numero de la periode (secondes depuis epoch / duree)
+        volume=sp.nat
+    )
+
+    # Chainage d'un ordre dans la file de son niveau
+    t_order_link: type = sp.record(
+        prev=sp.option[sp.nat],
+        next=sp.option[sp.nat]
+    )
+
+    # Operations rares, executees par une lambda de la big_map lambdas: leur code
+    # n'est lu que lorsqu'elles sont appelees, pas par les appels chauds
+    t_lazy_action: type = sp.variant(
+        mint=sp.record(to_address=sp.address, amount=sp.nat),
+        burn=sp.nat,
+        set_trade_retention=sp.nat,
+        prune_trades=sp.list[sp.nat],
+        cancel=sp.list[sp.record(order_id=sp.nat, order_type=sp.string)]
+    )
+
+    # Ordre vise par une annulation, lu dans les deux cotes du carnet
+    t_lazy_order: type = sp.record(
+        buy=sp.option[t_order],
+        sell=sp.option[t_order],
+        owned=sp.bool               # Place par l'appelant
+    )
+
+    # Ordre annule, a retirer du carnet par l'entrypoint (remove_from_book)
+    t_removed_order: type = sp.record(
+        is_buy=sp.bool,
+        order_id=sp.nat,
+        tick=sp.nat,
+        quantity=sp.nat
+    )
+
+    # Les lambdas ne recoivent pas les big_maps du storage: run_lambda leur passe
+    # les valeurs qu'elles lisent (droits de l'appelant compris) et applique les
+    # ecritures qu'elles renvoient.
+    t_lazy_call: type = sp.record(
+        action=t_lazy_action,
+        is_admin=sp.bool,
+        total_supply=sp.nat,
+        tick_size=sp.mutez,
+        trade_counter=sp.nat,
+        trade_retention=sp.nat,
+        sender_balance=sp.nat,
+        orders=sp.map[sp.nat, t_lazy_order]     # Ordres nommes par une annulation
+    )
+    t_lazy_result: type = sp.record(
+        total_supply=sp.nat,
+        trade_retention=sp.nat,
+        sender_balance=sp.int,                  # Variation du solde disponible de l'appelant
+        sender_reserved=sp.int,                 # Variation de ses tokens bloques
+        minted=sp.nat,                          # Credite au destinataire du mint
+        removed=sp.list[t_removed_order],
+        pruned=sp.list[sp.nat],                 # Trades a supprimer
+        refund=sp.mutez                         # Tez a rembourser a l'appelant
+    )
+
+    def mint_lambda(call):
+        """Mint de nouveaux tokens (admin seulement)"""
+        params = sp.unpack(call, t_lazy_call).unwrap_some()
+        args = params.action.unwrap.mint()
+        assert params.is_admin, "Seul l'admin peut mint"
+        assert sp.amount == sp.tez(0), "Pas de transfert autorise"
+
+        return sp.pack(sp.cast(sp.record(
+            total_supply=params.total_supply + args.amount, trade_retention=params.trade_retention,
+            sender_balance=0, sender_reserved=0, minted=args.amount,
+            removed=[], pruned=[], refund=sp.mutez(0)
+        ), t_lazy_result))
+
+    def burn_lambda(call):
+        """Burn des tokens (hors tokens bloques par des ordres de vente)"""
+        params = sp.unpack(call, t_lazy_call).unwrap_some()
+        amount = params.action.unwrap.burn()
+        assert sp.amount == sp.tez(0), "Pas de transfert autorise"
+        assert params.sender_balance >= amount, "Solde insuffisant"
+
+        return sp.pack(sp.cast(sp.record(
+            total_supply=sp.as_nat(params.total_supply - amount), trade_retention=params.trade_retention,
+            sender_balance=-sp.to_int(amount), sender_reserved=0, minted=0,
+            removed=[], pruned=[], refund=sp.mutez(0)
+        ), t_lazy_result))
+
+    def set_trade_retention_lambda(call):
+        """Nombre de trades bruts conserves (admin seulement)"""
+        params = sp.unpack(call, t_lazy_call).unwrap_some()
+        trade_retention = params.action.unwrap.set_trade_retention()
+        assert params.is_admin, "Seul l'admin peut configurer"
+
+        return sp.pack(sp.cast(sp.record(
+            total_supply=params.total_supply, trade_retention=trade_retention,
+            sender_balance=0, sender_reserved=0, minted=0, removed=[], pruned=[], refund=sp.mutez(0)
+        ), t_lazy_result))
+
+    def prune_trades_lambda(call):
+        """Supprime des trades sortis de la fenetre de conservation"""
+        params = sp.unpack(call, t_lazy_call).unwrap_some()
+        pruned = params.action.unwrap.prune_trades()
+        for trade_id in pruned:
+            assert trade_id + params.trade_retention < params.trade_counter, "Trade encore conserve"
+
+        return sp.pack(sp.cast(sp.record(
+            total_supply=params.total_supply, trade_retention=params.trade_retention,
+            sender_balance=0, sender_reserved=0, minted=0, removed=[], pruned=pruned, refund=sp.mutez(0)
+        ), t_lazy_result))
+
+    def cancel_lambda(call):
+        """Retire des ordres de l'appelant; renvoie le remboursement et les ordres a retirer du carnet"""
+        params = sp.unpack(call, t_lazy_call).unwrap_some()
+        orders = params.orders
+        refund_amount = sp.mutez(0)
+        unlocked = 0
+        removed = []
+        for order in params.action.unwrap.cancel():
+            order_id = order.order_id
+            if order.order_type == "buy":
+                assert orders[order_id].buy.is_some(), "Ordre introuvable"
+                entry = orders[order_id].buy.unwrap_some()
+                assert orders[order_id].owned, "Pas autorise"
+
+                # Rembourser l'acheteur
+                refund_amount += sp.split_tokens(params.tick_size, entry.tick * entry.quantity, 1)
+                orders[order_id].buy = None
+                removed.push(sp.record(is_buy=True, order_id=order_id, tick=entry.tick, quantity=entry.quantity))
+
+            else:  # sell
+                assert orders[order_id].sell.is_some(), "Ordre introuvable"
+                entry = orders[order_id].sell.unwrap_some()
+                assert orders[order_id].owned, "Pas autorise"
+
+                # Debloquer les tokens du vendeur
+                unlocked += entry.quantity
+                orders[order_id].sell = None
+                removed.push(sp.record(is_buy=False, order_id=order_id, tick=entry.tick, quantity=entry.quantity))
+
+        return sp.pack(sp.cast(sp.record(
+            total_supply=params.total_supply, trade_retention=params.trade_retention,
+            sender_balance=sp.to_int(unlocked), sender_reserved=-sp.to_int(unlocked), minted=0,
+            removed=removed, pruned=[], refund=refund_amount
+        ), t_lazy_result))
+
     class ActionChainToken(sp.Contract):
         def __init__(self, admin, initial_supply, token_name, token_symbol):
             # Initialisation du storage
             self.data = sp.record(
                 # Token standard
-                balances=sp.big_map({admin: initial_supply}),
+                balances=sp.big_map({admin: initial_supply}),  # Soldes disponibles
+                reserved=sp.big_map(),  # Tokens bloques par les ordres de vente
                 total_supply=initial_supply,
                 admin=admin,
                 
                 # Systeme d'ordres
-                buy_orders=sp.big_map(),
-                sell_orders=sp.big_map(),
+                buy_orders=sp.big_map(),        # order_id -> t_order
+                sell_orders=sp.big_map(),       # order_id -> t_order
                 order_counter=0,
                 
-                # Historique des trades
+                # Carnet d'ordres indexe par tick de prix
+                levels=sp.big_map(),        # (est_achat, tick) -> t_level
+                order_links=sp.big_map(),   # order_id -> t_order_link
+                best_bid=None,              # Tick du meilleur achat
+                best_ask=None,              # Tick de la meilleure vente
+                tick_size=sp.mutez(10000),  # 0.01 tez: 2 decimales maximum
+                
+                # Historique des trades: seuls les trade_retention derniers sont conserves
                 trades=sp.big_map(),
                 trade_counter=0,
+                trade_retention=1000,       # 0: aucun trade conserve
+                
+                # Bougies OHLCV par periode (secondes depuis epoch / candle_seconds)
+                candles=sp.big_map(),       # periode -> t_candle
+                candle_seconds=3600,
                 
                 # Statistiques
                 last_price=sp.mutez(1000000),  # Prix initial 1.00 tez
-                volume_24h=0,
-                last_volume_reset=sp.now,
+                # Volume glissant 24h: anneau de 24 cases d'une heure
+                volume_buckets={},          # case -> t_volume_bucket
+                volume_bucket_seconds=3600,
+                volume_bucket_count=24,
                 
                 # Configuration
                 token_name=token_name,
                 token_symbol=token_symbol,
-                decimals=6
+                decimals=6,
+
+                # Code packe des operations rares, lu seulement quand elles sont appelees
+                lambdas=sp.big_map({
+                    "mint": sp.pack(mint_lambda),
+                    "burn": sp.pack(burn_lambda),
+                    "set_trade_retention": sp.pack(set_trade_retention_lambda),
+                    "prune_trades": sp.pack(prune_trades_lambda),
+                    "cancel": sp.pack(cancel_lambda)
+                })
             )
+            sp.cast(self.data.reserved, sp.big_map[sp.address, sp.nat])
+            sp.cast(self.data.buy_orders, sp.big_map[sp.nat, t_order])
+            sp.cast(self.data.sell_orders, sp.big_map[sp.nat, t_order])
+            sp.cast(self.data.levels, sp.big_map[sp.pair[sp.bool, sp.nat], t_level])
+            sp.cast(self.data.order_links, sp.big_map[sp.nat, t_order_link])
+            sp.cast(self.data.best_bid, sp.option[sp.nat])
+            sp.cast(self.data.best_ask, sp.option[sp.nat])
+            sp.cast(self.data.volume_buckets, sp.map[sp.nat, t_volume_bucket])
+            sp.cast(self.data.trades, sp.big_map[sp.nat, t_trade])
+            sp.cast(self.data.candles, sp.big_map[sp.nat, t_candle])
+            sp.cast(self.data.lambdas, sp.big_map[sp.string, sp.bytes])
 
-        @sp.entrypoint
-        def place_buy_order(self, price, quantity):
-            """Place un ordre d'achat"""
-            assert sp.amount == sp.split_tokens(price, quantity, 1), "Montant incorrect"
-            assert quantity > 0, "Quantite doit etre positive"
-            assert price > sp.mutez(0), "Prix doit etre positif"
+        # Les fonctions privees recoivent un seul record de parametres. Une fonction
+        # privee ne peut pas en appeler une autre directement: celles dont elle a
+        # besoin lui sont passees dans ce record (remove_from_book, settle_trade...)
+        @sp.private(with_storage="read-write")
+        def add_to_book(self, params):
+            """Ajoute un ordre en fin de file de son niveau de prix"""
+            is_buy = params.is_buy
+            order_id = params.order_id
+            tick = params.tick
+            quantity = params.quantity
+            hint = params.hint
+            key = (is_buy, tick)
+            if self.data.levels.contains(key):
+                level = self.data.levels[key]
+                self.data.order_links[level.tail].next = sp.Some(order_id)
+                self.data.order_links[order_id] = sp.record(prev=sp.Some(level.tail), next=None)
+                level.tail = order_id
+                level.quantity += quantity
+                self.data.levels[key] = level
+            else:
+                # Nouveau niveau: l'appelant donne le tick d'un niveau voisin existant
+                # (hint), ou None si le nouveau niveau devient le meilleur prix. Le
+                # voisinage est verifie en O(1): un indice faux fait echouer l'ordre
+                better = sp.cast(None, sp.option[sp.nat])
+                worse = self.data.best_ask
+                if is_buy:
+                    worse = self.data.best_bid
+                if hint.is_some():
+                    neighbour = hint.unwrap_some()
+                    assert self.data.levels.contains((is_buy, neighbour)), "Indice de niveau invalide"
+                    neighbour_level = self.data.levels[(is_buy, neighbour)]
+                    if (is_buy and neighbour > tick) or (not is_buy and neighbour < tick):
+                        better = hint
+                        worse = neighbour_level.worse
+                    else:
+                        better = neighbour_level.better
+                        worse = hint
+                if better.is_some():
+                    if is_buy:
+                        assert better.unwrap_some() > tick, "Indice de niveau invalide"
+                    else:
+                        assert better.unwrap_some() < tick, "Indice de niveau invalide"
+                if worse.is_some():
+                    if is_buy:
+                        assert worse.unwrap_some() < tick, "Indice de niveau invalide"
+                    else:
+                        assert worse.unwrap_some() > tick, "Indice de niveau invalide"
+                
+                self.data.levels[key] = sp.record(
+                    head=order_id,
+                    tail=order_id,
+                    quantity=quantity,
+                    better=better,
+                    worse=worse
+                )
+                self.data.order_links[order_id] = sp.record(prev=None, next=None)
+                
+                if better.is_some():
+                    self.data.levels[(is_buy, better.unwrap_some())].worse = sp.Some(tick)
+                else:
+                    if is_buy:
+                        self.data.best_bid = sp.Some(tick)
+                    else:
+                        self.data.best_ask = sp.Some(tick)
+                if worse.is_some():
+                    self.data.levels[(is_buy, worse.unwrap_some())].better = sp.Some(tick)
+
+        @sp.private(with_storage="read-write")
+        def remove_from_book(self, params):
+            """Retire un ordre de sa file, et le niveau s'il devient vide"""
+            is_buy = params.is_buy
+            order_id = params.order_id
+            tick = params.tick
+            quantity = params.quantity
+            key = (is_buy, tick)
+            link = self.data.order_links[order_id]
+            del self.data.order_links[order_id]
+            
+            if link.prev.is_some():
+                self.data.order_links[link.prev.unwrap_some()].next = link.next
+            if link.next.is_some():
+                self.data.order_links[link.next.unwrap_some()].prev = link.prev
             
-            # Creer l'ordre
-            order = sp.record(
-                trader=sp.sender,
-                order_type="buy",
+            level = self.data.levels[key]
+            if link.prev.is_none() and link.next.is_none():
+                # Dernier ordre du niveau: on retire le niveau de la chaine
+                del self.data.levels[key]
+                if level.better.is_some():
+                    self.data.levels[(is_buy, level.better.unwrap_some())].worse = level.worse
+                else:
+                    if is_buy:
+                        self.data.best_bid = level.worse
+                    else:
+                        self.data.best_ask = level.worse
+                if level.worse.is_some():
+                    self.data.levels[(is_buy, level.worse.unwrap_some())].better = level.better
+            else:
+                if link.prev.is_none():
+                    level.head = link.next.unwrap_some()
+                if link.next.is_none():
+                    level.tail = link.prev.unwrap_some()
+                level.quantity = sp.as_nat(level.quantity - quantity)
+                self.data.levels[key] = level
+
+        @sp.private(with_storage="read-write")
+        def settle_trade(self, params):
+            """Echange les tokens, enregistre le trade et met a jour les statistiques"""
+            buyer = params.buyer
+            seller = params.seller
+            price = params.price
+            quantity = params.quantity
+            # Les tokens vendus sont pris sur le solde bloque a la mise en vente
+            new_seller_reserved = sp.as_nat(self.data.reserved[seller] - quantity)
+            if new_seller_reserved == 0:
+                del self.data.reserved[seller]
+            else:
+                self.data.reserved[seller] = new_seller_reserved
+            
+            buyer_balance = self.data.balances.get(buyer, default=0)
+            self.data.balances[buyer] = buyer_balance + quantity
+            
+            # Enregistrer le trade
+            trade = sp.record(
+                buyer=buyer,
+                seller=seller,
                 price=price,
                 quantity=quantity,
                 timestamp=sp.now
             )
+            if self.data.trade_retention > 0:
+                self.data.trades[self.data.trade_counter] = trade
+                # Le plus ancien trade conserve sort de la fenetre
+                if self.data.trade_counter >= self.data.trade_retention:
+                    del self.data.trades[sp.as_nat(self.data.trade_counter - self.data.trade_retention)]
+            self.data.trade_counter += 1
             
-            self.data.buy_orders[self.data.order_counter] = order
-            self.data.order_counter += 1
+            # Bougie de la periode courante
+            candle_period = sp.as_nat(sp.now - sp.timestamp(0)) / self.data.candle_seconds
+            if self.data.candles.contains(candle_period):
+                candle = self.data.candles[candle_period]
+                if price > candle.high:
+                    candle.high = price
+                if price < candle.low:
+                    candle.low = price
+                candle.close = price
+                candle.volume += quantity
+                candle.trades += 1
+                self.data.candles[candle_period] = candle
+            else:
+                self.data.candles[candle_period] = sp.record(
+                    open=price,
+                    high=price,
+                    low=price,
+                    close=price,
+                    volume=quantity,
+                    trades=1
+                )
+            
+            # Mettre a jour les statistiques
+            self.data.last_price = price
+            
+            # Volume glissant: la case de la periode courante est remise a zero
+            # si elle contient encore une periode ecoulee
+            period = sp.as_nat(sp.now - sp.timestamp(0)) / self.data.volume_bucket_seconds
+            slot = sp.mod(period, self.data.volume_bucket_count)
+            bucket = self.data.volume_buckets.get(slot, default=sp.record(period=period, volume=0))
+            if bucket.period == period:
+                self.data.volume_buckets[slot] = sp.record(period=period, volume=bucket.volume + quantity)
+            else:
+                self.data.volume_buckets[slot] = sp.record(period=period, volume=quantity)
 
-        @sp.entrypoint
-        def place_sell_order(self, price, quantity):
-            """Place un ordre de vente"""
-            assert sp.amount == sp.tez(0), "Pas de transfert autorise"
+        @sp.private(with_storage="read-write")
+        def consume_order(self, params):
+            """Deduit une quantite executee d'un ordre du carnet, et le retire s'il est epuise"""
+            is_buy = params.is_buy
+            order_id = params.order_id
+            tick = params.tick
+            quantity = params.quantity
+            order_quantity = sp.nat(0)
+            if is_buy:
+                order_quantity = self.data.buy_orders[order_id].quantity
+            else:
+                order_quantity = self.data.sell_orders[order_id].quantity
+            exhausted = order_quantity == quantity
+            if exhausted:
+                if is_buy:
+                    del self.data.buy_orders[order_id]
+                else:
+                    del self.data.sell_orders[order_id]
+            else:
+                # Execution partielle: la quantite restante est reecrite dans l'ordre
+                if is_buy:
+                    self.data.buy_orders[order_id].quantity = sp.as_nat(order_quantity - quantity)
+                else:
+                    self.data.sell_orders[order_id].quantity = sp.as_nat(order_quantity - quantity)
+            
+            if exhausted:
+                params.remove_from_book(sp.record(is_buy=is_buy, order_id=order_id, tick=tick, quantity=quantity))
+            else:
+                self.data.levels[(is_buy, tick)].quantity = sp.as_nat(
+                    self.data.levels[(is_buy, tick)].quantity - quantity
+                )
+
+        @sp.private(with_storage="read-write")
+        def place_order(self, params):
+            """Execute un ordre contre le carnet (au plus max_fills fois) et place le reste.
+            
+            Renvoie les paiements dus, completes, et le nombre d'executions.
+            """
+            is_buy = params.is_buy
+            price = params.price
+            quantity = params.quantity
+            max_fills = params.max_fills
             assert quantity > 0, "Quantite doit etre positive"
             assert price > sp.mutez(0), "Prix doit etre positif"
             
-            # Verifier que le vendeur a assez de tokens
-            seller_balance = self.data.balances.get(sp.sender, default=0)
-            assert seller_balance >= quantity, "Solde insuffisant"
+            (tick, remainder) = sp.ediv(price, self.data.tick_size).unwrap_some()
+            assert remainder == sp.mutez(0), "Prix doit avoir maximum 2 decimales"
             
-            # Creer l'ordre
-            order = sp.record(
-                trader=sp.sender,
-                order_type="sell",
-                price=price,
-                quantity=quantity,
-                timestamp=sp.now
-            )
+            # Correspondance en priorite prix-temps, au prix du vendeur
+            due = params.payouts
+            remaining = quantity
+            fills = sp.nat(0)
+            if is_buy:
+                refund = sp.mutez(0)
+                matching = self.data.best_ask.is_some()
+                while matching:
+                    ask_tick = self.data.best_ask.unwrap_some()
+                    matching = ask_tick <= tick and fills < max_fills and remaining > 0
+                    if matching:
+                        sell_order_id = self.data.levels[(False, ask_tick)].head
+                        sell_order = self.data.sell_orders[sell_order_id]
+                        seller = sell_order.trader
+                        trade_quantity = sp.min(remaining, sell_order.quantity)
+                        trade_price = sp.split_tokens(self.data.tick_size, ask_tick, 1)
+                        
+                        params.settle_trade(sp.record(
+                            buyer=sp.sender, seller=seller, price=trade_price, quantity=trade_quantity
+                        ))
+                        due[seller] = due.get(
+                            seller, default=sp.mutez(0)
+                        ) + sp.split_tokens(trade_price, trade_quantity, 1)
+                        refund += sp.split_tokens(
+                            self.data.tick_size, sp.as_nat(tick - ask_tick) * trade_quantity, 1
+                        )
+                        params.consume_order(sp.record(
+                            is_buy=False, order_id=sell_order_id, tick=ask_tick, quantity=trade_quantity,
+                            remove_from_book=params.remove_from_book
+                        ))
+                        
+                        remaining = sp.as_nat(remaining - trade_quantity)
+                        fills += 1
+                        matching = self.data.best_ask.is_some()
+                
+                # Rembourser l'ecart entre le prix offert et les prix d'execution
+                due[sp.sender] = due.get(sp.sender, default=sp.mutez(0)) + refund
+            else:
+                # Verifier que le vendeur a assez de tokens
+                seller_balance = self.data.balances.get(sp.sender, default=0)
+                assert seller_balance >= quantity, "Solde insuffisant"
+                
+                # Bloquer les tokens mis en vente jusqu'a execution ou annulation
+                new_seller_balance = sp.as_nat(seller_balance - quantity)
+                if new_seller_balance == 0:
+                    if self.data.balances.contains(sp.sender):
+                        del self.data.balances[sp.sender]
+                else:
+                    self.data.balances[sp.sender] = new_seller_balance
+                self.data.reserved[sp.sender] = self.data.reserved.get(sp.sender, default=0) + quantity
+                
+                proceeds = sp.mutez(0)
+                matching = self.data.best_bid.is_some()
+                while matching:
+                    bid_tick = self.data.best_bid.unwrap_some()
+                    matching = bid_tick >= tick and fills < max_fills and remaining > 0
+                    if matching:
+                        buy_order_id = self.data.levels[(True, bid_tick)].head
+                        buy_order = self.data.buy_orders[buy_order_id]
+                        buyer = buy_order.trader
+                        trade_quantity = sp.min(remaining, buy_order.quantity)
+                        
+                        params.settle_trade(sp.record(
+                            buyer=buyer, seller=sp.sender, price=price, quantity=trade_quantity
+                        ))
+                        proceeds += sp.split_tokens(price, trade_quantity, 1)
+                        
+                        # L'acheteur avait depose son propre prix: on lui rend l'ecart
+                        due[buyer] = due.get(
+                            buyer, default=sp.mutez(0)
+                        ) + sp.split_tokens(
+                            self.data.tick_size, sp.as_nat(bid_tick - tick) * trade_quantity, 1
+                        )
+                        params.consume_order(sp.record(
+                            is_buy=True, order_id=buy_order_id, tick=bid_tick, quantity=trade_quantity,
+                            remove_from_book=params.remove_from_book
+                        ))
+                        
+                        remaining = sp.as_nat(remaining - trade_quantity)
+                        fills += 1
+                        matching = self.data.best_bid.is_some()
+                
+                due[sp.sender] = due.get(sp.sender, default=sp.mutez(0)) + proceeds
             
-            self.data.sell_orders[self.data.order_counter] = order
+            # Le reste de l'ordre attend dans le carnet
+            if remaining > 0:
+                order = sp.record(
+                    trader=sp.sender,
+                    tick=tick,
+                    quantity=remaining,
+                    timestamp=sp.now
+                )
+                if is_buy:
+                    self.data.buy_orders[self.data.order_counter] = order
+                else:
+                    self.data.sell_orders[self.data.order_counter] = order
+                params.add_to_book(sp.record(
+                    is_buy=is_buy, order_id=self.data.order_counter, tick=tick, quantity=remaining,
+                    hint=params.hint
+                ))
             self.data.order_counter += 1
+            
+            return sp.record(payouts=due, fills=fills)
 
         @sp.entrypoint
-        def execute_trade(self, buy_order_id, sell_order_id):
-            """Execute un trade entre deux ordres specifiques"""
+        def place_buy_order(self, price, quantity, max_fills, hint):
+            """Place un ordre d'achat, execute contre les meilleures ventes (au plus max_fills)"""
+            sp.cast(hint, sp.option[sp.nat])
+            assert sp.amount == sp.split_tokens(price, quantity, 1), "Montant incorrect"
+            
+            payouts = sp.cast({}, sp.map[sp.address, sp.mutez])
+            result = self.place_order(sp.record(
+                is_buy=True, price=price, quantity=quantity, max_fills=max_fills, hint=hint, payouts=payouts,
+                settle_trade=self.settle_trade, consume_order=self.consume_order,
+                remove_from_book=self.remove_from_book, add_to_book=self.add_to_book
+            ))
+            self.send_payouts(result.payouts)
+
+        @sp.entrypoint
+        def place_sell_order(self, price, quantity, max_fills, hint):
+            """Place un ordre de vente, execute contre les meilleurs achats (au plus max_fills)"""
+            sp.cast(hint, sp.option[sp.nat])
+            assert sp.amount == sp.tez(0), "Pas de transfert autorise"
+            
+            payouts = sp.cast({}, sp.map[sp.address, sp.mutez])
+            result = self.place_order(sp.record(
+                is_buy=False, price=price, quantity=quantity, max_fills=max_fills, hint=hint, payouts=payouts,
+                settle_trade=self.settle_trade, consume_order=self.consume_order,
+                remove_from_book=self.remove_from_book, add_to_book=self.add_to_book
+            ))
+            self.send_payouts(result.payouts)
+
+        @sp.entrypoint
+        def place_orders(self, orders, max_fills):
+            """Place plusieurs ordres; max_fills borne le nombre total d'executions"""
+            sp.cast(orders, sp.list[sp.record(
+                order_type=sp.string, price=sp.mutez, quantity=sp.nat, hint=sp.option[sp.nat]
+            )])
+            
+            # Le depot en tez couvre l'ensemble des ordres d'achat du lot
+            total_amount = sp.mutez(0)
+            for order in orders:
+                if order.order_type == "buy":
+                    total_amount += sp.split_tokens(order.price, order.quantity, 1)
+            assert sp.amount == total_amount, "Montant incorrect"
+            
+            payouts = sp.cast({}, sp.map[sp.address, sp.mutez])
+            fills_left = max_fills
+            for order in orders:
+                result = self.place_order(sp.record(
+                    is_buy=order.order_type == "buy", price=order.price, quantity=order.quantity,
+                    max_fills=fills_left, hint=order.hint, payouts=payouts,
+                    settle_trade=self.settle_trade, consume_order=self.consume_order,
+                    remove_from_book=self.remove_from_book, add_to_book=self.add_to_book
+                ))
+                payouts = result.payouts
+                fills_left = sp.as_nat(fills_left - result.fills)
+            
+            self.send_payouts(payouts)
+
+        @sp.private(with_storage="read-write")
+        def fill_pair(self, params):
+            """Execute un couple d'ordres et renvoie les tez dus au vendeur et a l'acheteur"""
+            buy_order_id = params.buy_order_id
+            sell_order_id = params.sell_order_id
             assert self.data.buy_orders.contains(buy_order_id), "Ordre d'achat introuvable"
             assert self.data.sell_orders.contains(sell_order_id), "Ordre de vente introuvable"
             
@@ -100,96 +646,172 @@ def main():
             sell_order = self.data.sell_orders[sell_order_id]
             
             # Verifier que les prix sont compatibles
-            assert buy_order.price >= sell_order.price, "Prix incompatibles"
-            
-            # Verifier les soldes
-            seller_balance = self.data.balances.get(sell_order.trader, default=0)
-            assert seller_balance >= sell_order.quantity, "Vendeur n'a pas assez de tokens"
+            assert buy_order.tick >= sell_order.tick, "Prix incompatibles"
             
             # Calculer la quantite a echanger
             trade_quantity = sp.min(buy_order.quantity, sell_order.quantity)
-            trade_price = sell_order.price  # Prix du vendeur
+            trade_price = sp.split_tokens(self.data.tick_size, sell_order.tick, 1)  # Prix du vendeur
             
-            # Mettre a jour les soldes
-            buyer_balance = self.data.balances.get(buy_order.trader, default=0)
-            new_seller_balance = sp.as_nat(seller_balance - trade_quantity)
+            params.settle_trade(sp.record(
+                buyer=buy_order.trader, seller=sell_order.trader, price=trade_price, quantity=trade_quantity
+            ))
             
-            if new_seller_balance == 0:
-                if self.data.balances.contains(sell_order.trader):
-                    del self.data.balances[sell_order.trader]
-            else:
-                self.data.balances[sell_order.trader] = new_seller_balance
-                
-            self.data.balances[buy_order.trader] = buyer_balance + trade_quantity
-            
-            # Transferer les tez
-            total_amount = sp.split_tokens(trade_price, trade_quantity, 1)
-            sp.send(sell_order.trader, total_amount)
+            # Mettre a jour ou supprimer les ordres (et leur niveau de prix)
+            params.consume_order(sp.record(
+                is_buy=True, order_id=buy_order_id, tick=buy_order.tick, quantity=trade_quantity,
+                remove_from_book=params.remove_from_book
+            ))
+            params.consume_order(sp.record(
+                is_buy=False, order_id=sell_order_id, tick=sell_order.tick, quantity=trade_quantity,
+                remove_from_book=params.remove_from_book
+            ))
             
-            # Enregistrer le trade
-            trade = sp.record(
-                buyer=buy_order.trader,
+            return sp.record(
                 seller=sell_order.trader,
-                price=trade_price,
-                quantity=trade_quantity,
-                timestamp=sp.now
+                proceeds=sp.split_tokens(trade_price, trade_quantity, 1),
+                buyer=buy_order.trader,
+                # Ecart entre le prix depose par l'acheteur et le prix du vendeur
+                refund=sp.split_tokens(
+                    self.data.tick_size, sp.as_nat(buy_order.tick - sell_order.tick) * trade_quantity, 1
+                )
             )
-            self.data.trades[self.data.trade_counter] = trade
-            self.data.trade_counter += 1
+
+        @sp.private(with_operations=True)
+        def send_payouts(self, payouts):
+            """Envoie un seul transfert par destinataire"""
+            for payout in payouts.items():
+                if payout.value > sp.mutez(0):
+                    sp.send(payout.key, payout.value)
+
+        @sp.entrypoint
+        def execute_trade(self, buy_order_id, sell_order_id):
+            """Execute un trade entre deux ordres specifiques"""
+            fill = self.fill_pair(sp.record(
+                buy_order_id=buy_order_id, sell_order_id=sell_order_id,
+                settle_trade=self.settle_trade, consume_order=self.consume_order,
+                remove_from_book=self.remove_from_book
+            ))
             
-            # Mettre a jour les statistiques
-            self.data.last_price = trade_price
-            self.data.volume_24h += trade_quantity
+            # Transferer les tez
+            sp.send(fill.seller, fill.proceeds)
+            if fill.refund > sp.mutez(0):
+                sp.send(fill.buyer, fill.refund)
+
+        @sp.entrypoint
+        def execute_trades(self, pairs):
+            """Execute une liste de couples d'ordres, avec un paiement groupe par destinataire"""
+            sp.cast(pairs, sp.list[sp.record(buy_order_id=sp.nat, sell_order_id=sp.nat)])
             
-            # Mettre a jour ou supprimer les ordres
-            if buy_order.quantity == trade_quantity:
-                del self.data.buy_orders[buy_order_id]
-            else:
-                new_buy_quantity = sp.as_nat(buy_order.quantity - trade_quantity)
-                self.data.buy_orders[buy_order_id] = sp.record(
-                    trader=buy_order.trader,
-                    order_type=buy_order.order_type,
-                    price=buy_order.price,
-                    quantity=new_buy_quantity,
-                    timestamp=buy_order.timestamp
-                )
+            payouts = sp.cast({}, sp.map[sp.address, sp.mutez])
+            for pair in pairs:
+                fill = self.fill_pair(sp.record(
+                    buy_order_id=pair.buy_order_id, sell_order_id=pair.sell_order_id,
+                    settle_trade=self.settle_trade, consume_order=self.consume_order,
+                    remove_from_book=self.remove_from_book
+                ))
+                payouts[fill.seller] = payouts.get(fill.seller, default=sp.mutez(0)) + fill.proceeds
+                payouts[fill.buyer] = payouts.get(fill.buyer, default=sp.mutez(0)) + fill.refund
+            
+            self.send_payouts(payouts)
+
+        @sp.private(with_storage="read-write")
+        def run_lambda(self, params):
+            """Execute la lambda d'une operation rare et renvoie le montant a rembourser"""
+            action = params.action
+            name = "cancel"
+            orders = {}
+            if action.is_variant.mint():
+                name = "mint"
+            if action.is_variant.burn():
+                name = "burn"
+            if action.is_variant.set_trade_retention():
+                name = "set_trade_retention"
+            if action.is_variant.prune_trades():
+                name = "prune_trades"
+            if action.is_variant.cancel():
+                for order in action.unwrap.cancel():
+                    buy = self.data.buy_orders.get_opt(order.order_id)
+                    sell = self.data.sell_orders.get_opt(order.order_id)
+                    owned = False
+                    if buy.is_some():
+                        owned = buy.unwrap_some().trader == sp.sender
+                    if sell.is_some():
+                        owned = sell.unwrap_some().trader == sp.sender
+                    orders[order.order_id] = sp.record(buy=buy, sell=sell, owned=owned)
             
-            if sell_order.quantity == trade_quantity:
-                del self.data.sell_orders[sell_order_id]
+            # Lambdas rangees packees: une big_map de lambdas ajouterait leur type a
+            # celui du storage, repete dans la signature de chaque fonction privee.
+            # Leur argument (t_lazy_call) et leur resultat (t_lazy_result) le sont aussi.
+            code = sp.unpack(self.data.lambdas[name], sp.lambda_(sp.bytes, sp.bytes)).unwrap_some()
+            result = sp.unpack(code(sp.pack(sp.cast(sp.record(
+                action=action,
+                is_admin=sp.sender == self.data.admin,
+                total_supply=self.data.total_supply,
+                tick_size=self.data.tick_size,
+                trade_counter=self.data.trade_counter,
+                trade_retention=self.data.trade_retention,
+                sender_balance=self.data.balances.get(sp.sender, default=0),
+                orders=orders
+            ), t_lazy_call))), t_lazy_result).unwrap_some()
+            self.data.total_supply = result.total_supply
+            self.data.trade_retention = result.trade_retention
+            balance = sp.as_nat(sp.to_int(self.data.balances.get(sp.sender, default=0)) + result.sender_balance)
+            if balance == 0:
+                if self.data.balances.contains(sp.sender):
+                    del self.data.balances[sp.sender]
             else:
-                new_sell_quantity = sp.as_nat(sell_order.quantity - trade_quantity)
-                self.data.sell_orders[sell_order_id] = sp.record(
-                    trader=sell_order.trader,
-                    order_type=sell_order.order_type,
-                    price=sell_order.price,
-                    quantity=new_sell_quantity,
-                    timestamp=sell_order.timestamp
-                )
+                self.data.balances[sp.sender] = balance
+            reserved = sp.as_nat(sp.to_int(self.data.reserved.get(sp.sender, default=0)) + result.sender_reserved)
+            if reserved == 0:
+                if self.data.reserved.contains(sp.sender):
+                    del self.data.reserved[sp.sender]
+            else:
+                self.data.reserved[sp.sender] = reserved
+            if action.is_variant.mint():
+                to_address = action.unwrap.mint().to_address
+                self.data.balances[to_address] = self.data.balances.get(to_address, default=0) + result.minted
+            for order in result.removed:
+                if order.is_buy:
+                    del self.data.buy_orders[order.order_id]
+                else:
+                    del self.data.sell_orders[order.order_id]
+                params.remove_from_book(order)
+            for trade_id in result.pruned:
+                del self.data.trades[trade_id]
+            return result.refund
+
+        @sp.entrypoint
+        def dispatch(self, action):
+            """Operation rare: mint, burn, set_trade_retention, prune_trades ou annulation d'ordres"""
+            sp.cast(action, t_lazy_action)
+            refund_amount = self.run_lambda(sp.record(action=action, remove_from_book=self.remove_from_book))
+            if refund_amount > sp.mutez(0):
+                sp.send(sp.sender, refund_amount)
 
         @sp.entrypoint
         def cancel_order(self, order_id, order_type):
             """Annule un ordre"""
-            if order_type == "buy":
-                assert self.data.buy_orders.contains(order_id), "Ordre introuvable"
-                order = self.data.buy_orders[order_id]
-                assert order.trader == sp.sender, "Pas autorise"
-                
-                # Rembourser l'acheteur
-                refund_amount = sp.split_tokens(order.price, order.quantity, 1)
+            refund_amount = self.run_lambda(sp.record(
+                action=sp.variant.cancel([sp.record(order_id=order_id, order_type=order_type)]),
+                remove_from_book=self.remove_from_book
+            ))
+            if refund_amount > sp.mutez(0):
+                sp.send(sp.sender, refund_amount)
+
+        @sp.entrypoint
+        def cancel_orders(self, orders):
+            """Annule plusieurs ordres avec un seul remboursement"""
+            sp.cast(orders, sp.list[sp.record(order_id=sp.nat, order_type=sp.string)])
+            
+            refund_amount = self.run_lambda(sp.record(
+                action=sp.variant.cancel(orders), remove_from_book=self.remove_from_book
+            ))
+            if refund_amount > sp.mutez(0):
                 sp.send(sp.sender, refund_amount)
-                
-                del self.data.buy_orders[order_id]
-                
-            else:  # sell
-                assert self.data.sell_orders.contains(order_id), "Ordre introuvable"
-                order = self.data.sell_orders[order_id]
-                assert order.trader == sp.sender, "Pas autorise"
-                
-                del self.data.sell_orders[order_id]
 
         @sp.entrypoint
         def transfer(self, to_address, amount):
-            """Transfere des tokens"""
+            """Transfere des tokens (hors tokens bloques par des ordres de vente)"""
             assert sp.amount == sp.tez(0), "Pas de transfert autorise"
             
             sender_balance = self.data.balances.get(sp.sender, default=0)
@@ -207,38 +829,21 @@ def main():
                 
             self.data.balances[to_address] = receiver_balance + amount
 
-        @sp.entrypoint
-        def mint(self, to_address, amount):
-            """Mint de nouveaux tokens (admin seulement)"""
-            assert sp.sender == self.data.admin, "Seul l'admin peut mint"
-            assert sp.amount == sp.tez(0), "Pas de transfert autorise"
-            
-            receiver_balance = self.data.balances.get(to_address, default=0)
-            self.data.balances[to_address] = receiver_balance + amount
-            self.data.total_supply += amount
-
-        @sp.entrypoint
-        def burn(self, amount):
-            """Burn des tokens"""
-            assert sp.amount == sp.tez(0), "Pas de transfert autorise"
-            
-            sender_balance = self.data.balances.get(sp.sender, default=0)
-            assert sender_balance >= amount, "Solde insuffisant"
-            
-            new_sender_balance = sp.as_nat(sender_balance - amount)
-            if new_sender_balance == 0:
-                if self.data.balances.contains(sp.sender):
-                    del self.data.balances[sp.sender]
-            else:
-                self.data.balances[sp.sender] = new_sender_balance
-            new_total_supply = sp.as_nat(self.data.total_supply - amount)
-            self.data.total_supply = new_total_supply
-
         # Vues pour lire les donnees
         @sp.onchain_view()
         def get_balance(self, address):
+            """Solde total: disponible + bloque par des ordres de vente"""
+            return self.data.balances.get(address, default=0) + self.data.reserved.get(address, default=0)
+
+        @sp.onchain_view()
+        def get_available_balance(self, address):
+            """Solde utilisable pour transfer, burn et de nouvelles ventes"""
             return self.data.balances.get(address, default=0)
 
+        @sp.onchain_view()
+        def get_reserved_balance(self, address):
+            return self.data.reserved.get(address, default=0)
+
         @sp.onchain_view()
         def get_total_supply(self):
             return self.data.total_supply
@@ -247,9 +852,98 @@ def main():
         def get_last_price(self):
             return self.data.last_price
 
+        @sp.onchain_view()
+        def get_best_bid(self):
+            """Meilleur prix d'achat et quantite totale a ce prix"""
+            result = sp.cast(None, sp.option[t_depth_level])
+            if self.data.best_bid.is_some():
+                tick = self.data.best_bid.unwrap_some()
+                result = sp.Some(sp.record(
+                    price=sp.split_tokens(self.data.tick_size, tick, 1),
+                    quantity=self.data.levels[(True, tick)].quantity
+                ))
+            return result
+
+        @sp.onchain_view()
+        def get_best_ask(self):
+            """Meilleur prix de vente et quantite totale a ce prix"""
+            result = sp.cast(None, sp.option[t_depth_level])
+            if self.data.best_ask.is_some():
+                tick = self.data.best_ask.unwrap_some()
+                result = sp.Some(sp.record(
+                    price=sp.split_tokens(self.data.tick_size, tick, 1),
+                    quantity=self.data.levels[(False, tick)].quantity
+                ))
+            return result
+
+        @sp.onchain_view()
+        def get_depth(self, levels):
+            """Les `levels` meilleurs niveaux de chaque cote (100 au plus), du meilleur au moins bon"""
+            count = sp.min(levels, 100)
+            
+            # Parcours depuis le meilleur prix; les listes sont construites a l'envers
+            reversed_bids = sp.cast([], sp.list[t_depth_level])
+            tick = self.data.best_bid
+            n = sp.nat(0)
+            while tick.is_some() and n < count:
+                level = self.data.levels[(True, tick.unwrap_some())]
+                reversed_bids.push(sp.record(
+                    price=sp.split_tokens(self.data.tick_size, tick.unwrap_some(), 1),
+                    quantity=level.quantity
+                ))
+                tick = level.worse
+                n += 1
+            
+            reversed_asks = sp.cast([], sp.list[t_depth_level])
+            tick = self.data.best_ask
+            n = 0
+            while tick.is_some() and n < count:
+                level = self.data.levels[(False, tick.unwrap_some())]
+                reversed_asks.push(sp.record(
+                    price=sp.split_tokens(self.data.tick_size, tick.unwrap_some(), 1),
+                    quantity=level.quantity
+                ))
+                tick = level.worse
+                n += 1
+            
+            bids = sp.cast([], sp.list[t_depth_level])
+            for level in reversed_bids:
+                bids.push(level)
+            asks = sp.cast([], sp.list[t_depth_level])
+            for level in reversed_asks:
+                asks.push(level)
+            return sp.record(bids=bids, asks=asks)
+
         @sp.onchain_view()
         def get_volume_24h(self):
-            return self.data.volume_24h
+            """Somme des cases dont la periode est encore dans la fenetre"""
+            period = sp.as_nat(sp.now - sp.timestamp(0)) / self.data.volume_bucket_seconds
+            volume = sp.nat(0)
+            for bucket in self.data.volume_buckets.values():
+                if bucket.period + self.data.volume_bucket_count > period:
+                    volume += bucket.volume
+            return volume
+
+    class ActionChainSnapshot(ActionChainToken):
+        """ActionChainToken origine directement dans un etat donne (voir fixtures.py)"""
+
+        def __init__(self, storage):
+            # Storage complet, de meme forme que celui d'ActionChainToken: il remplace
+            # le storage initial du constructeur parent
+            ActionChainToken.__init__(self, storage.admin, 0, storage.token_name, storage.token_symbol)
+            self.data = storage
+            sp.cast(self.data.balances, sp.big_map[sp.address, sp.nat])
+            sp.cast(self.data.reserved, sp.big_map[sp.address, sp.nat])
+            sp.cast(self.data.buy_orders, sp.big_map[sp.nat, t_order])
+            sp.cast(self.data.sell_orders, sp.big_map[sp.nat, t_order])
+            sp.cast(self.data.levels, sp.big_map[sp.pair[sp.bool, sp.nat], t_level])
+            sp.cast(self.data.order_links, sp.big_map[sp.nat, t_order_link])
+            sp.cast(self.data.best_bid, sp.option[sp.nat])
+            sp.cast(self.data.best_ask, sp.option[sp.nat])
+            sp.cast(self.data.volume_buckets, sp.map[sp.nat, t_volume_bucket])
+            sp.cast(self.data.trades, sp.big_map[sp.nat, t_trade])
+            sp.cast(self.data.candles, sp.big_map[sp.nat, t_candle])
+            sp.cast(self.data.lambdas, sp.big_map[sp.string, sp.bytes])
 
 # Tests
 @sp.add_test()
@@ -272,19 +966,21 @@ def test_actionchain_token():
     
     # Test 1: Mint des tokens pour Alice et Bob
     scenario.h2("Mint tokens")
-    token.mint(to_address=alice.address, amount=10000).run(sender=admin)
-    token.mint(to_address=bob.address, amount=10000).run(sender=admin)
+    token.dispatch(sp.variant.mint(sp.record(to_address=alice.address, amount=10000))).run(sender=admin)
+    token.dispatch(sp.variant.mint(sp.record(to_address=bob.address, amount=10000))).run(sender=admin)
     
     # Test 2: Alice place un ordre de vente
     scenario.h2("Alice place un ordre de vente")
-    token.place_sell_order(price=sp.mutez(1200000), quantity=100).run(sender=alice)  # 1.20 tez par token
+    token.place_sell_order(price=sp.mutez(1200000), quantity=100, max_fills=10, hint=None).run(sender=alice)  # 1.20 tez par token
+    scenario.verify(token.data.best_ask == sp.Some(120))
     
-    # Test 3: Bob place un ordre d'achat
+    # Test 3: Bob place un ordre d'achat (sans correspondance automatique)
     scenario.h2("Bob place un ordre d'achat")
-    token.place_buy_order(price=sp.mutez(1200000), quantity=50).run(
+    token.place_buy_order(price=sp.mutez(1200000), quantity=50, max_fills=0, hint=None).run(
         sender=bob, 
         amount=sp.tez(60)  # 50 * 1.20 = 60 tez
     )
+    scenario.verify(token.data.best_bid == sp.Some(120))
     
     # Test 4: Execution manuelle du trade
     scenario.h2("Execution du trade")
@@ -294,15 +990,235 @@ def test_actionchain_token():
     scenario.h2("Verification des soldes")
     scenario.verify(token.get_balance(alice.address) == 9950)  # 10000 - 50
     scenario.verify(token.get_balance(bob.address) == 10050)   # 10000 + 50
+    scenario.verify(token.data.best_bid.is_none())
+    scenario.verify(token.data.levels[(False, 120)].quantity == 50)
+    scenario.verify(token.data.sell_orders[0].quantity == 50)  # Execution partielle
+    scenario.verify(token.data.sell_orders[0].tick == 120)
     
     # Test 6: Annulation d'ordre
     scenario.h2("Test d'annulation d'ordre")
-    token.place_buy_order(price=sp.mutez(1100000), quantity=10).run(
+    token.place_buy_order(price=sp.mutez(1100000), quantity=10, max_fills=10, hint=None).run(
         sender=bob,
         amount=sp.tez(11)
     )
     
     # Annuler l'ordre (il devrait y avoir un remboursement)
+    scenario.verify(token.data.best_bid == sp.Some(110))
     token.cancel_order(order_id=2, order_type="buy").run(sender=bob)
+    scenario.verify(token.data.best_bid.is_none())
+    
+    # Test 7: Niveaux de prix tries et file FIFO
+    scenario.h2("Carnet d'ordres par niveau de prix")
+    # Un nouveau niveau hors du meilleur prix est place d'apres un niveau voisin
+    token.place_sell_order(price=sp.mutez(1300000), quantity=10, max_fills=10, hint=sp.Some(120)).run(sender=alice)
+    token.place_sell_order(price=sp.mutez(1250000), quantity=10, max_fills=10, hint=sp.Some(130)).run(sender=alice)
+    token.place_sell_order(price=sp.mutez(1250000), quantity=5, max_fills=10, hint=None).run(sender=alice)
+    # Indice qui n'est pas un voisin du prix, ou qui n'est pas un niveau du carnet
+    token.place_sell_order(price=sp.mutez(1400000), quantity=1, max_fills=10, hint=None).run(
+        sender=alice,
+        valid=False,
+        exception="Indice de niveau invalide"
+    )
+    token.place_sell_order(price=sp.mutez(1270000), quantity=1, max_fills=10, hint=sp.Some(120)).run(
+        sender=alice,
+        valid=False,
+        exception="Indice de niveau invalide"
+    )
+    token.place_sell_order(price=sp.mutez(1270000), quantity=1, max_fills=10, hint=sp.Some(128)).run(
+        sender=alice,
+        valid=False,
+        exception="Indice de niveau invalide"
+    )
+    scenario.verify(token.data.best_ask == sp.Some(120))
+    scenario.verify(token.data.levels[(False, 120)].worse == sp.Some(125))
+    scenario.verify(token.data.levels[(False, 125)].quantity == 15)
+    scenario.verify(token.data.levels[(False, 125)].head == 4)
+    scenario.verify(token.data.levels[(False, 125)].tail == 5)
+    
+    token.cancel_order(order_id=0, order_type="sell").run(sender=alice)
+    scenario.verify(token.data.best_ask == sp.Some(125))
+    token.cancel_order(order_id=4, order_type="sell").run(sender=alice)
+    scenario.verify(token.data.levels[(False, 125)].head == 5)
+    scenario.verify(token.data.sell_orders[5].quantity == 5)
+    scenario.verify(token.data.levels[(False, 125)].quantity == 5)
+    
+    # Test 8: Prix hors tick refuse
+    scenario.h2("Prix avec plus de 2 decimales")
+    token.place_sell_order(price=sp.mutez(1234567), quantity=1, max_fills=10, hint=None).run(
+        sender=alice,
+        valid=False,
+        exception="Prix doit avoir maximum 2 decimales"
+    )
+    
+    # Test 9: Correspondance automatique limitee par max_fills
+    scenario.h2("Correspondance automatique a l'achat")
+    token.place_buy_order(price=sp.mutez(1300000), quantity=12, max_fills=1, hint=None).run(
+        sender=bob,
+        amount=sp.mutez(15600000)  # 12 * 1.30 = 15.6 tez
+    )
+    # 5 tokens executes a 1.25, le reste attend a 1.30 (ecart de prix rembourse)
+    scenario.verify(token.get_balance(bob.address) == 10055)
+    scenario.verify(token.data.best_bid == sp.Some(130))
+    scenario.verify(token.data.best_ask == sp.Some(130))
+    scenario.verify(token.balance == sp.mutez(9100000))  # 7 * 1.30 tez en attente
+    
+    # Test 10: Une vente agressive execute l'achat en attente au prix du vendeur
+    scenario.h2("Correspondance automatique a la vente")
+    token.place_sell_order(price=sp.mutez(1200000), quantity=7, max_fills=5, hint=None).run(sender=alice)
+    scenario.verify(token.get_balance(bob.address) == 10062)
+    scenario.verify(token.get_balance(alice.address) == 9938)
+    scenario.verify(token.data.best_bid.is_none())
+    scenario.verify(token.balance == sp.tez(0))
+    
+    # Test 11: Execution groupee avec un seul paiement par vendeur
+    scenario.h2("Execution groupee de trades")
+    token.place_buy_order(price=sp.mutez(1300000), quantity=4, max_fills=0, hint=None).run(
+        sender=bob,
+        amount=sp.mutez(5200000)
+    )
+    token.place_buy_order(price=sp.mutez(1350000), quantity=3, max_fills=0, hint=None).run(
+        sender=bob,
+        amount=sp.mutez(4050000)
+    )
+    token.execute_trades([
+        sp.record(buy_order_id=8, sell_order_id=3),
+        sp.record(buy_order_id=9, sell_order_id=3)
+    ]).run(sender=admin)
+    scenario.verify(token.get_balance(bob.address) == 10069)
+    scenario.verify(token.get_balance(alice.address) == 9931)
+    scenario.verify(token.data.levels[(False, 130)].quantity == 3)
+    scenario.verify(token.data.best_bid.is_none())
+    scenario.verify(token.balance == sp.tez(0))
+    
+    # Test 12: Placement groupe d'une echelle d'ordres
+    scenario.h2("Placement groupe d'ordres")
+    token.place_orders(
+        orders=[
+            sp.record(order_type="buy", price=sp.mutez(1000000), quantity=10, hint=None),
+            sp.record(order_type="buy", price=sp.mutez(1050000), quantity=10, hint=None),
+            sp.record(order_type="buy", price=sp.mutez(1100000), quantity=10, hint=None),
+            sp.record(order_type="sell", price=sp.mutez(1500000), quantity=5, hint=sp.Some(130))
+        ],
+        max_fills=5
+    ).run(
+        sender=bob,
+        amount=sp.mutez(31500000)  # 10 + 10.5 + 11 tez pour les achats
+    )
+    scenario.verify(token.data.best_bid == sp.Some(110))
+    scenario.verify(token.data.best_ask == sp.Some(130))
+    scenario.verify(token.data.levels[(False, 150)].quantity == 5)
+    
+    # Test 13: Annulation groupee avec un seul remboursement
+    scenario.h2("Annulation groupee d'ordres")
+    token.cancel_orders([
+        sp.record(order_id=10, order_type="buy"),
+        sp.record(order_id=11, order_type="buy"),
+        sp.record(order_id=13, order_type="sell")
+    ]).run(sender=bob)
+    scenario.verify(token.data.best_bid == sp.Some(110))
+    scenario.verify(token.data.levels[(True, 110)].worse.is_none())
+    scenario.verify(token.data.levels[(False, 130)].worse.is_none())
+    scenario.verify(token.balance == sp.tez(11))
+    
+    # Test 14: Les tokens en vente sont bloques jusqu'a execution
+    scenario.h2("Tokens bloques par les ordres de vente")
+    scenario.verify(token.get_reserved_balance(alice.address) == 3)
+    scenario.verify(token.get_available_balance(alice.address) == 9928)
+    token.transfer(to_address=bob.address, amount=9930).run(
+        sender=alice,
+        valid=False,
+        exception="Solde insuffisant"
+    )
+    token.place_buy_order(price=sp.mutez(1300000), quantity=3, max_fills=1, hint=None).run(
+        sender=bob,
+        amount=sp.mutez(3900000)
+    )
+    scenario.verify(token.get_reserved_balance(alice.address) == 0)
+    scenario.verify(token.get_balance(alice.address) == 9928)
+    scenario.verify(token.data.best_ask.is_none())
+    
+    # Test 15: Volume glissant par cases horaires
+    scenario.h2("Volume glissant sur 24h")
+    token.place_sell_order(price=sp.mutez(1200000), quantity=10, max_fills=1, hint=None).run(
+        sender=alice,
+        now=sp.timestamp(90000)  # 25 heures plus tard
+    )
+    token.place_buy_order(price=sp.mutez(1200000), quantity=4, max_fills=1, hint=None).run(
+        sender=bob,
+        amount=sp.mutez(4800000),
+        now=sp.timestamp(90000)
+    )
+    scenario.verify(token.data.volume_buckets[1].period == 25)  # Case 25 % 24
+    scenario.verify(token.data.volume_buckets[1].volume == 4)
+    token.place_buy_order(price=sp.mutez(1200000), quantity=2, max_fills=1, hint=None).run(
+        sender=bob,
+        amount=sp.mutez(2400000),
+        now=sp.timestamp(90000 + 24 * 3600)  # La case 1 est recyclee
+    )
+    scenario.verify(token.data.volume_buckets[1].period == 49)
+    scenario.verify(token.data.volume_buckets[1].volume == 2)
+    
+    # Test 16: Bougies OHLCV
+    scenario.h2("Bougies OHLCV")
+    scenario.verify(token.data.candles[25].open == sp.mutez(1200000))
+    scenario.verify(token.data.candles[25].close == sp.mutez(1200000))
+    scenario.verify(token.data.candles[25].volume == 4)
+    scenario.verify(token.data.candles[25].trades == 1)
+    scenario.verify(token.data.candles[49].volume == 2)
+    
+    # Test 17: Conservation bornee des trades bruts
+    scenario.h2("Conservation des trades")
+    token.dispatch(sp.variant.set_trade_retention(2)).run(
+        sender=bob,
+        valid=False,
+        exception="Seul l'admin peut configurer"
+    )
+    token.dispatch(sp.variant.set_trade_retention(2)).run(sender=admin)
+    token.place_buy_order(price=sp.mutez(1200000), quantity=1, max_fills=1, hint=None).run(
+        sender=bob,
+        amount=sp.mutez(1200000),
+        now=sp.timestamp(90000 + 24 * 3600)
+    )
+    scenario.verify(token.data.trade_counter == 9)
+    scenario.verify(token.data.trades.contains(8))
+    scenario.verify(token.data.trades.contains(7))
+    scenario.verify(token.data.trades.contains(6) == False)
+    token.dispatch(sp.variant.prune_trades([7])).run(
+        sender=bob,
+        valid=False,
+        exception="Trade encore conserve"
+    )
+    token.dispatch(sp.variant.prune_trades([0, 1, 2])).run(sender=bob)
+    scenario.verify(token.data.trades.contains(0) == False)
+    
+    # Test 18: Vues du carnet d'ordres
+    scenario.h2("Meilleurs prix et profondeur")
+    token.place_buy_order(price=sp.mutez(1050000), quantity=5, max_fills=1, hint=sp.Some(110)).run(
+        sender=bob,
+        amount=sp.mutez(5250000)
+    )
+    scenario.verify(token.get_best_bid() == sp.Some(sp.record(price=sp.mutez(1100000), quantity=10)))
+    scenario.verify(token.get_best_ask() == sp.Some(sp.record(price=sp.mutez(1200000), quantity=3)))
+    scenario.verify_equal(token.get_depth(5), sp.record(
+        bids=[
+            sp.record(price=sp.mutez(1100000), quantity=10),
+            sp.record(price=sp.mutez(1050000), quantity=5)
+        ],
+        asks=[sp.record(price=sp.mutez(1200000), quantity=3)]
+    ))
+    scenario.verify_equal(token.get_depth(1).bids, [sp.record(price=sp.mutez(1100000), quantity=10)])
+
+    # Test 19: Operations rares executees par les lambdas de la big_map
+    scenario.h2("Operations rares par dispatch")
+    token.dispatch(sp.variant.mint(sp.record(to_address=bob.address, amount=1))).run(
+        sender=bob,
+        valid=False,
+        exception="Seul l'admin peut mint"
+    )
+    token.dispatch(sp.variant.burn(5)).run(sender=bob)
+    scenario.verify(token.data.total_supply == 1019995)
+    token.dispatch(sp.variant.cancel([sp.record(order_id=19, order_type="buy")])).run(sender=bob)
+    scenario.verify(token.data.best_bid == sp.Some(110))
+    scenario.verify(token.data.levels.contains((True, 105)) == False)
 
     scenario.h2("Tests termines avec succes!")
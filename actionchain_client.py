@@ -0,0 +1,275 @@
+"""
+Client Python du contrat ActionChain Token
+
+Enveloppe chaque entrypoint d'ActionChainToken et permet de regrouper de
+nombreux appels dans un seul groupe d'operations. Un compte ne peut avoir
+qu'une operation manager en attente par bloc: le regroupement est donc le
+seul moyen pour un bot d'envoyer des dizaines d'appels par bloc.
+
+Les connexions HTTP au noeud sont persistantes et partagees (pool), et le
+compteur du compte est gere localement: il n'est lu sur le noeud qu'au
+premier envoi, ou apres un refus pour compteur desynchronise.
+
+Les operations sont envoyees au format JSON non signe du noeud simule
+(mock_rpc.py); le forgeage et la signature pour un vrai noeud restent a la
+charge d'octez-client ou d'un signataire.
+
+    client = ActionChainClient("http://127.0.0.1:8732", "tz1...")
+    client.place_sell_order(price=1_250_000, quantity=100)
+    with client.batch() as batch:
+        for tick in range(100, 120):
+            batch.place_sell_order(price=tick * 10000, quantity=10, hint=tick - 1 if tick > 100 else None)
+    print(batch.receipt["level"])
+"""
+
+import abc
+import http.client
+import json
+import queue
+import threading
+from urllib.parse import urlparse
+
+MAX_FILLS = 10
+COUNTER_ERRORS = ("counter_in_the_past", "counter_in_the_future")
+DISCONNECTED = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+class RpcError(Exception):
+    """Reponse d'erreur du noeud (operation refusee, vue en echec...)"""
+
+    def __init__(self, status, error):
+        super().__init__(error)
+        self.status = status
+        self.error = error
+
+
+class ConnectionPool:
+    """Connexions HTTP persistantes vers un noeud, reutilisees entre les requetes"""
+
+    def __init__(self, url, size=4, timeout=30):
+        parsed = urlparse(url)
+        self.host = parsed.hostname
+        self.port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        self.https = parsed.scheme == "https"
+        self.timeout = timeout
+        self.idle = queue.LifoQueue(maxsize=size)
+
+    def connect(self):
+        connection_class = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        return connection_class(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method, path, body=None, idempotent=None):
+        """Envoie la requete et renvoie (statut, corps JSON decode)
+
+        Une requete idempotente (GET par defaut) est renvoyee une fois si la
+        connexion a ete fermee par le noeud; une autre requete ne l'est jamais,
+        car le noeud a pu la traiter avant la coupure.
+        """
+        if idempotent is None:
+            idempotent = method == "GET"
+        data = None if body is None else json.dumps(body).encode()
+        headers = {"Content-Type": "application/json"} if data is not None else {}
+        for attempt in range(2):
+            try:
+                connection = self.idle.get_nowait()
+            except queue.Empty:
+                connection = self.connect()
+            try:
+                connection.request(method, path, data, headers)
+                response = connection.getresponse()
+                payload = response.read()
+            except DISCONNECTED:
+                # Connexion fermee par le noeud pendant qu'elle etait au repos
+                connection.close()
+                if attempt or not idempotent:
+                    raise
+                continue
+            except BaseException:
+                connection.close()
+                raise
+            try:
+                self.idle.put_nowait(connection)
+            except queue.Full:
+                connection.close()
+            return response.status, json.loads(payload) if payload else None
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class Entrypoints(abc.ABC):
+    """Un appel par entrypoint du contrat; les prix et montants sont en mutez"""
+
+    @abc.abstractmethod
+    def call(self, entrypoint, value, amount=0):
+        """Envoie ou accumule l'appel d'un entrypoint"""
+
+    # hint: tick du niveau voisin meilleur qu'un nouveau niveau de prix (None si
+    # le niveau existe deja ou devient le meilleur prix), voir ActionChainModel.level_hint
+    def place_buy_order(self, price, quantity, max_fills=MAX_FILLS, hint=None, amount=None):
+        # Le depot attendu par le contrat est price * quantity
+        return self.call("place_buy_order",
+                         {"price": price, "quantity": quantity, "max_fills": max_fills, "hint": hint},
+                         price * quantity if amount is None else amount)
+
+    def place_sell_order(self, price, quantity, max_fills=MAX_FILLS, hint=None):
+        return self.call("place_sell_order",
+                         {"price": price, "quantity": quantity, "max_fills": max_fills, "hint": hint})
+
+    def place_orders(self, orders, max_fills=MAX_FILLS, amount=None):
+        """orders: liste de {"order_type": "buy"|"sell", "price", "quantity", "hint"}"""
+        if amount is None:
+            amount = sum(order["price"] * order["quantity"] for order in orders if order["order_type"] == "buy")
+        return self.call("place_orders", {"orders": list(orders), "max_fills": max_fills}, amount)
+
+    def execute_trade(self, buy_order_id, sell_order_id):
+        return self.call("execute_trade", {"buy_order_id": buy_order_id, "sell_order_id": sell_order_id})
+
+    def execute_trades(self, pairs):
+        """pairs: liste de {"buy_order_id", "sell_order_id"}"""
+        return self.call("execute_trades", list(pairs))
+
+    def cancel_order(self, order_id, order_type):
+        return self.call("cancel_order", {"order_id": order_id, "order_type": order_type})
+
+    def cancel_orders(self, orders):
+        """orders: liste de {"order_id", "order_type"}"""
+        return self.call("cancel_orders", list(orders))
+
+    def transfer(self, to_address, amount):
+        return self.call("transfer", {"to_address": to_address, "amount": amount})
+
+    # Operations rares: un seul entrypoint, dispatch, execute leur lambda
+
+    def set_trade_retention(self, trade_retention):
+        return self.call("dispatch", {"set_trade_retention": trade_retention})
+
+    def prune_trades(self, trade_ids):
+        return self.call("dispatch", {"prune_trades": list(trade_ids)})
+
+    def mint(self, to_address, amount):
+        return self.call("dispatch", {"mint": {"to_address": to_address, "amount": amount}})
+
+    def burn(self, amount):
+        return self.call("dispatch", {"burn": amount})
+
+
+class Batch(Entrypoints):
+    """Appels accumules puis envoyes en un seul groupe d'operations (atomique)"""
+
+    def __init__(self, client):
+        self.client = client
+        self.contents = []
+        self.receipt = None
+
+    def call(self, entrypoint, value, amount=0):
+        self.contents.append({"entrypoint": entrypoint, "value": value, "amount": amount})
+        return self
+
+    def __len__(self):
+        return len(self.contents)
+
+    def send(self, now=None):
+        """Injecte le groupe; renvoie le recu du noeud"""
+        self.receipt = self.client.inject(self.contents, now) if self.contents else None
+        self.contents = []
+        return self.receipt
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.send()
+
+
+class ActionChainClient(Entrypoints):
+    """Client d'un compte: appels directs, groupes d'appels et vues du contrat"""
+
+    def __init__(self, url, source, pool=None, now=None):
+        self.pool = pool if pool is not None else ConnectionPool(url)
+        self.source = source
+        self.now = now  # Horodatage impose aux operations (noeud simule uniquement)
+        self.counter = None
+        self.lock = threading.Lock()
+
+    def fetch_counter(self):
+        status, counter = self.pool.request(
+            "GET", f"/chains/main/blocks/head/context/contracts/{self.source}/counter"
+        )
+        if status != 200:
+            raise RpcError(status, counter.get("error") if isinstance(counter, dict) else counter)
+        return int(counter)
+
+    def inject(self, contents, now=None):
+        """Envoie un groupe d'operations avec le prochain compteur local"""
+        with self.lock:
+            for attempt in range(2):
+                if self.counter is None:
+                    self.counter = self.fetch_counter()
+                operation = {"source": self.source, "counter": self.counter + 1, "contents": contents}
+                if now is not None or self.now is not None:
+                    operation["now"] = now if now is not None else self.now
+                try:
+                    status, receipt = self.pool.request("POST", "/injection/operation", operation)
+                except DISCONNECTED:
+                    # Le groupe a pu etre applique avant la coupure: ne le renvoyer
+                    # que si le compteur du compte n'a pas bouge sur le noeud
+                    sent, self.counter = self.counter, self.fetch_counter()
+                    if attempt or self.counter != sent:
+                        raise
+                    continue
+                if status == 200:
+                    self.counter += len(contents)
+                    return receipt
+                error = receipt.get("error") if isinstance(receipt, dict) else receipt
+                if error not in COUNTER_ERRORS or attempt:
+                    raise RpcError(status, error)
+                # Compteur modifie par un autre client du meme compte: relire et renvoyer
+                self.counter = None
+
+    def call(self, entrypoint, value, amount=0):
+        return self.inject([{"entrypoint": entrypoint, "value": value, "amount": amount}])
+
+    def batch(self):
+        return Batch(self)
+
+    def view(self, name, value=None):
+        status, result = self.pool.request(
+            "POST", "/chains/main/blocks/head/helpers/scripts/run_script_view", {"view": name, "input": value},
+            idempotent=True
+        )
+        if status != 200:
+            raise RpcError(status, result.get("error") if isinstance(result, dict) else result)
+        return result["data"]
+
+    def get_balance(self, address):
+        return self.view("get_balance", address)
+
+    def get_available_balance(self, address):
+        return self.view("get_available_balance", address)
+
+    def get_reserved_balance(self, address):
+        return self.view("get_reserved_balance", address)
+
+    def get_total_supply(self):
+        return self.view("get_total_supply")
+
+    def get_last_price(self):
+        return self.view("get_last_price")
+
+    def get_best_bid(self):
+        return self.view("get_best_bid")
+
+    def get_best_ask(self):
+        return self.view("get_best_ask")
+
+    def get_depth(self, levels):
+        return self.view("get_depth", levels)
+
+    def get_volume_24h(self):
+        return self.view("get_volume_24h")
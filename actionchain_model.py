@@ -0,0 +1,738 @@
+"""
+Modele Python de reference d'ActionChain Token
+
+Reproduit en memoire la semantique de main.ActionChainToken (soldes libres et
+bloques, carnet d'ordres prix-temps, execution au prix du vendeur, paiements
+en tez, statistiques) sans passer par SmartPy, pour rejouer des millions
+d'ordres en quelques secondes.
+
+Les niveaux de prix sont des files FIFO indexees par tick et chainees a leurs
+voisins, comme dans le contrat: un nouveau niveau est insere d'apres l'indice
+(hint) donne par l'appelant, verifie en O(1). Les ordres annules ou executes
+hors tete de file sont marques vides et ignores lors du parcours (suppression
+paresseuse), ce qui garde toutes les operations en O(1) amorti.
+
+Chaque entrypoint leve ContractError avec le message du contrat en cas
+d'echec, et renvoie les transferts de tez emis {adresse: mutez}. Les
+echanges entre le modele et le contrat sont verifies par test_model.py.
+"""
+
+import random
+from collections import deque
+
+TICK_SIZE = 10000  # mutez: 2 decimales maximum
+
+
+class ContractError(Exception):
+    """Echec d'une operation, avec le message d'erreur du contrat"""
+
+
+def _item_undo(container, key):
+    """Entree du journal qui remet container[key] dans son etat actuel"""
+    if key in container:
+        return (container.__setitem__, key, container[key])
+    return (container.pop, key, None)
+
+
+class Order:
+    """Ordre en attente dans le carnet"""
+    __slots__ = ("order_id", "trader", "tick", "timestamp", "quantity", "is_buy")
+
+    def __init__(self, order_id, trader, tick, timestamp, quantity, is_buy):
+        self.order_id = order_id
+        self.trader = trader
+        self.tick = tick
+        self.timestamp = timestamp
+        self.quantity = quantity  # 0: ordre retire, en attente de purge de la file
+        self.is_buy = is_buy
+
+
+class Level:
+    """Niveau de prix: file FIFO d'ordres, quantite totale en attente et niveaux voisins"""
+    __slots__ = ("orders", "quantity", "better", "worse")
+
+    def __init__(self, better, worse):
+        self.orders = deque()
+        self.quantity = 0
+        self.better = better  # Tick voisin plus proche du meilleur prix
+        self.worse = worse    # Tick voisin plus eloigne du meilleur prix
+
+    def head(self, journal=None):
+        orders = self.orders
+        while not orders[0].quantity:
+            purged = orders.popleft()
+            if journal is not None:
+                journal.append((orders.appendleft, purged))
+        return orders[0]
+
+
+class ActionChainModel:
+    """Etat et entrypoints d'un contrat ActionChainToken"""
+
+    def __init__(self, admin, initial_supply, token_name="ActionChain Token", token_symbol="ACT"):
+        # Token standard
+        self.balances = {admin: initial_supply}
+        self.reserved = {}
+        self.total_supply = initial_supply
+        self.admin = admin
+
+        # Systeme d'ordres
+        self.buy_orders = {}
+        self.sell_orders = {}
+        self.order_counter = 0
+
+        # Carnet d'ordres: tick -> Level, et meilleurs ticks de chaque cote
+        self.bid_levels = {}
+        self.ask_levels = {}
+        self.best_bid = None
+        self.best_ask = None
+        self.tick_size = TICK_SIZE
+
+        # Historique des trades
+        self.trades = {}
+        self.trade_counter = 0
+        self.trade_retention = 1000
+
+        # Bougies OHLCV
+        self.candles = {}
+        self.candle_seconds = 3600
+
+        # Statistiques
+        self.last_price = 1000000
+        self.volume_buckets = {}  # case -> [periode, volume]
+        self.volume_bucket_seconds = 3600
+        self.volume_bucket_count = 24
+
+        # Configuration
+        self.token_name = token_name
+        self.token_symbol = token_symbol
+        self.decimals = 6
+
+        # Solde en tez du contrat et horloge (sp.now)
+        self.balance = 0
+        self.now = 0
+
+        # Journal d'annulation d'une operation groupee en cours (voir _atomic)
+        self._journal = None
+
+    # Carnet d'ordres
+
+    def best_bid_tick(self):
+        return self.best_bid
+
+    def best_ask_tick(self):
+        return self.best_ask
+
+    def _neighbours(self, is_buy, tick, hint):
+        """Voisins (meilleur, moins bon) d'un nouveau niveau au tick d'apres l'indice
+        de l'appelant, comme add_to_book du contrat; None si l'indice est faux"""
+        if is_buy:
+            levels, better, worse = self.bid_levels, None, self.best_bid
+        else:
+            levels, better, worse = self.ask_levels, None, self.best_ask
+        if hint is not None:
+            neighbour = levels.get(hint)
+            if neighbour is None:
+                return None
+            if (hint > tick) == is_buy:
+                better, worse = hint, neighbour.worse
+            else:
+                better, worse = neighbour.better, hint
+        if is_buy:
+            if (better is not None and better <= tick) or (worse is not None and worse >= tick):
+                return None
+        elif (better is not None and better >= tick) or (worse is not None and worse <= tick):
+            return None
+        return better, worse
+
+    def level_hint(self, is_buy, tick):
+        """Indice a donner pour un ordre au tick: le niveau voisin meilleur, ou None
+        si le niveau existe deja ou deviendrait le meilleur prix.
+
+        Parcourt les niveaux depuis le meilleur prix (hors chaine, chez l'appelant).
+        """
+        levels = self.bid_levels if is_buy else self.ask_levels
+        if tick in levels:
+            return None
+        better = None
+        current = self.best_bid if is_buy else self.best_ask
+        while current is not None and (current > tick if is_buy else current < tick):
+            better = current
+            current = levels[current].worse
+        return better
+
+    def _link_level(self, is_buy, tick, level):
+        """Insere un niveau entre ses voisins (level.better et level.worse)"""
+        levels = self.bid_levels if is_buy else self.ask_levels
+        levels[tick] = level
+        if level.better is not None:
+            levels[level.better].worse = tick
+        elif is_buy:
+            self.best_bid = tick
+        else:
+            self.best_ask = tick
+        if level.worse is not None:
+            levels[level.worse].better = tick
+
+    def _unlink_level(self, is_buy, tick):
+        """Retire un niveau de la chaine de son cote"""
+        levels = self.bid_levels if is_buy else self.ask_levels
+        level = levels.pop(tick)
+        if level.better is not None:
+            levels[level.better].worse = level.worse
+        elif is_buy:
+            self.best_bid = level.worse
+        else:
+            self.best_ask = level.worse
+        if level.worse is not None:
+            levels[level.worse].better = level.better
+
+    def _add_to_book(self, order, hint=None):
+        levels = self.bid_levels if order.is_buy else self.ask_levels
+        journal = self._journal
+        level = levels.get(order.tick)
+        if level is None:
+            neighbours = self._neighbours(order.is_buy, order.tick, hint)
+            if neighbours is None:
+                raise ContractError("Indice de niveau invalide")
+            level = Level(*neighbours)
+            self._link_level(order.is_buy, order.tick, level)
+            if journal is not None:
+                journal.append((self._unlink_level, order.is_buy, order.tick))
+        if journal is not None:
+            journal.append((setattr, level, "quantity", level.quantity))
+            journal.append((level.orders.pop,))
+        level.orders.append(order)
+        level.quantity += order.quantity
+
+    def _consume_order(self, order, quantity):
+        """Deduit une quantite d'un ordre, et le retire du carnet s'il est epuise"""
+        if order.is_buy:
+            levels, orders = self.bid_levels, self.buy_orders
+        else:
+            levels, orders = self.ask_levels, self.sell_orders
+        journal = self._journal
+        level = levels[order.tick]
+        if journal is not None:
+            journal.append((setattr, order, "quantity", order.quantity))
+            journal.append((setattr, level, "quantity", level.quantity))
+        order.quantity -= quantity
+        if not order.quantity:
+            del orders[order.order_id]
+            if journal is not None:
+                journal.append((orders.__setitem__, order.order_id, order))
+        level.quantity -= quantity
+        if not level.quantity:
+            self._unlink_level(order.is_buy, order.tick)
+            if journal is not None:
+                journal.append((self._link_level, order.is_buy, order.tick, level))
+
+    def _settle_trade(self, buyer, seller, price, quantity):
+        """Echange les tokens, enregistre le trade et met a jour les statistiques"""
+        reserved = self.reserved
+        balances = self.balances
+        journal = self._journal
+        if journal is not None:
+            journal.append(_item_undo(reserved, seller))
+            journal.append(_item_undo(balances, buyer))
+        seller_reserved = reserved[seller] - quantity
+        if seller_reserved:
+            reserved[seller] = seller_reserved
+        else:
+            del reserved[seller]
+        balances[buyer] = balances.get(buyer, 0) + quantity
+
+        now = self.now
+        counter = self.trade_counter
+        retention = self.trade_retention
+        if retention > 0:
+            if journal is not None:
+                journal.append(_item_undo(self.trades, counter))
+                if counter >= retention:
+                    journal.append(_item_undo(self.trades, counter - retention))
+            # Champs de t_trade: (buyer, seller, price, quantity, timestamp)
+            self.trades[counter] = (buyer, seller, price, quantity, now)
+            if counter >= retention:
+                self.trades.pop(counter - retention, None)
+        self.trade_counter = counter + 1
+
+        candle_period = now // self.candle_seconds
+        candle = self.candles.get(candle_period)
+        if journal is not None:
+            journal.append((self.candles.__setitem__, candle_period, dict(candle)) if candle is not None
+                           else (self.candles.pop, candle_period, None))
+        if candle is None:
+            self.candles[candle_period] = {
+                "open": price, "high": price, "low": price, "close": price,
+                "volume": quantity, "trades": 1
+            }
+        else:
+            if price > candle["high"]:
+                candle["high"] = price
+            if price < candle["low"]:
+                candle["low"] = price
+            candle["close"] = price
+            candle["volume"] += quantity
+            candle["trades"] += 1
+
+        self.last_price = price
+
+        period = now // self.volume_bucket_seconds
+        slot = period % self.volume_bucket_count
+        bucket = self.volume_buckets.get(slot)
+        if journal is not None:
+            journal.append((self.volume_buckets.__setitem__, slot, list(bucket)) if bucket is not None
+                           else (self.volume_buckets.pop, slot, None))
+        if bucket is not None and bucket[0] == period:
+            bucket[1] += quantity
+        else:
+            self.volume_buckets[slot] = [period, quantity]
+
+    def _place_order(self, sender, is_buy, price, quantity, max_fills, due, hint=None):
+        """Execute un ordre contre le carnet (au plus max_fills fois) et place le reste.
+
+        Complete les paiements dus et renvoie le nombre d'executions.
+        """
+        if quantity <= 0:
+            raise ContractError("Quantite doit etre positive")
+        if price <= 0:
+            raise ContractError("Prix doit etre positif")
+        tick, remainder = divmod(price, self.tick_size)
+        if remainder:
+            raise ContractError("Prix doit avoir maximum 2 decimales")
+        if (self._journal is None and tick not in (self.bid_levels if is_buy else self.ask_levels)
+                and self._neighbours(is_buy, tick, hint) is None):
+            # L'execution ne touche pas le cote de l'ordre: l'indice sera encore faux
+            # si l'ordre garde un reste. L'executer sous journal pour annuler ses
+            # ecritures dans ce cas, comme l'echec du contrat
+            return self._atomic(self._place_order, sender, is_buy, price, quantity, max_fills, due, hint)
+
+        tick_size = self.tick_size
+        remaining = quantity
+        fills = 0
+        if is_buy:
+            refund = 0
+            while remaining and fills < max_fills:
+                ask_tick = self.best_ask
+                if ask_tick is None or ask_tick > tick:
+                    break
+                sell_order = self.ask_levels[ask_tick].head(self._journal)
+                seller = sell_order.trader
+                trade_quantity = sell_order.quantity if sell_order.quantity < remaining else remaining
+                trade_price = tick_size * ask_tick
+
+                self._settle_trade(sender, seller, trade_price, trade_quantity)
+                due[seller] = due.get(seller, 0) + trade_price * trade_quantity
+                refund += tick_size * (tick - ask_tick) * trade_quantity
+                self._consume_order(sell_order, trade_quantity)
+
+                remaining -= trade_quantity
+                fills += 1
+
+            # Rembourser l'ecart entre le prix offert et les prix d'execution
+            due[sender] = due.get(sender, 0) + refund
+        else:
+            balance = self.balances.get(sender, 0)
+            if balance < quantity:
+                raise ContractError("Solde insuffisant")
+
+            # Bloquer les tokens mis en vente jusqu'a execution ou annulation
+            if self._journal is not None:
+                self._journal.append(_item_undo(self.balances, sender))
+                self._journal.append(_item_undo(self.reserved, sender))
+            if balance == quantity:
+                self.balances.pop(sender, None)
+            else:
+                self.balances[sender] = balance - quantity
+            self.reserved[sender] = self.reserved.get(sender, 0) + quantity
+
+            proceeds = 0
+            while remaining and fills < max_fills:
+                bid_tick = self.best_bid
+                if bid_tick is None or bid_tick < tick:
+                    break
+                buy_order = self.bid_levels[bid_tick].head(self._journal)
+                buyer = buy_order.trader
+                trade_quantity = buy_order.quantity if buy_order.quantity < remaining else remaining
+
+                self._settle_trade(buyer, sender, price, trade_quantity)
+                proceeds += price * trade_quantity
+                due[buyer] = due.get(buyer, 0) + tick_size * (bid_tick - tick) * trade_quantity
+                self._consume_order(buy_order, trade_quantity)
+
+                remaining -= trade_quantity
+                fills += 1
+
+            due[sender] = due.get(sender, 0) + proceeds
+
+        # Le reste de l'ordre attend dans le carnet
+        if remaining:
+            order_id = self.order_counter
+            order = Order(order_id, sender, tick, self.now, remaining, is_buy)
+            orders = self.buy_orders if is_buy else self.sell_orders
+            orders[order_id] = order
+            if self._journal is not None:
+                self._journal.append((orders.pop, order_id, None))
+            self._add_to_book(order, hint)
+        self.order_counter += 1
+        return fills
+
+    def _fill_pair(self, buy_order_id, sell_order_id):
+        buy_order = self.buy_orders.get(buy_order_id)
+        if buy_order is None:
+            raise ContractError("Ordre d'achat introuvable")
+        sell_order = self.sell_orders.get(sell_order_id)
+        if sell_order is None:
+            raise ContractError("Ordre de vente introuvable")
+        if buy_order.tick < sell_order.tick:
+            raise ContractError("Prix incompatibles")
+
+        trade_quantity = min(buy_order.quantity, sell_order.quantity)
+        trade_price = self.tick_size * sell_order.tick  # Prix du vendeur
+        buyer, seller = buy_order.trader, sell_order.trader
+        refund = self.tick_size * (buy_order.tick - sell_order.tick) * trade_quantity
+
+        self._settle_trade(buyer, seller, trade_price, trade_quantity)
+        self._consume_order(buy_order, trade_quantity)
+        self._consume_order(sell_order, trade_quantity)
+        return seller, trade_price * trade_quantity, buyer, refund
+
+    def _remove_order(self, sender, order_id, order_type):
+        """Retire un ordre de l'appelant du carnet et renvoie le montant a rembourser"""
+        orders = self.buy_orders if order_type == "buy" else self.sell_orders
+        order = orders.get(order_id)
+        if order is None:
+            raise ContractError("Ordre introuvable")
+        if order.trader != sender:
+            raise ContractError("Pas autorise")
+
+        quantity = order.quantity
+        self._consume_order(order, quantity)
+        if order.is_buy:
+            return self.tick_size * order.tick * quantity
+
+        # Debloquer les tokens du vendeur
+        if self._journal is not None:
+            self._journal.append(_item_undo(self.reserved, sender))
+            self._journal.append(_item_undo(self.balances, sender))
+        reserved = self.reserved[sender] - quantity
+        if reserved:
+            self.reserved[sender] = reserved
+        else:
+            del self.reserved[sender]
+        self.balances[sender] = self.balances.get(sender, 0) + quantity
+        return 0
+
+    def _send(self, payouts):
+        """Un transfert par destinataire, les montants nuls ne sont pas envoyes"""
+        sent = {}
+        total = 0
+        for address, value in payouts.items():
+            if value:
+                sent[address] = value
+                total += value
+        self.balance -= total
+        return sent
+
+    def _atomic(self, operation, *args):
+        """Execute une operation groupee en annulant ses ecritures si elle echoue.
+
+        Pendant l'operation, chaque ecriture ajoute au journal de quoi remettre
+        la valeur precedente: le cout est proportionnel a ce que l'operation
+        modifie, pas a la taille de l'etat.
+        """
+        journal = self._journal = [(setattr, self, name, getattr(self, name))
+                                   for name in ("order_counter", "trade_counter", "last_price")]
+        try:
+            return operation(*args)
+        except ContractError:
+            for undo, *undo_args in reversed(journal):
+                undo(*undo_args)
+            raise
+        finally:
+            self._journal = None
+
+    @staticmethod
+    def _require_no_amount(amount):
+        if amount:
+            raise ContractError("Pas de transfert autorise")
+
+    # Entrypoints
+
+    def place_buy_order(self, sender, price, quantity, max_fills, hint=None, amount=None, now=None):
+        """Place un ordre d'achat; `amount` vaut par defaut le depot exact"""
+        if now is not None:
+            self.now = now
+        if amount is None:
+            amount = price * quantity
+        elif amount != price * quantity:
+            raise ContractError("Montant incorrect")
+        due = {}
+        self._place_order(sender, True, price, quantity, max_fills, due, hint)
+        self.balance += amount
+        return self._send(due)
+
+    def place_sell_order(self, sender, price, quantity, max_fills, hint=None, amount=0, now=None):
+        if now is not None:
+            self.now = now
+        self._require_no_amount(amount)
+        due = {}
+        self._place_order(sender, False, price, quantity, max_fills, due, hint)
+        return self._send(due)
+
+    def place_orders(self, sender, orders, max_fills, amount=None, now=None):
+        """Place une liste de dicts {order_type, price, quantity, hint} avec un budget commun"""
+        if now is not None:
+            self.now = now
+        total_amount = sum(order["price"] * order["quantity"] for order in orders
+                           if order["order_type"] == "buy")
+        if amount is None:
+            amount = total_amount
+        elif amount != total_amount:
+            raise ContractError("Montant incorrect")
+
+        def run():
+            due = {}
+            fills_left = max_fills
+            for order in orders:
+                fills_left -= self._place_order(
+                    sender, order["order_type"] == "buy", order["price"], order["quantity"],
+                    fills_left, due, order.get("hint")
+                )
+            return due
+
+        due = self._atomic(run)
+        self.balance += amount
+        return self._send(due)
+
+    def execute_trade(self, sender, buy_order_id, sell_order_id, amount=0, now=None):
+        if now is not None:
+            self.now = now
+        seller, proceeds, buyer, refund = self._fill_pair(buy_order_id, sell_order_id)
+        self.balance += amount
+        # Le contrat envoie deux transferts, meme vers une seule adresse
+        self.balance -= proceeds + refund
+        sent = {seller: proceeds}
+        if refund:
+            sent[buyer] = sent.get(buyer, 0) + refund
+        return sent
+
+    def execute_trades(self, sender, pairs, amount=0, now=None):
+        """Execute une liste de dicts {buy_order_id, sell_order_id}"""
+        if now is not None:
+            self.now = now
+
+        def run():
+            due = {}
+            for pair in pairs:
+                seller, proceeds, buyer, refund = self._fill_pair(
+                    pair["buy_order_id"], pair["sell_order_id"]
+                )
+                due[seller] = due.get(seller, 0) + proceeds
+                due[buyer] = due.get(buyer, 0) + refund
+            return due
+
+        due = self._atomic(run)
+        self.balance += amount
+        return self._send(due)
+
+    def cancel_order(self, sender, order_id, order_type, amount=0, now=None):
+        if now is not None:
+            self.now = now
+        refund = self._remove_order(sender, order_id, order_type)
+        self.balance += amount
+        return self._send({sender: refund})
+
+    def cancel_orders(self, sender, orders, amount=0, now=None):
+        """Annule une liste de dicts {order_id, order_type} avec un seul remboursement"""
+        if now is not None:
+            self.now = now
+        refund = self._atomic(lambda: sum(
+            self._remove_order(sender, order["order_id"], order["order_type"]) for order in orders
+        ))
+        self.balance += amount
+        return self._send({sender: refund})
+
+    def transfer(self, sender, to_address, amount, tez=0, now=None):
+        if now is not None:
+            self.now = now
+        self._require_no_amount(tez)
+        balance = self.balances.get(sender, 0)
+        if balance < amount:
+            raise ContractError("Solde insuffisant")
+        # Comme le contrat: le solde du destinataire est lu avant le debit
+        receiver_balance = self.balances.get(to_address, 0)
+        if balance == amount:
+            self.balances.pop(sender, None)
+        else:
+            self.balances[sender] = balance - amount
+        self.balances[to_address] = receiver_balance + amount
+        return {}
+
+    def set_trade_retention(self, sender, trade_retention, amount=0, now=None):
+        if now is not None:
+            self.now = now
+        if sender != self.admin:
+            raise ContractError("Seul l'admin peut configurer")
+        self.trade_retention = trade_retention
+        self.balance += amount
+        return {}
+
+    def prune_trades(self, sender, trade_ids, amount=0, now=None):
+        if now is not None:
+            self.now = now
+        for trade_id in trade_ids:
+            if trade_id + self.trade_retention >= self.trade_counter:
+                raise ContractError("Trade encore conserve")
+        for trade_id in trade_ids:
+            self.trades.pop(trade_id, None)
+        self.balance += amount
+        return {}
+
+    def mint(self, sender, to_address, amount, tez=0, now=None):
+        if now is not None:
+            self.now = now
+        if sender != self.admin:
+            raise ContractError("Seul l'admin peut mint")
+        self._require_no_amount(tez)
+        self.balances[to_address] = self.balances.get(to_address, 0) + amount
+        self.total_supply += amount
+        return {}
+
+    def burn(self, sender, amount, tez=0, now=None):
+        if now is not None:
+            self.now = now
+        self._require_no_amount(tez)
+        balance = self.balances.get(sender, 0)
+        if balance < amount:
+            raise ContractError("Solde insuffisant")
+        if balance == amount:
+            self.balances.pop(sender, None)
+        else:
+            self.balances[sender] = balance - amount
+        self.total_supply -= amount
+        return {}
+
+    def dispatch(self, sender, action, amount=0, now=None):
+        """Operation rare du contrat, {nom: argument}: {"mint": {to_address, amount}},
+        {"burn": quantite}, {"set_trade_retention": n}, {"prune_trades": [ids]} ou
+        {"cancel": [{order_id, order_type}, ...]}"""
+        (name, value), = action.items()
+        if name == "mint":
+            return self.mint(sender, value["to_address"], value["amount"], tez=amount, now=now)
+        if name == "burn":
+            return self.burn(sender, value, tez=amount, now=now)
+        if name == "cancel":
+            return self.cancel_orders(sender, value, amount=amount, now=now)
+        if name in ("set_trade_retention", "prune_trades"):
+            return getattr(self, name)(sender, value, amount=amount, now=now)
+        raise ContractError(f"Operation inconnue: {name}")
+
+    # Vues
+
+    def get_balance(self, address):
+        return self.balances.get(address, 0) + self.reserved.get(address, 0)
+
+    def get_available_balance(self, address):
+        return self.balances.get(address, 0)
+
+    def get_reserved_balance(self, address):
+        return self.reserved.get(address, 0)
+
+    def get_total_supply(self):
+        return self.total_supply
+
+    def get_last_price(self):
+        return self.last_price
+
+    def get_best_bid(self):
+        tick = self.best_bid
+        if tick is None:
+            return None
+        return {"price": self.tick_size * tick, "quantity": self.bid_levels[tick].quantity}
+
+    def get_best_ask(self):
+        tick = self.best_ask
+        if tick is None:
+            return None
+        return {"price": self.tick_size * tick, "quantity": self.ask_levels[tick].quantity}
+
+    def get_depth(self, levels):
+        count = min(levels, 100)
+
+        def side(levels, tick):
+            depth = []
+            while tick is not None and len(depth) < count:
+                level = levels[tick]
+                depth.append({"price": self.tick_size * tick, "quantity": level.quantity})
+                tick = level.worse
+            return depth
+
+        return {"bids": side(self.bid_levels, self.best_bid), "asks": side(self.ask_levels, self.best_ask)}
+
+    def get_volume_24h(self, now=None):
+        period = (self.now if now is None else now) // self.volume_bucket_seconds
+        return sum(volume for bucket_period, volume in self.volume_buckets.values()
+                   if bucket_period + self.volume_bucket_count > period)
+
+    def order_quantity(self, order_id):
+        """Quantite restante d'un ordre en attente (None s'il n'est plus dans le carnet)"""
+        order = self.buy_orders.get(order_id) or self.sell_orders.get(order_id)
+        return order.quantity if order is not None else None
+
+
+def random_flow(model, traders, count, seed=0, mid_tick=100, spread=20, cancel_ratio=0.2):
+    """Genere `count` operations aleatoires (placements et annulations) valides pour `model`.
+
+    Chaque operation est un tuple (entrypoint, kwargs) a appliquer au contrat
+    ou a un autre modele; `model` est mis a jour au fil de la generation.
+    """
+    rng = random.Random(seed)
+    open_orders = []
+    for _ in range(count):
+        if open_orders and rng.random() < cancel_ratio:
+            index = rng.randrange(len(open_orders))
+            open_orders[index], open_orders[-1] = open_orders[-1], open_orders[index]
+            order_id, order_type, trader = open_orders.pop()
+            if model.order_quantity(order_id) is None:
+                continue  # Deja execute
+            call = ("cancel_order", {"sender": trader, "order_id": order_id, "order_type": order_type})
+            model.cancel_order(**call[1])
+        else:
+            trader = rng.choice(traders)
+            is_buy = rng.random() < 0.5
+            price = (mid_tick + rng.randint(-spread, spread)) * model.tick_size
+            quantity = rng.randint(1, 50)
+            if not is_buy and model.get_available_balance(trader) < quantity:
+                is_buy = True
+            entrypoint = "place_buy_order" if is_buy else "place_sell_order"
+            call = (entrypoint, {"sender": trader, "price": price, "quantity": quantity, "max_fills": 10,
+                                 "hint": model.level_hint(is_buy, price // model.tick_size)})
+            order_id = model.order_counter
+            getattr(model, entrypoint)(**call[1])
+            if model.order_quantity(order_id) is not None:
+                open_orders.append((order_id, "buy" if is_buy else "sell", trader))
+        yield call
+
+
+if __name__ == "__main__":
+    import time
+
+    traders = ["trader%d" % i for i in range(100)]
+
+    def funded_model():
+        model = ActionChainModel("admin", 0)
+        for trader in traders:
+            model.mint("admin", trader, 10 ** 9)
+        return model
+
+    calls = list(random_flow(funded_model(), traders, 1_000_000))
+    model = funded_model()
+    started = time.perf_counter()
+    for entrypoint, kwargs in calls:
+        getattr(model, entrypoint)(**kwargs)
+    elapsed = time.perf_counter() - started
+
+    print(f"{len(calls)} operations en {elapsed:.2f} s: {len(calls) / elapsed:,.0f} ops/s")
+    print(f"Trades: {model.trade_counter}, ordres en attente: "
+          f"{len(model.buy_orders) + len(model.sell_orders)}")
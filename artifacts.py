@@ -0,0 +1,226 @@
+"""
+Cache des artefacts compiles d'ActionChain Token
+
+Le Michelson et le stockage initial d'ActionChainToken sont ranges sous
+.artifacts/ avec pour cle un hash du source du contrat, des arguments du
+constructeur et de la version de SmartPy: un build, un benchmark ou un
+deploiement sans changement reutilise le resultat sans relancer SmartPy.
+
+Les scripts de test sont traites de la meme facon: un script qui a reussi
+n'est pas relance tant que ni lui, ni le contrat, ni les modules locaux
+qu'il importe n'ont change.
+
+Usage:
+    python artifacts.py compile --output output/
+    python artifacts.py compile --admin tz1... --initial-supply 1000000
+    python artifacts.py test ActionChain.py test_complete.py deploy.py
+    python artifacts.py clean
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from importlib import metadata
+
+PYTHON = os.environ.get("SMARTPY_PYTHON", sys.executable)
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".artifacts")
+CONTRACT_SOURCE = "ActionChain.py"
+
+COMPILE_SCRIPT = """
+import sys
+sys.path.insert(0, {source_dir!r})
+import smartpy as sp
+from ActionChain import main
+
+admin = {admin!r}
+@sp.add_test()
+def acbuild():
+    scenario = sp.test_scenario("acbuild", main)
+    scenario += main.ActionChainToken(
+        admin=sp.address(admin) if admin[:2] in ("tz", "KT") else sp.test_account(admin).address,
+        initial_supply={initial_supply!r},
+        token_name={token_name!r},
+        token_symbol={token_symbol!r}
+    )
+"""
+
+
+def smartpy_version():
+    for name in ("smartpy-tezos", "smartpy"):
+        try:
+            return metadata.version(name)
+        except metadata.PackageNotFoundError:
+            continue
+    return "inconnue"
+
+
+def artifact_key(source_dir, **arguments):
+    """Hash du source du contrat, des arguments du constructeur et du compilateur"""
+    digest = hashlib.sha256()
+    with open(os.path.join(source_dir, CONTRACT_SOURCE), "rb") as f:
+        digest.update(f.read())
+    digest.update(COMPILE_SCRIPT.encode())
+    digest.update(json.dumps(arguments, sort_keys=True).encode())
+    digest.update(smartpy_version().encode())
+    return digest.hexdigest()[:32]
+
+
+def run_compiler(source_dir, admin, initial_supply, token_name, token_symbol):
+    """Compile ActionChainToken avec SmartPy et renvoie (code, storage) en Michelson"""
+    work_dir = tempfile.mkdtemp(prefix="acbuild-")
+    try:
+        script = os.path.join(work_dir, "acbuild.py")
+        with open(script, "w") as f:
+            f.write(COMPILE_SCRIPT.format(
+                source_dir=os.path.abspath(source_dir),
+                admin=admin,
+                initial_supply=initial_supply,
+                token_name=token_name,
+                token_symbol=token_symbol
+            ))
+        result = subprocess.run([PYTHON, script], cwd=work_dir, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError("Echec de la compilation SmartPy (code %d):\n%s"
+                               % (result.returncode, result.stderr.strip() or result.stdout.strip()))
+
+        # SmartPy ecrit ses sorties sous le repertoire courant, ici work_dir
+        candidates = glob.glob(os.path.join(work_dir, "**", "*contract.tz"), recursive=True)
+        candidates.sort(key=lambda path: ("acbuild" not in path, -os.path.getmtime(path)))
+        if not candidates:
+            raise RuntimeError("Aucun contrat compile trouve dans les sorties SmartPy")
+
+        code_path = candidates[0]
+        storage_path = code_path[:-len("contract.tz")] + "storage.tz"
+        with open(code_path) as f:
+            code = f.read()
+        with open(storage_path) as f:
+            storage = f.read()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return code, storage
+
+
+def compile_contract(source_dir=".", admin="Admin", initial_supply=1_000_000,
+                     token_name="ActionChain Token", token_symbol="ACT", cache_dir=CACHE_DIR):
+    """Renvoie (code, storage) en Michelson, depuis le cache si le source n'a pas change.
+
+    `admin` est une adresse (tz1..., KT1...) ou le nom d'un sp.test_account.
+    """
+    arguments = {"admin": admin, "initial_supply": initial_supply,
+                 "token_name": token_name, "token_symbol": token_symbol}
+    entry = os.path.join(cache_dir, artifact_key(source_dir, **arguments))
+    code_path = os.path.join(entry, "contract.tz")
+    storage_path = os.path.join(entry, "storage.tz")
+    if os.path.exists(code_path) and os.path.exists(storage_path):
+        with open(code_path) as f:
+            code = f.read()
+        with open(storage_path) as f:
+            storage = f.read()
+        return code, storage
+
+    code, storage = run_compiler(source_dir, **arguments)
+    # Ecriture dans un repertoire temporaire puis renommage: pas d'entree a moitie ecrite
+    os.makedirs(cache_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix="tmp-", dir=cache_dir)
+    with open(os.path.join(staging, "contract.tz"), "w") as f:
+        f.write(code)
+    with open(os.path.join(staging, "storage.tz"), "w") as f:
+        f.write(storage)
+    with open(os.path.join(staging, "arguments.json"), "w") as f:
+        json.dump(dict(arguments, smartpy=smartpy_version()), f, indent=2)
+    try:
+        os.rename(staging, entry)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)  # Deja ecrit par un autre processus
+    return code, storage
+
+
+def local_imports(path, source_dir):
+    """Modules du projet importes par un script (recursivement)"""
+    seen = set()
+    pending = [path]
+    while pending:
+        with open(pending.pop()) as f:
+            source = f.read()
+        for module in re.findall(r"^\s*(?:from|import)\s+(\w+)", source, re.MULTILINE):
+            module_path = os.path.join(source_dir, module + ".py")
+            if module_path not in seen and os.path.exists(module_path):
+                seen.add(module_path)
+                pending.append(module_path)
+    return seen
+
+
+def test_key(script, source_dir="."):
+    digest = hashlib.sha256()
+    for path in sorted({os.path.join(source_dir, script)} | local_imports(os.path.join(source_dir, script), source_dir)):
+        digest.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    digest.update(smartpy_version().encode())
+    return digest.hexdigest()[:32]
+
+
+def test_stamp(script, source_dir=".", cache_dir=CACHE_DIR):
+    """Fichier temoin du dernier succes d'un script de test avec ses sources actuelles"""
+    return os.path.join(cache_dir, "tests", test_key(script, source_dir))
+
+
+def mark_passed(script, source_dir=".", cache_dir=CACHE_DIR):
+    stamp = test_stamp(script, source_dir, cache_dir)
+    os.makedirs(os.path.dirname(stamp), exist_ok=True)
+    with open(stamp, "w") as f:
+        f.write(script + "\n")
+
+
+def run_test(script, source_dir=".", cache_dir=CACHE_DIR):
+    """Lance un script de test sauf s'il a deja reussi avec les memes sources; renvoie True si lance"""
+    if os.path.exists(test_stamp(script, source_dir, cache_dir)):
+        return False
+    subprocess.run([PYTHON, script], cwd=source_dir, check=True)
+    mark_passed(script, source_dir, cache_dir)
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cache des artefacts compiles d'ActionChain Token")
+    commands = parser.add_subparsers(dest="command", required=True)
+    compile_parser = commands.add_parser("compile", help="compiler (ou reprendre du cache) le contrat")
+    compile_parser.add_argument("--admin", default="Admin", help="adresse ou nom de sp.test_account")
+    compile_parser.add_argument("--initial-supply", type=int, default=1_000_000)
+    compile_parser.add_argument("--token-name", default="ActionChain Token")
+    compile_parser.add_argument("--token-symbol", default="ACT")
+    compile_parser.add_argument("--output", help="repertoire ou copier contract.tz et storage.tz")
+    test_parser = commands.add_parser("test", help="lancer les scripts de test modifies")
+    test_parser.add_argument("scripts", nargs="+")
+    commands.add_parser("clean", help="vider le cache")
+    args = parser.parse_args()
+
+    if args.command == "compile":
+        started = time.perf_counter()
+        code, storage = compile_contract(".", args.admin, args.initial_supply, args.token_name, args.token_symbol)
+        print(f"Contrat pret en {time.perf_counter() - started:.2f} s ({len(code)} octets de Michelson)")
+        if args.output:
+            os.makedirs(args.output, exist_ok=True)
+            with open(os.path.join(args.output, "ActionChain_contract.tz"), "w") as f:
+                f.write(code)
+            with open(os.path.join(args.output, "ActionChain_storage.tz"), "w") as f:
+                f.write(storage)
+            print(f"Fichiers generes dans: {args.output}")
+    elif args.command == "test":
+        for script in args.scripts:
+            try:
+                ran = run_test(script)
+            except subprocess.CalledProcessError:
+                print(f"{script}: echec")
+                sys.exit(1)
+            print(f"{script}: {'ok' if ran else 'inchange, ignore'}")
+    else:
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
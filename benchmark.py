@@ -0,0 +1,367 @@
+"""
+Mesure du cout en gas et en stockage des entrypoints d'ActionChain Token
+
+Le contrat est compile avec SmartPy (ou repris du cache d'artifacts.py) puis
+execute dans le mode mockup d'octez-client, dont les recus donnent le gas
+consomme et la taille de stockage payee par chaque operation.
+
+Chaque entrypoint est mesure sur des carnets de 0, 100, 1000 et 10000 ordres
+en attente. Le rapport JSON peut etre conserve comme reference: les hausses
+de gas ou de stockage paye par rapport a cette reference sont signalees et
+font echouer la commande. Aucun rapport de reference n'est versionne: le
+produire avec --output sur la revision de reference (voir le README).
+
+Usage:
+    python benchmark.py                              # Mesure de l'arbre courant
+    python benchmark.py --rev HEAD~1                 # Mesure d'une autre revision git
+    python benchmark.py --output bench.json          # Rapport JSON
+    python benchmark.py --baseline bench.json        # Comparaison a une reference
+    python benchmark.py --baseline-rev HEAD~1        # Comparaison a la revision HEAD~1
+    python benchmark.py --baseline-rev HEAD~1 --report hot
+                                                     # Gas par appel chaud (place_*, execute_trade,
+                                                     # transfer) avant/apres
+    python benchmark.py --baseline-rev HEAD~1 --report orders
+                                                     # Placement, execution et annulation avant/apres
+    python benchmark.py --sizes 0 100                # Carnets plus petits
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import michelson
+from artifacts import compile_contract
+
+OCTEZ_CLIENT = os.environ.get("OCTEZ_CLIENT", "octez-client")
+PYTHON = os.environ.get("SMARTPY_PYTHON", sys.executable)
+
+# Comptes bootstrap du mode mockup
+BOOTSTRAP = {
+    "bootstrap1": "tz1KqTpEZ7Yob7QbPE4Hy4Wo8fHG8LhKxZSx",
+    "bootstrap2": "tz1gjaF81ZRRvdzjobyfVNsAeSC6PScjfQwN",
+    "bootstrap3": "tz1faswCTDciRzE4oJ9jn2Vm2dvjeyA9fUzU",
+    "bootstrap4": "tz1b7tUupMgCNw2cCLpKTkSD1NZzB5TkP2sv",
+    "bootstrap5": "tz1ddb9NMYHZi5UzPdzTZMYQQZoMub195zgv",
+}
+
+ADMIN = "bootstrap1"
+
+TICK_SIZE = 10000
+BOOK_SIZES = (0, 100, 1000, 10000)
+BOOK_LEVELS = 50   # Niveaux de prix de chaque cote du carnet prerempli
+BOOK_BATCH = 20    # Ordres par place_orders lors du preremplissage
+MID_TICK = 100
+
+# Operations d'un trader a chaque ordre ou echange (par opposition aux
+# annulations et a l'administration)
+HOT_OPERATIONS = (
+    "place_buy_order_new_level", "place_buy_order_queued", "place_buy_order_fill",
+    "place_sell_order_new_level", "place_sell_order_queued", "place_sell_order_fill",
+    "execute_trade", "transfer"
+)
+
+# Operations rares, executees par les lambdas du contrat (dispatch)
+LAZY_OPERATIONS = ("mint", "burn", "set_trade_retention", "prune_trades")
+
+# Rapports avant/apres (--report): operations comparees a la reference
+REPORTS = {
+    # Appels chauds: le code qu'ils chargent ne contient plus les operations rares
+    "hot": HOT_OPERATIONS,
+    # Operations rares: cout du chargement de leur lambda
+    "cold": ("cancel_order", "cancel_orders") + LAZY_OPERATIONS,
+    # Disposition des ordres dans le stockage: placement, execution, annulation
+    "orders": (
+        "place_buy_order_new_level", "place_buy_order_queued", "place_buy_order_fill",
+        "place_sell_order_new_level", "place_sell_order_queued", "place_sell_order_fill",
+        "execute_trade", "cancel_order"
+    )
+}
+
+class Mockup:
+    """Instance octez-client en mode mockup avec un contrat ActionChainToken"""
+
+    def __init__(self, code, storage):
+        self.base_dir = tempfile.mkdtemp(prefix="acmockup-")
+        self.parameter_type = michelson.section(michelson.parse(code), "parameter")
+        self.entrypoints = michelson.entrypoints(self.parameter_type)
+        self.client("create", "mockup")
+
+        code_path = os.path.join(self.base_dir, "ActionChain.tz")
+        with open(code_path, "w") as f:
+            f.write(code)
+        self.origination = self.parse_receipt(self.client(
+            "originate", "contract", "act", "transferring", "0", "from", ADMIN,
+            "running", code_path, "--init", storage.strip(), "--burn-cap", "100"
+        ))
+        self.storage_size = self.origination["storage_size"] or 0
+        self.origination["storage_diff"] = self.storage_size
+
+    def client(self, *args):
+        result = subprocess.run(
+            [OCTEZ_CLIENT, "--mode", "mockup", "--base-dir", self.base_dir] + list(args),
+            check=True, capture_output=True, text=True
+        )
+        return result.stdout
+
+    def call(self, entrypoint, value, sender=ADMIN, amount=0):
+        """Appelle un entrypoint (valeur Python par nom de champ) et renvoie les metriques du recu"""
+        arg = michelson.to_text(michelson.encode(self.entrypoints[entrypoint], value))
+        output = self.client(
+            "transfer", "%d.%06d" % divmod(amount, 1_000_000), "from", sender, "to", "act",
+            "--entrypoint", entrypoint, "--arg", arg, "--burn-cap", "10"
+        )
+        receipt = self.parse_receipt(output)
+        # Variation de la taille totale du stockage depuis l'operation precedente
+        size = receipt["storage_size"] if receipt["storage_size"] is not None else self.storage_size
+        receipt["storage_diff"] = size - self.storage_size
+        self.storage_size = size
+        return receipt
+
+    @staticmethod
+    def parse_receipt(output):
+        """Extrait gas consomme, taille de stockage et stockage paye d'un recu octez-client"""
+        gas = sum(float(value) for value in re.findall(r"Consumed gas: ([\d.]+)", output))
+        sizes = re.findall(r"Storage size: (\d+) bytes", output)
+        paid = sum(int(value) for value in re.findall(r"Paid storage size diff: (\d+) bytes", output))
+        return {
+            "gas": gas,
+            "storage_size": int(sizes[0]) if sizes else None,
+            "paid_storage_diff": paid
+        }
+
+    def close(self):
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+
+def fill_book(mockup, size, trader=ADMIN):
+    """Place `size` ordres d'une unite: achats sous le prix milieu, ventes au-dessus.
+
+    Chaque niveau est cree juste derriere le precedent: son indice est le
+    niveau voisin plus proche du prix milieu (ignore si le niveau existe).
+    """
+    orders = []
+    for i in range(size):
+        distance = 1 + (i // 2) % BOOK_LEVELS
+        side = -1 if i % 2 == 0 else 1
+        orders.append({"order_type": "buy" if side < 0 else "sell",
+                       "price": (MID_TICK + side * distance) * TICK_SIZE, "quantity": 1,
+                       "hint": MID_TICK + side * (distance - 1) if distance > 1 else None})
+    for start in range(0, size, BOOK_BATCH):
+        batch = orders[start:start + BOOK_BATCH]
+        amount = sum(order["price"] for order in batch if order["order_type"] == "buy")
+        mockup.call("place_orders", {"orders": batch, "max_fills": 0}, sender=trader, amount=amount)
+
+
+def measure_entrypoints(mockup, size):
+    """Cout de chaque entrypoint sur un carnet de `size` ordres en attente"""
+    seller, buyer = ADMIN, "bootstrap2"
+    next_id = size
+    results = {"origination": mockup.origination}
+
+    # Dernier niveau prerempli de chaque cote (indice d'un ordre place derriere)
+    depth = min(BOOK_LEVELS, size // 2)
+    worst_bid = MID_TICK - depth if depth else None
+    worst_ask = MID_TICK + depth if depth else None
+
+    def order(tick, quantity, max_fills=10, hint=None):
+        return {"price": tick * TICK_SIZE, "quantity": quantity, "max_fills": max_fills, "hint": hint}
+
+    def buy(name, tick, quantity, max_fills=10, hint=None):
+        nonlocal next_id
+        results[name] = mockup.call(
+            "place_buy_order", order(tick, quantity, max_fills, hint),
+            sender=buyer, amount=tick * TICK_SIZE * quantity
+        )
+        next_id += 1
+        return next_id - 1
+
+    def sell(name, tick, quantity, max_fills=10, hint=None):
+        nonlocal next_id
+        results[name] = mockup.call("place_sell_order", order(tick, quantity, max_fills, hint), sender=seller)
+        next_id += 1
+        return next_id - 1
+
+    def lazy(name, value, sender=ADMIN):
+        # Une revision anterieure a dispatch a un entrypoint par operation rare
+        if "dispatch" in mockup.entrypoints:
+            results[name] = mockup.call("dispatch", {name: value}, sender=sender)
+        else:
+            results[name] = mockup.call(name, value, sender=sender)
+
+    # Token
+    lazy("mint", {"to_address": BOOTSTRAP[buyer], "amount": 1000})
+    results["transfer"] = mockup.call(
+        "transfer", {"to_address": BOOTSTRAP["bootstrap3"], "amount": 10}, sender=buyer
+    )
+    lazy("burn", 10, sender=buyer)
+
+    # Placement sans execution: derriere tous les niveaux, puis dans une file existante
+    worst_sell = sell("place_sell_order_new_level", MID_TICK + BOOK_LEVELS + 1, 10, hint=worst_ask)
+    queued_sell = sell("place_sell_order_queued", MID_TICK + 1, 10)
+    buy("place_buy_order_new_level", MID_TICK - BOOK_LEVELS - 1, 10, hint=worst_bid)
+    buy("place_buy_order_queued", MID_TICK - 1, 10)
+
+    # Placement avec execution contre le meilleur prix oppose
+    buy("place_buy_order_fill", MID_TICK + BOOK_LEVELS + 1, 1, max_fills=1)
+    sell("place_sell_order_fill", 1, 1, max_fills=1)
+
+    ladder = [
+        {"order_type": "buy", "price": (MID_TICK - 2) * TICK_SIZE, "quantity": 5, "hint": MID_TICK - 1},
+        {"order_type": "buy", "price": (MID_TICK - 3) * TICK_SIZE, "quantity": 5, "hint": MID_TICK - 2},
+        {"order_type": "sell", "price": (MID_TICK + 2) * TICK_SIZE, "quantity": 5, "hint": MID_TICK + 1},
+        {"order_type": "sell", "price": (MID_TICK + 3) * TICK_SIZE, "quantity": 5, "hint": MID_TICK + 2}
+    ]
+    results["place_orders"] = mockup.call(
+        "place_orders", {"orders": ladder, "max_fills": 0}, sender=seller,
+        amount=sum(o["price"] * o["quantity"] for o in ladder if o["order_type"] == "buy")
+    )
+    ladder_ids = list(range(next_id, next_id + len(ladder)))
+    next_id += len(ladder)
+
+    # Annulations
+    results["cancel_order"] = mockup.call(
+        "cancel_order", {"order_id": worst_sell, "order_type": "sell"}, sender=seller
+    )
+    results["cancel_orders"] = mockup.call("cancel_orders", [
+        {"order_id": ladder_ids[0], "order_type": "buy"},
+        {"order_id": ladder_ids[2], "order_type": "sell"}
+    ], sender=seller)
+
+    # Execution manuelle d'ordres croises laisses en attente (max_fills=0)
+    crossed = buy("place_buy_order_no_match", MID_TICK + 1, 2, max_fills=0)
+    results["execute_trade"] = mockup.call(
+        "execute_trade", {"buy_order_id": crossed, "sell_order_id": queued_sell}
+    )
+    crossed = [buy("place_buy_order_no_match", MID_TICK + 1, 1, max_fills=0) for _ in range(2)]
+    results["execute_trades"] = mockup.call("execute_trades", [
+        {"buy_order_id": order_id, "sell_order_id": queued_sell} for order_id in crossed
+    ])
+
+    # Administration de l'historique
+    lazy("set_trade_retention", 1)
+    lazy("prune_trades", [0])
+    return results
+
+
+def run_benchmark(code, storage, sizes=BOOK_SIZES):
+    """Mesure tous les entrypoints pour chaque taille de carnet (un mockup par taille)"""
+    results = {}
+    for size in sizes:
+        mockup = Mockup(code, storage)
+        try:
+            fill_book(mockup, size)
+            results[str(size)] = measure_entrypoints(mockup, size)
+        finally:
+            mockup.close()
+    return results
+
+
+def compare(results, baseline, tolerance=0.0):
+    """Liste les hausses de gas ou de stockage paye par rapport a un rapport de reference"""
+    regressions = []
+    for size, measured in results.items():
+        for name, metrics in measured.items():
+            previous = baseline.get(size, {}).get(name)
+            if previous is None:
+                continue
+            for key in ("gas", "paid_storage_diff"):
+                if metrics[key] > previous[key] * (1 + tolerance):
+                    regressions.append({
+                        "book_size": int(size), "operation": name, "metric": key,
+                        "baseline": previous[key], "current": metrics[key]
+                    })
+    return regressions
+
+
+def report(results, baseline, operations):
+    """Gas et stockage paye de reference et courants: {taille: {operation: {metrique: [avant, apres]}}}"""
+    rows = {}
+    for size, current in results.items():
+        previous = baseline.get(size, {})
+        rows[size] = {name: {key: [previous[name][key], current[name][key]] for key in ("gas", "paid_storage_diff")}
+                      for name in operations if name in current and name in previous}
+    return rows
+
+
+def print_comparison(name, rows):
+    print(f"\nRapport {name}: reference -> courant")
+    for size, operations in rows.items():
+        print(f"\nCarnet de {size} ordres")
+        print(f"{'Operation':<30} {'Gas avant':>12} {'Gas apres':>12} {'Paye avant':>11} {'Paye apres':>11}")
+        for operation, metrics in operations.items():
+            (gas_before, gas_after), (paid_before, paid_after) = metrics["gas"], metrics["paid_storage_diff"]
+            print(f"{operation:<30} {gas_before:>12.3f} {gas_after:>12.3f} {paid_before:>11} {paid_after:>11}")
+
+
+def checkout(rev):
+    """Extrait une revision git dans un repertoire temporaire"""
+    work_dir = tempfile.mkdtemp(prefix="acrev-")
+    subprocess.run(["git", "worktree", "add", "--detach", work_dir, rev], check=True, capture_output=True)
+    return work_dir
+
+
+def measure(rev, sizes):
+    """Compile la revision (arbre courant si None) et la mesure; renvoie (commit, resultats)"""
+    source_dir = checkout(rev) if rev else "."
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=source_dir,
+                                capture_output=True, text=True).stdout.strip()
+        code, storage = compile_contract(source_dir, admin=BOOTSTRAP[ADMIN])
+    finally:
+        if rev:
+            subprocess.run(["git", "worktree", "remove", "--force", source_dir], capture_output=True)
+    return commit, run_benchmark(code, storage, sizes)
+
+
+def print_report(results, regressions=()):
+    for size, operations in results.items():
+        print(f"\nCarnet de {size} ordres")
+        print(f"{'Operation':<30} {'Gas':>12} {'Stockage':>10} {'Diff':>7} {'Paye':>7}")
+        for name, metrics in operations.items():
+            print(f"{name:<30} {metrics['gas']:>12.3f} {metrics['storage_size'] or 0:>10} "
+                  f"{metrics['storage_diff']:>7} {metrics['paid_storage_diff']:>7}")
+    for regression in regressions:
+        print(f"REGRESSION {regression['operation']} (carnet {regression['book_size']}): "
+              f"{regression['metric']} {regression['baseline']} -> {regression['current']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark gas/stockage d'ActionChain Token")
+    parser.add_argument("--rev", help="revision git a mesurer (par defaut: arbre courant)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(BOOK_SIZES),
+                        help="tailles de carnet (ordres en attente)")
+    parser.add_argument("--output", help="rapport JSON de sortie")
+    parser.add_argument("--baseline", help="rapport JSON de reference a comparer")
+    parser.add_argument("--baseline-rev", help="revision git mesuree comme reference")
+    parser.add_argument("--tolerance", type=float, default=0.0,
+                        help="hausse relative toleree avant de signaler une regression")
+    parser.add_argument("--report", choices=sorted(REPORTS), action="append", default=[],
+                        help="compare ces operations a la reference, avant/apres (repetable)")
+    args = parser.parse_args()
+    if args.report and not (args.baseline or args.baseline_rev):
+        parser.error("--report demande --baseline ou --baseline-rev")
+
+    rev, results = measure(args.rev, args.sizes)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+    elif args.baseline_rev:
+        baseline = measure(args.baseline_rev, args.sizes)[1]
+    regressions = compare(results, baseline, args.tolerance) if baseline else []
+
+    print_report(results, regressions)
+    reports = {name: report(results, baseline, REPORTS[name]) for name in args.report}
+    for name, rows in reports.items():
+        print_comparison(name, rows)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"rev": rev, "book_sizes": args.sizes, "results": results,
+                       "regressions": regressions, "reports": reports}, f, indent=2)
+    sys.exit(1 if regressions else 0)
@@ -62,17 +62,11 @@ run_tests() {
     
     cd "$PROJECT_DIR"
     
-    # Test principal
-    log_info "Test du contrat principal..."
-    $VENV_PYTHON ActionChain.py
-    
-    # Tests complets
-    log_info "Tests complets..."
-    $VENV_PYTHON test_complete.py
-    
-    # Tests de déploiement
-    log_info "Tests de déploiement..."
-    $VENV_PYTHON deploy.py
+    # Scénarios exécutés en parallèle; les scripts dont ni le source ni le
+    # contrat n'ont changé depuis leur dernier succès sont ignorés (cache
+    # d'artifacts.py). Rapports: output/junit.xml et output/trace.json
+    log_info "Test du contrat principal, tests complets, déploiement, modèle Python..."
+    $VENV_PYTHON run_tests.py ActionChain.py test_complete.py deploy.py test_model.py
     
     log_success "Tous les tests sont passés!"
 }
@@ -86,28 +80,9 @@ compile_contract() {
     # Créer le dossier de sortie
     mkdir -p output
     
-    # Compiler avec SmartPy
-    log_info "Compilation avec SmartPy..."
-    $VENV_PYTHON -c "
-import smartpy as sp
-from ActionChain import main
-
-# Création du contrat pour compilation
-admin = sp.test_account('Admin')
-contract = main.ActionChainToken(
-    admin=admin.address,
-    initial_supply=1_000_000,
-    token_name='ActionChain Token',
-    token_symbol='ACT'
-)
-
-# Compilation
-scenario = sp.test_scenario('Compilation', main)
-scenario += contract
-
-print('Contrat compilé avec succès!')
-print(f'Fichiers générés dans: output/')
-"
+    # Compiler avec SmartPy, sauf si le cache contient déjà ce source
+    log_info "Compilation avec SmartPy (ou reprise du cache)..."
+    $VENV_PYTHON artifacts.py compile --output output/
     
     log_success "Compilation terminée"
 }
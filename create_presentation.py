@@ -4,24 +4,298 @@ ActionChain Token - Presentation Generator
 Creates a PDF presentation explaining the project, use case, and architecture
 """
 
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib.colors import HexColor, black, white, blue, green, red
-from reportlab.graphics.shapes import Drawing, Rect, Circle, Line, String
-from reportlab.graphics import renderPDF
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-from io import BytesIO
-import tempfile
+import argparse
+import hashlib
+import inspect
+import itertools
 import os
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from importlib import metadata
+from io import BytesIO
+
+from actionchain_model import TICK_SIZE
+
+# reportlab, matplotlib and numpy are imported where they are used: a run
+# whose figures are all cached never loads matplotlib
+FIGURE_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".artifacts", "figures")
+FIGURE_DPI = 300
+
+
+def draw_ui_mockup(plt, patches):
+    """Draw the dApp UI mockup on the current matplotlib figure"""
+    fig, ax = plt.subplots(figsize=(10, 8))
+    ax.set_xlim(0, 10)
+    ax.set_ylim(0, 8)
+    ax.axis('off')
+    
+    # Header
+    header = patches.Rectangle((0.5, 7), 9, 0.8, linewidth=2, 
+                             edgecolor='#2E86AB', facecolor='#2E86AB')
+    ax.add_patch(header)
+    ax.text(5, 7.4, 'ActionChain Token - Trading Interface', 
+            ha='center', va='center', color='white', fontsize=14, weight='bold')
+    
+    # Price display
+    price_box = patches.Rectangle((0.5, 6), 9, 0.8, linewidth=1, 
+                                edgecolor='#A23B72', facecolor='#F5F5F5')
+    ax.add_patch(price_box)
+    ax.text(2, 6.4, 'Prix Actuel: 1.20 ꜩ', ha='left', va='center', fontsize=12, weight='bold')
+    ax.text(8, 6.4, '+0.05 (+4.35%)', ha='right', va='center', color='green', fontsize=12)
+    
+    # Chart area
+    chart_box = patches.Rectangle((0.5, 3.5), 4, 2.3, linewidth=1, 
+                                edgecolor='gray', facecolor='white')
+    ax.add_patch(chart_box)
+    ax.text(2.5, 5.5, 'Graphique des Prix', ha='center', va='center', fontsize=11, weight='bold')
+    ax.text(2.5, 4.5, '📈', ha='center', va='center', fontsize=30)
+    
+    # Orderbook
+    orderbook_box = patches.Rectangle((5, 3.5), 4.5, 2.3, linewidth=1, 
+                                    edgecolor='gray', facecolor='white')
+    ax.add_patch(orderbook_box)
+    ax.text(7.25, 5.5, 'Carnet d\'Ordres', ha='center', va='center', fontsize=11, weight='bold')
+    
+    # Sell orders
+    sell_box = patches.Rectangle((5.2, 4.8), 2, 0.8, linewidth=1, 
+                               edgecolor='red', facecolor='#ffe6e6')
+    ax.add_patch(sell_box)
+    ax.text(6.2, 5.2, 'Ventes', ha='center', va='center', fontsize=10, color='red')
+    
+    # Buy orders
+    buy_box = patches.Rectangle((7.3, 4.8), 2, 0.8, linewidth=1, 
+                              edgecolor='green', facecolor='#e6ffe6')
+    ax.add_patch(buy_box)
+    ax.text(8.3, 5.2, 'Achats', ha='center', va='center', fontsize=10, color='green')
+    
+    # Trading forms
+    buy_form = patches.Rectangle((0.5, 0.5), 4, 2.8, linewidth=1, 
+                               edgecolor='green', facecolor='#e6ffe6')
+    ax.add_patch(buy_form)
+    ax.text(2.5, 2.8, 'Formulaire d\'Achat', ha='center', va='center', fontsize=11, weight='bold')
+    ax.text(2.5, 2.2, 'Prix: [____] ꜩ', ha='center', va='center', fontsize=10)
+    ax.text(2.5, 1.8, 'Quantité: [____]', ha='center', va='center', fontsize=10)
+    ax.text(2.5, 1.4, '[Bouton Acheter]', ha='center', va='center', fontsize=10, 
+            bbox=dict(boxstyle="round,pad=0.3", facecolor='green', alpha=0.7))
+    
+    sell_form = patches.Rectangle((5, 0.5), 4.5, 2.8, linewidth=1, 
+                                edgecolor='red', facecolor='#ffe6e6')
+    ax.add_patch(sell_form)
+    ax.text(7.25, 2.8, 'Formulaire de Vente', ha='center', va='center', fontsize=11, weight='bold')
+    ax.text(7.25, 2.2, 'Prix: [____] ꜩ', ha='center', va='center', fontsize=10)
+    ax.text(7.25, 1.8, 'Quantité: [____]', ha='center', va='center', fontsize=10)
+    ax.text(7.25, 1.4, '[Bouton Vendre]', ha='center', va='center', fontsize=10,
+            bbox=dict(boxstyle="round,pad=0.3", facecolor='red', alpha=0.7))
+    
+    plt.title('Interface dApp ActionChain Token', fontsize=16, weight='bold', pad=20)
+
+
+def draw_architecture(plt, patches):
+    """Draw the system architecture diagram on the current matplotlib figure"""
+    fig, ax = plt.subplots(figsize=(12, 10))
+    ax.set_xlim(0, 12)
+    ax.set_ylim(0, 10)
+    ax.axis('off')
+    
+    # Blockchain layer (bottom)
+    blockchain_rect = patches.Rectangle((1, 0.5), 10, 2, linewidth=3, 
+                                      edgecolor='#2E86AB', facecolor='#E3F2FD')
+    ax.add_patch(blockchain_rect)
+    ax.text(6, 1.5, 'TEZOS BLOCKCHAIN', ha='center', va='center', 
+            fontsize=14, weight='bold', color='#2E86AB')
+    
+    # Smart Contract
+    contract_rect = patches.Rectangle((2, 1), 3, 1, linewidth=2, 
+                                    edgecolor='#A23B72', facecolor='white')
+    ax.add_patch(contract_rect)
+    ax.text(3.5, 1.5, 'ActionChain\nSmart Contract', ha='center', va='center', 
+            fontsize=10, weight='bold')
+    
+    # Storage
+    storage_rect = patches.Rectangle((7, 1), 3, 1, linewidth=2, 
+                                   edgecolor='#F18F01', facecolor='white')
+    ax.add_patch(storage_rect)
+    ax.text(8.5, 1.5, 'Storage\n(Balances, Orders, Trades)', ha='center', va='center', 
+            fontsize=10, weight='bold')
+    
+    # Web3 Interface layer
+    web3_rect = patches.Rectangle((1, 3.5), 10, 1.5, linewidth=2, 
+                                edgecolor='#4CAF50', facecolor='#E8F5E8')
+    ax.add_patch(web3_rect)
+    ax.text(6, 4.25, 'WEB3 INTERFACE LAYER', ha='center', va='center', 
+            fontsize=12, weight='bold', color='#4CAF50')
+    
+    # Wallet integration
+    wallet_rect = patches.Rectangle((2, 3.7), 2.5, 1.1, linewidth=1, 
+                                  edgecolor='gray', facecolor='white')
+    ax.add_patch(wallet_rect)
+    ax.text(3.25, 4.25, 'Temple Wallet\nIntegration', ha='center', va='center', fontsize=9)
+    
+    # Transaction handling
+    tx_rect = patches.Rectangle((7.5, 3.7), 2.5, 1.1, linewidth=1, 
+                              edgecolor='gray', facecolor='white')
+    ax.add_patch(tx_rect)
+    ax.text(8.75, 4.25, 'Transaction\nSigning & Broadcasting', ha='center', va='center', fontsize=9)
+    
+    # Frontend layer
+    frontend_rect = patches.Rectangle((1, 6), 10, 2, linewidth=2, 
+                                    edgecolor='#9C27B0', facecolor='#F3E5F5')
+    ax.add_patch(frontend_rect)
+    ax.text(6, 7, 'FRONTEND dAPP', ha='center', va='center', 
+            fontsize=12, weight='bold', color='#9C27B0')
+    
+    # UI components
+    components = [
+        (2.5, 6.3, 'Trading\nInterface'),
+        (4.5, 6.3, 'Orderbook\nVisualization'),
+        (6.5, 6.3, 'Price\nCharts'),
+        (8.5, 6.3, 'Portfolio\nManagement'),
+        (10.5, 6.3, 'Transaction\nHistory')
+    ]
+    
+    for x, y, label in components:
+        comp_rect = patches.Rectangle((x-0.4, y), 0.8, 1.4, linewidth=1, 
+                                    edgecolor='gray', facecolor='white')
+        ax.add_patch(comp_rect)
+        ax.text(x, y+0.7, label, ha='center', va='center', fontsize=8)
+    
+    # User layer
+    user_rect = patches.Rectangle((3, 8.5), 6, 1, linewidth=2, 
+                                edgecolor='#FF5722', facecolor='#FFF3E0')
+    ax.add_patch(user_rect)
+    ax.text(6, 9, 'UTILISATEURS (TRADERS)', ha='center', va='center', 
+            fontsize=12, weight='bold', color='#FF5722')
+    
+    # Arrows showing data flow
+    # User to Frontend
+    ax.annotate('', xy=(6, 8), xytext=(6, 8.5), 
+               arrowprops=dict(arrowstyle='<->', color='black', lw=2))
+    
+    # Frontend to Web3
+    ax.annotate('', xy=(6, 5), xytext=(6, 6), 
+               arrowprops=dict(arrowstyle='<->', color='black', lw=2))
+    
+    # Web3 to Blockchain
+    ax.annotate('', xy=(6, 2.5), xytext=(6, 3.5), 
+               arrowprops=dict(arrowstyle='<->', color='black', lw=2))
+    
+    # Contract to Storage
+    ax.annotate('', xy=(7, 1.5), xytext=(5, 1.5), 
+               arrowprops=dict(arrowstyle='<->', color='black', lw=2))
+    
+    # Add labels for interactions
+    ax.text(6.3, 8.25, 'Interactions\nUtilisateur', ha='left', va='center', fontsize=8, 
+            bbox=dict(boxstyle="round,pad=0.2", facecolor='yellow', alpha=0.7))
+    
+    ax.text(6.3, 5.5, 'Appels Web3\nTezTalks JS', ha='left', va='center', fontsize=8,
+            bbox=dict(boxstyle="round,pad=0.2", facecolor='lightblue', alpha=0.7))
+    
+    ax.text(6.3, 3, 'Transactions\nBlockchain', ha='left', va='center', fontsize=8,
+            bbox=dict(boxstyle="round,pad=0.2", facecolor='lightgreen', alpha=0.7))
+    
+    plt.title('Architecture Système ActionChain Token', fontsize=16, weight='bold', pad=20)
+
+
+FIGURES = {
+    "ui": draw_ui_mockup,
+    "architecture": draw_architecture
+}
+
+
+def figure_key(name, dpi=FIGURE_DPI):
+    """Hash of the drawing code, its inputs and the matplotlib version"""
+    digest = hashlib.sha256()
+    digest.update(inspect.getsource(FIGURES[name]).encode())
+    digest.update(f"{name}:{dpi}".encode())
+    try:
+        digest.update(metadata.version("matplotlib").encode())
+    except metadata.PackageNotFoundError:
+        pass
+    return digest.hexdigest()[:32]
+
+
+def figure_png(draw, *args, dpi=FIGURE_DPI):
+    """Run a draw function on a fresh matplotlib figure and return it as RGB PNG bytes"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import matplotlib.patches as patches
+    from PIL import Image as PILImage
+
+    draw(plt, patches, *args)
+    buf = BytesIO()
+    plt.savefig(buf, format='png', dpi=dpi, bbox_inches='tight')
+    plt.close('all')
+    # The figures are opaque: without the alpha channel reportlab embeds a
+    # single RGB stream instead of an image plus its soft mask
+    buf.seek(0)
+    png = BytesIO()
+    PILImage.open(buf).convert('RGB').save(png, format='png')
+    return png.getvalue()
+
+
+def build_pdf(doc, story):
+    """Build the document with binary image streams, then restore reportlab's setting"""
+    # The ASCII85 encoding of the 300 dpi figures alone took longer than the rest
+    from reportlab import rl_config
+    use_a85 = rl_config.useA85
+    rl_config.useA85 = 0
+    try:
+        doc.build(story)
+    finally:
+        rl_config.useA85 = use_a85
+
+
+def render_figure(name, dpi=FIGURE_DPI):
+    """Render one figure to PNG bytes (runs in a worker process)"""
+    return figure_png(FIGURES[name], dpi=dpi)
+
+
+def render_figures(names, cache_dir=FIGURE_CACHE):
+    """PNG bytes of each figure: from the cache, or rendered in parallel for the missing ones"""
+    images = {}
+    missing = []
+    for name in names:
+        path = os.path.join(cache_dir, figure_key(name) + ".png")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                images[name] = f.read()
+        else:
+            missing.append(name)
+    if not missing:
+        return images
+
+    if len(missing) == 1:
+        rendered = [render_figure(missing[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=min(len(missing), os.cpu_count() or 1)) as pool:
+            rendered = list(pool.map(render_figure, missing))
+
+    os.makedirs(cache_dir, exist_ok=True)
+    for name, png in zip(missing, rendered):
+        images[name] = png
+        # Written to a temporary file then renamed: never a half-written entry
+        fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=cache_dir)
+        with os.fdopen(fd, "wb") as f:
+            f.write(png)
+        os.replace(tmp, os.path.join(cache_dir, figure_key(name) + ".png"))
+    return images
+
 
 class ActionChainPresentation:
-    def __init__(self):
+    def __init__(self, filename="ActionChain_Token_Presentation.pdf"):
+        from reportlab.lib.colors import HexColor
+        from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.platypus import SimpleDocTemplate
+
+        self.filename = filename
         self.doc = SimpleDocTemplate(
-            "ActionChain_Token_Presentation.pdf",
+            filename,
             pagesize=A4,
             rightMargin=72,
             leftMargin=72,
@@ -30,6 +304,7 @@ class ActionChainPresentation:
         )
         self.styles = getSampleStyleSheet()
         self.story = []
+        self.figures = {}  # name -> PNG bytes, filled by generate_pdf
         
         # Define custom colors
         self.primary_color = HexColor('#2E86AB')
@@ -68,6 +343,10 @@ class ActionChainPresentation:
 
     def create_title_page(self):
         """Create the title page"""
+        from reportlab.lib.enums import TA_CENTER
+        from reportlab.lib.styles import ParagraphStyle
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Paragraph, Spacer, PageBreak
         self.story.append(Spacer(1, 2*inch))
         
         title = Paragraph("🔗 ActionChain Token", self.title_style)
@@ -100,6 +379,7 @@ class ActionChainPresentation:
 
     def create_use_case_section(self):
         """Explain the use case and problem being solved"""
+        from reportlab.platypus import Paragraph, PageBreak
         title = Paragraph("1. Cas d'Usage et Problématique", self.section_style)
         self.story.append(title)
         
@@ -132,6 +412,7 @@ class ActionChainPresentation:
 
     def create_blockchain_solution_section(self):
         """Explain how blockchain solves the use case"""
+        from reportlab.platypus import Paragraph, PageBreak
         title = Paragraph("2. Comment la Blockchain Résout le Problème", self.section_style)
         self.story.append(title)
         
@@ -165,6 +446,9 @@ class ActionChainPresentation:
 
     def create_features_section(self):
         """Detail the main features"""
+        from reportlab.lib.colors import black, white
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Paragraph, Spacer, Table, TableStyle, PageBreak
         title = Paragraph("3. Fonctionnalités Principales", self.section_style)
         self.story.append(title)
         
@@ -222,83 +506,13 @@ class ActionChainPresentation:
 
     def create_ui_diagram(self):
         """Create UI mockup diagram"""
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Paragraph, Image, PageBreak
         title = Paragraph("4. Interface Utilisateur (dApp)", self.section_style)
         self.story.append(title)
         
-        # Create a simple UI mockup using matplotlib
-        fig, ax = plt.subplots(figsize=(10, 8))
-        ax.set_xlim(0, 10)
-        ax.set_ylim(0, 8)
-        ax.axis('off')
-        
-        # Header
-        header = patches.Rectangle((0.5, 7), 9, 0.8, linewidth=2, 
-                                 edgecolor='#2E86AB', facecolor='#2E86AB')
-        ax.add_patch(header)
-        ax.text(5, 7.4, 'ActionChain Token - Trading Interface', 
-                ha='center', va='center', color='white', fontsize=14, weight='bold')
-        
-        # Price display
-        price_box = patches.Rectangle((0.5, 6), 9, 0.8, linewidth=1, 
-                                    edgecolor='#A23B72', facecolor='#F5F5F5')
-        ax.add_patch(price_box)
-        ax.text(2, 6.4, 'Prix Actuel: 1.20 ꜩ', ha='left', va='center', fontsize=12, weight='bold')
-        ax.text(8, 6.4, '+0.05 (+4.35%)', ha='right', va='center', color='green', fontsize=12)
-        
-        # Chart area
-        chart_box = patches.Rectangle((0.5, 3.5), 4, 2.3, linewidth=1, 
-                                    edgecolor='gray', facecolor='white')
-        ax.add_patch(chart_box)
-        ax.text(2.5, 5.5, 'Graphique des Prix', ha='center', va='center', fontsize=11, weight='bold')
-        ax.text(2.5, 4.5, '📈', ha='center', va='center', fontsize=30)
-        
-        # Orderbook
-        orderbook_box = patches.Rectangle((5, 3.5), 4.5, 2.3, linewidth=1, 
-                                        edgecolor='gray', facecolor='white')
-        ax.add_patch(orderbook_box)
-        ax.text(7.25, 5.5, 'Carnet d\'Ordres', ha='center', va='center', fontsize=11, weight='bold')
-        
-        # Sell orders
-        sell_box = patches.Rectangle((5.2, 4.8), 2, 0.8, linewidth=1, 
-                                   edgecolor='red', facecolor='#ffe6e6')
-        ax.add_patch(sell_box)
-        ax.text(6.2, 5.2, 'Ventes', ha='center', va='center', fontsize=10, color='red')
-        
-        # Buy orders
-        buy_box = patches.Rectangle((7.3, 4.8), 2, 0.8, linewidth=1, 
-                                  edgecolor='green', facecolor='#e6ffe6')
-        ax.add_patch(buy_box)
-        ax.text(8.3, 5.2, 'Achats', ha='center', va='center', fontsize=10, color='green')
-        
-        # Trading forms
-        buy_form = patches.Rectangle((0.5, 0.5), 4, 2.8, linewidth=1, 
-                                   edgecolor='green', facecolor='#e6ffe6')
-        ax.add_patch(buy_form)
-        ax.text(2.5, 2.8, 'Formulaire d\'Achat', ha='center', va='center', fontsize=11, weight='bold')
-        ax.text(2.5, 2.2, 'Prix: [____] ꜩ', ha='center', va='center', fontsize=10)
-        ax.text(2.5, 1.8, 'Quantité: [____]', ha='center', va='center', fontsize=10)
-        ax.text(2.5, 1.4, '[Bouton Acheter]', ha='center', va='center', fontsize=10, 
-                bbox=dict(boxstyle="round,pad=0.3", facecolor='green', alpha=0.7))
-        
-        sell_form = patches.Rectangle((5, 0.5), 4.5, 2.8, linewidth=1, 
-                                    edgecolor='red', facecolor='#ffe6e6')
-        ax.add_patch(sell_form)
-        ax.text(7.25, 2.8, 'Formulaire de Vente', ha='center', va='center', fontsize=11, weight='bold')
-        ax.text(7.25, 2.2, 'Prix: [____] ꜩ', ha='center', va='center', fontsize=10)
-        ax.text(7.25, 1.8, 'Quantité: [____]', ha='center', va='center', fontsize=10)
-        ax.text(7.25, 1.4, '[Bouton Vendre]', ha='center', va='center', fontsize=10,
-                bbox=dict(boxstyle="round,pad=0.3", facecolor='red', alpha=0.7))
-        
-        plt.title('Interface dApp ActionChain Token', fontsize=16, weight='bold', pad=20)
-        
-        # Save the plot
-        buf = BytesIO()
-        plt.savefig(buf, format='png', dpi=300, bbox_inches='tight')
-        buf.seek(0)
-        plt.close()
-        
-        # Add to story
-        img = Image(buf, width=7*inch, height=5.6*inch)
+        # Figure rendered in a worker process, or read back from the cache
+        img = Image(BytesIO(self.figures['ui']), width=7*inch, height=5.6*inch)
         self.story.append(img)
         
         ui_description = """
@@ -316,121 +530,13 @@ class ActionChainPresentation:
 
     def create_architecture_diagram(self):
         """Create system architecture diagram"""
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Paragraph, Image, PageBreak
         title = Paragraph("5. Architecture et Interactions On-Chain/Off-Chain", self.section_style)
         self.story.append(title)
         
-        # Create architecture diagram
-        fig, ax = plt.subplots(figsize=(12, 10))
-        ax.set_xlim(0, 12)
-        ax.set_ylim(0, 10)
-        ax.axis('off')
-        
-        # Blockchain layer (bottom)
-        blockchain_rect = patches.Rectangle((1, 0.5), 10, 2, linewidth=3, 
-                                          edgecolor='#2E86AB', facecolor='#E3F2FD')
-        ax.add_patch(blockchain_rect)
-        ax.text(6, 1.5, 'TEZOS BLOCKCHAIN', ha='center', va='center', 
-                fontsize=14, weight='bold', color='#2E86AB')
-        
-        # Smart Contract
-        contract_rect = patches.Rectangle((2, 1), 3, 1, linewidth=2, 
-                                        edgecolor='#A23B72', facecolor='white')
-        ax.add_patch(contract_rect)
-        ax.text(3.5, 1.5, 'ActionChain\nSmart Contract', ha='center', va='center', 
-                fontsize=10, weight='bold')
-        
-        # Storage
-        storage_rect = patches.Rectangle((7, 1), 3, 1, linewidth=2, 
-                                       edgecolor='#F18F01', facecolor='white')
-        ax.add_patch(storage_rect)
-        ax.text(8.5, 1.5, 'Storage\n(Balances, Orders, Trades)', ha='center', va='center', 
-                fontsize=10, weight='bold')
-        
-        # Web3 Interface layer
-        web3_rect = patches.Rectangle((1, 3.5), 10, 1.5, linewidth=2, 
-                                    edgecolor='#4CAF50', facecolor='#E8F5E8')
-        ax.add_patch(web3_rect)
-        ax.text(6, 4.25, 'WEB3 INTERFACE LAYER', ha='center', va='center', 
-                fontsize=12, weight='bold', color='#4CAF50')
-        
-        # Wallet integration
-        wallet_rect = patches.Rectangle((2, 3.7), 2.5, 1.1, linewidth=1, 
-                                      edgecolor='gray', facecolor='white')
-        ax.add_patch(wallet_rect)
-        ax.text(3.25, 4.25, 'Temple Wallet\nIntegration', ha='center', va='center', fontsize=9)
-        
-        # Transaction handling
-        tx_rect = patches.Rectangle((7.5, 3.7), 2.5, 1.1, linewidth=1, 
-                                  edgecolor='gray', facecolor='white')
-        ax.add_patch(tx_rect)
-        ax.text(8.75, 4.25, 'Transaction\nSigning & Broadcasting', ha='center', va='center', fontsize=9)
-        
-        # Frontend layer
-        frontend_rect = patches.Rectangle((1, 6), 10, 2, linewidth=2, 
-                                        edgecolor='#9C27B0', facecolor='#F3E5F5')
-        ax.add_patch(frontend_rect)
-        ax.text(6, 7, 'FRONTEND dAPP', ha='center', va='center', 
-                fontsize=12, weight='bold', color='#9C27B0')
-        
-        # UI components
-        components = [
-            (2.5, 6.3, 'Trading\nInterface'),
-            (4.5, 6.3, 'Orderbook\nVisualization'),
-            (6.5, 6.3, 'Price\nCharts'),
-            (8.5, 6.3, 'Portfolio\nManagement'),
-            (10.5, 6.3, 'Transaction\nHistory')
-        ]
-        
-        for x, y, label in components:
-            comp_rect = patches.Rectangle((x-0.4, y), 0.8, 1.4, linewidth=1, 
-                                        edgecolor='gray', facecolor='white')
-            ax.add_patch(comp_rect)
-            ax.text(x, y+0.7, label, ha='center', va='center', fontsize=8)
-        
-        # User layer
-        user_rect = patches.Rectangle((3, 8.5), 6, 1, linewidth=2, 
-                                    edgecolor='#FF5722', facecolor='#FFF3E0')
-        ax.add_patch(user_rect)
-        ax.text(6, 9, 'UTILISATEURS (TRADERS)', ha='center', va='center', 
-                fontsize=12, weight='bold', color='#FF5722')
-        
-        # Arrows showing data flow
-        # User to Frontend
-        ax.annotate('', xy=(6, 8), xytext=(6, 8.5), 
-                   arrowprops=dict(arrowstyle='<->', color='black', lw=2))
-        
-        # Frontend to Web3
-        ax.annotate('', xy=(6, 5), xytext=(6, 6), 
-                   arrowprops=dict(arrowstyle='<->', color='black', lw=2))
-        
-        # Web3 to Blockchain
-        ax.annotate('', xy=(6, 2.5), xytext=(6, 3.5), 
-                   arrowprops=dict(arrowstyle='<->', color='black', lw=2))
-        
-        # Contract to Storage
-        ax.annotate('', xy=(7, 1.5), xytext=(5, 1.5), 
-                   arrowprops=dict(arrowstyle='<->', color='black', lw=2))
-        
-        # Add labels for interactions
-        ax.text(6.3, 8.25, 'Interactions\nUtilisateur', ha='left', va='center', fontsize=8, 
-                bbox=dict(boxstyle="round,pad=0.2", facecolor='yellow', alpha=0.7))
-        
-        ax.text(6.3, 5.5, 'Appels Web3\nTezTalks JS', ha='left', va='center', fontsize=8,
-                bbox=dict(boxstyle="round,pad=0.2", facecolor='lightblue', alpha=0.7))
-        
-        ax.text(6.3, 3, 'Transactions\nBlockchain', ha='left', va='center', fontsize=8,
-                bbox=dict(boxstyle="round,pad=0.2", facecolor='lightgreen', alpha=0.7))
-        
-        plt.title('Architecture Système ActionChain Token', fontsize=16, weight='bold', pad=20)
-        
-        # Save the plot
-        buf = BytesIO()
-        plt.savefig(buf, format='png', dpi=300, bbox_inches='tight')
-        buf.seek(0)
-        plt.close()
-        
-        # Add to story
-        img = Image(buf, width=8*inch, height=6.7*inch)
+        # Figure rendered in a worker process, or read back from the cache
+        img = Image(BytesIO(self.figures['architecture']), width=8*inch, height=6.7*inch)
         self.story.append(img)
         
         # Architecture explanation
@@ -463,6 +569,9 @@ class ActionChainPresentation:
 
     def create_benefits_conclusion(self):
         """Create benefits and conclusion section"""
+        from reportlab.lib.colors import black, white
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Paragraph, Spacer, Table, TableStyle
         title = Paragraph("6. Avantages Concurrentiels et Vision", self.section_style)
         self.story.append(title)
         
@@ -529,6 +638,8 @@ class ActionChainPresentation:
     def generate_pdf(self):
         """Generate the complete PDF presentation"""
         print("Generating ActionChain Token presentation...")
+        started = time.perf_counter()
+        self.figures = render_figures(FIGURES)
         
         self.create_title_page()
         self.create_use_case_section()
@@ -538,10 +649,422 @@ class ActionChainPresentation:
         self.create_architecture_diagram()
         self.create_benefits_conclusion()
         
-        # Build the PDF
-        self.doc.build(self.story)
-        print("✅ Presentation generated: ActionChain_Token_Presentation.pdf")
+        build_pdf(self.doc, self.story)
+        print(f"✅ Presentation generated: {self.filename} "
+              f"({time.perf_counter() - started:.2f} s)")
+
+
+# Market report: data read in chunks and aggregated with NumPy
+
+REPORT_CHUNK = 200_000   # Trades per chunk: memory stays flat whatever the period
+REPORT_DPI = 150
+DAY = 86400
+
+
+def store_trades(db, start, end, chunk_size=REPORT_CHUNK):
+    """(timestamp, price, quantity) chunks from an indexer.py store, in time order"""
+    import numpy as np
+
+    # The trades_timestamp index already yields rows in (timestamp, trade_id) order
+    cursor = sqlite3.connect(db).execute(
+        "SELECT timestamp, price, quantity FROM trades WHERE timestamp >= ? AND timestamp < ? "
+        "ORDER BY timestamp, trade_id", (start, end)
+    )
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield np.array(rows, dtype=np.int64)
+
+
+def csv_trades(path, start, end, chunk_size=REPORT_CHUNK):
+    """(timestamp, price, quantity) chunks from a CSV export in time order (header row required)"""
+    import numpy as np
+
+    with open(path) as f:
+        header = f.readline().strip().split(",")
+        columns = [header.index(name) for name in ("timestamp", "price", "quantity")]
+        while True:
+            lines = list(itertools.islice(f, chunk_size))
+            if not lines:
+                return
+            chunk = np.loadtxt(lines, delimiter=",", usecols=columns, dtype=np.int64, ndmin=2)
+            chunk = chunk[(chunk[:, 0] >= start) & (chunk[:, 0] < end)]
+            if len(chunk):
+                yield chunk
+
+
+def store_book(db):
+    """Aggregated book levels (tick, quantity) of each side, best price first, and the
+    (level, timestamp) of the last indexed block they describe
+
+    The store only keeps the current book: this is a snapshot at the indexer's
+    cursor, not the book at the end of the report period.
+    """
+    import numpy as np
+
+    connection = sqlite3.connect(db)
+    def side(name, order):
+        rows = connection.execute(
+            f"SELECT tick, quantity FROM levels WHERE side = ? AND quantity > 0 ORDER BY tick {order}", (name,)
+        ).fetchall()
+        return np.array(rows, dtype=np.int64).reshape(-1, 2)
+    snapshot = connection.execute(
+        "SELECT blocks.level, blocks.timestamp FROM cursor JOIN blocks ON blocks.level = cursor.level"
+    ).fetchone()
+    return side("buy", "DESC"), side("sell", "ASC"), snapshot
+
+
+def store_holdings(db, chunk_size=REPORT_CHUNK):
+    """Token holdings (available + reserved) of every address with a non-zero balance"""
+    import numpy as np
+
+    cursor = sqlite3.connect(db).execute(
+        "SELECT available + reserved FROM balances WHERE available + reserved > 0"
+    )
+    chunks = []
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        chunks.append(np.array(rows, dtype=np.int64).ravel())
+    return np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int64)
+
+
+class TradeAggregator:
+    """Per-interval OHLC, volume, notional and trade count, accumulated chunk by chunk"""
+
+    def __init__(self, start, end, interval=3600):
+        import numpy as np
+
+        self.start = start
+        self.interval = interval
+        buckets = -(-(end - start) // interval)
+        self.volume = np.zeros(buckets, dtype=np.int64)
+        self.notional = np.zeros(buckets, dtype=np.float64)   # mutez
+        self.trades = np.zeros(buckets, dtype=np.int64)
+        self.open = np.zeros(buckets, dtype=np.int64)         # 0: no trade yet
+        self.close = np.zeros(buckets, dtype=np.int64)
+        self.high = np.zeros(buckets, dtype=np.int64)
+        self.low = np.full(buckets, np.iinfo(np.int64).max, dtype=np.int64)
+        self.largest = 0
+
+    def add(self, chunk):
+        """Fold in a (timestamp, price, quantity) chunk; chunks must arrive in time order"""
+        import numpy as np
+
+        timestamps, prices, quantities = chunk[:, 0], chunk[:, 1], chunk[:, 2]
+        buckets = (timestamps - self.start) // self.interval
+        size = len(self.volume)
+        self.volume += np.bincount(buckets, weights=quantities, minlength=size).astype(np.int64)
+        self.notional += np.bincount(buckets, weights=prices * quantities, minlength=size)
+        self.trades += np.bincount(buckets, minlength=size)
+        np.maximum.at(self.high, buckets, prices)
+        np.minimum.at(self.low, buckets, prices)
+
+        # First and last trade of each bucket present in the chunk
+        present, first = np.unique(buckets, return_index=True)
+        last = len(buckets) - 1 - np.unique(buckets[::-1], return_index=True)[1]
+        unopened = self.open[present] == 0
+        self.open[present[unopened]] = prices[first[unopened]]
+        self.close[present] = prices[last]
+        self.largest = max(self.largest, int(quantities.max()))
+
+    def vwap(self):
+        """VWAP per interval in mutez (NaN without trades)"""
+        import numpy as np
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.notional / self.volume
+
+    def summary(self):
+        import numpy as np
+
+        volume = int(self.volume.sum())
+        traded = self.trades > 0
+        return {
+            "trades": int(self.trades.sum()),
+            "volume": volume,
+            "notional": float(self.notional.sum()),
+            "vwap": float(self.notional.sum() / volume) if volume else None,
+            "high": int(self.high[traded].max()) if traded.any() else None,
+            "low": int(self.low[traded].min()) if traded.any() else None,
+            "open": int(self.open[traded][0]) if traded.any() else None,
+            "close": int(self.close[traded][-1]) if traded.any() else None,
+            "largest": self.largest,
+            "active_intervals": int(np.count_nonzero(traded))
+        }
+
+
+def book_summary(bids, asks, bands=(0.01, 0.05)):
+    """Spread and quantity resting within each band around the mid price"""
+    if not len(bids) or not len(asks):
+        return None
+    best_bid, best_ask = int(bids[0, 0]), int(asks[0, 0])
+    mid = (best_bid + best_ask) / 2
+    summary = {
+        "best_bid": best_bid * TICK_SIZE,
+        "best_ask": best_ask * TICK_SIZE,
+        "spread": (best_ask - best_bid) * TICK_SIZE,
+        "spread_bps": (best_ask - best_bid) / mid * 10_000,
+        "bid_quantity": int(bids[:, 1].sum()),
+        "ask_quantity": int(asks[:, 1].sum()),
+        "bands": []
+    }
+    for band in bands:
+        summary["bands"].append((
+            band,
+            int(bids[bids[:, 0] >= mid * (1 - band), 1].sum()),
+            int(asks[asks[:, 0] <= mid * (1 + band), 1].sum())
+        ))
+    return summary
+
+
+def concentration(holdings, points=200):
+    """Holder concentration: top shares, Herfindahl index, Gini and a Lorenz curve"""
+    import numpy as np
+
+    if not len(holdings):
+        return None
+    ordered = np.sort(holdings)[::-1]
+    total = ordered.sum()
+    shares = ordered / total
+    count = len(ordered)
+    # Gini from the ascending cumulative distribution
+    ascending = np.cumsum(ordered[::-1]) / total
+    gini = 1 - 2 * ascending.sum() / count + 1 / count
+    steps = np.linspace(0, count, min(points, count) + 1).astype(np.int64)
+    lorenz = np.concatenate(([0.0], ascending))[steps]
+    return {
+        "holders": count,
+        "total": int(total),
+        "top1": float(shares[0]),
+        "top10": float(shares[:10].sum()),
+        "top100": float(shares[:100].sum()),
+        "hhi": float((shares ** 2).sum() * 10_000),
+        "gini": float(gini),
+        "lorenz": (steps / count, lorenz)
+    }
+
+
+def draw_volume_chart(plt, patches, times, volume, vwap, low, high):
+    """Volume bars under the VWAP line, with each interval's trading range"""
+    fig, (price_ax, volume_ax) = plt.subplots(2, 1, figsize=(10, 6), sharex=True,
+                                              gridspec_kw={"height_ratios": [2, 1]})
+    traded = volume > 0
+    price_ax.vlines(times[traded], low[traded] / 1e6, high[traded] / 1e6, color='#A23B72', alpha=0.3, lw=1)
+    price_ax.plot(times[traded], vwap[traded] / 1e6, color='#2E86AB', lw=1.2, label='VWAP')
+    price_ax.set_ylabel('Prix (ꜩ)')
+    price_ax.legend(loc='upper left')
+    price_ax.grid(alpha=0.3)
+    width = (times[1] - times[0]) if len(times) > 1 else 1
+    volume_ax.bar(times, volume, width=width, color='#F18F01', align='edge')
+    volume_ax.set_ylabel('Volume')
+    volume_ax.grid(alpha=0.3)
+    volume_ax.set_xlabel('Jours depuis le début de la période')
+    fig.tight_layout()
+
+
+def draw_depth_chart(plt, patches, bids, asks):
+    """Cumulative resting quantity on each side of the book"""
+    import numpy as np
+
+    fig, ax = plt.subplots(figsize=(10, 4))
+    ax.step(bids[:, 0] * TICK_SIZE / 1e6, np.cumsum(bids[:, 1]), where='post', color='green', label='Achats')
+    ax.step(asks[:, 0] * TICK_SIZE / 1e6, np.cumsum(asks[:, 1]), where='post', color='red', label='Ventes')
+    ax.set_xlabel('Prix (ꜩ)')
+    ax.set_ylabel('Quantité cumulée')
+    ax.legend()
+    ax.grid(alpha=0.3)
+    fig.tight_layout()
+
+
+def draw_lorenz_chart(plt, patches, population, wealth):
+    fig, ax = plt.subplots(figsize=(6, 4.5))
+    ax.plot(population, wealth, color='#2E86AB', lw=1.5, label='Détenteurs')
+    ax.plot([0, 1], [0, 1], color='gray', ls='--', lw=1, label='Égalité parfaite')
+    ax.set_xlabel('Part des détenteurs (du plus petit au plus grand)')
+    ax.set_ylabel('Part des tokens')
+    ax.legend()
+    ax.grid(alpha=0.3)
+    fig.tight_layout()
+
+
+class MarketReport(ActionChainPresentation):
+    """Periodic market report built from the trade history and the order book"""
+
+    def __init__(self, filename="ActionChain_Market_Report.pdf"):
+        super().__init__(filename)
+
+    def table(self, rows, col_widths):
+        from reportlab.lib.colors import black, white
+        from reportlab.platypus import Table, TableStyle
+
+        table = Table(rows, colWidths=col_widths)
+        table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), self.primary_color),
+            ('TEXTCOLOR', (0, 0), (-1, 0), white),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('ALIGN', (1, 1), (-1, -1), 'RIGHT'),
+            ('BACKGROUND', (0, 1), (-1, -1), self.bg_color),
+            ('GRID', (0, 0), (-1, -1), 0.5, black),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ]))
+        return table
+
+    def chart(self, draw, *args, width=6.5, height=3.9):
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Image
+
+        return Image(BytesIO(figure_png(draw, *args, dpi=REPORT_DPI)), width=width*inch, height=height*inch)
+
+    def create_report_title(self, start, end):
+        from reportlab.platypus import Paragraph, Spacer
+
+        self.story.append(Paragraph("ActionChain Token - Rapport de Marché", self.title_style))
+        period = (f"{datetime.fromtimestamp(start, timezone.utc):%d/%m/%Y} - "
+                  f"{datetime.fromtimestamp(end - 1, timezone.utc):%d/%m/%Y} (UTC)")
+        self.story.append(Paragraph(f"<b>Période:</b> {period}", self.body_style))
+        self.story.append(Spacer(1, 12))
+
+    def create_volume_section(self, aggregator):
+        import numpy as np
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Paragraph
+
+        self.story.append(Paragraph("1. Volume et Prix", self.section_style))
+        summary = aggregator.summary()
+        if not summary["trades"]:
+            self.story.append(Paragraph("Aucun trade sur la période.", self.body_style))
+            return
+
+        rows = [
+            ['Indicateur', 'Valeur'],
+            ['Trades', f"{summary['trades']:,}"],
+            ['Volume (tokens)', f"{summary['volume']:,}"],
+            ['Montant échangé (tez)', f"{summary['notional'] / 1e6:,.2f}"],
+            ['VWAP (tez)', f"{summary['vwap'] / 1e6:.4f}"],
+            ['Ouverture / Clôture (tez)', f"{summary['open'] / 1e6:.2f} / {summary['close'] / 1e6:.2f}"],
+            ['Plus haut / Plus bas (tez)', f"{summary['high'] / 1e6:.2f} / {summary['low'] / 1e6:.2f}"],
+            ['Plus gros trade (tokens)', f"{summary['largest']:,}"],
+            ['Intervalles actifs', f"{summary['active_intervals']} / {len(aggregator.volume)}"],
+        ]
+        self.story.append(self.table(rows, [3*inch, 3*inch]))
+        times = np.arange(len(aggregator.volume)) * aggregator.interval / DAY
+        self.story.append(self.chart(draw_volume_chart, times, aggregator.volume, aggregator.vwap(),
+                                     aggregator.low, aggregator.high))
+
+    def create_book_section(self, bids, asks, snapshot=None):
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Paragraph
+
+        self.story.append(Paragraph("2. Carnet d'Ordres Actuel: Spread et Profondeur", self.section_style))
+        if snapshot is not None:
+            level, timestamp = snapshot
+            taken = f"{datetime.fromtimestamp(timestamp, timezone.utc):%d/%m/%Y %H:%M} (UTC)"
+            self.story.append(Paragraph(
+                f"<i>Instantané du carnet au bloc {level:,}, le {taken}: état courant de l'indexeur, "
+                f"et non carnet à la fin de la période du rapport.</i>", self.body_style
+            ))
+        summary = book_summary(bids, asks)
+        if summary is None:
+            self.story.append(Paragraph("Carnet vide d'un côté au moins: pas de spread.", self.body_style))
+            return
+
+        rows = [
+            ['Indicateur', 'Achats', 'Ventes'],
+            ['Meilleur prix (tez)', f"{summary['best_bid'] / 1e6:.2f}", f"{summary['best_ask'] / 1e6:.2f}"],
+            ['Niveaux de prix', f"{len(bids):,}", f"{len(asks):,}"],
+            ['Quantité totale', f"{summary['bid_quantity']:,}", f"{summary['ask_quantity']:,}"],
+        ]
+        for band, bid_quantity, ask_quantity in summary["bands"]:
+            rows.append([f"Quantité à ±{band:.0%} du milieu", f"{bid_quantity:,}", f"{ask_quantity:,}"])
+        self.story.append(self.table(rows, [3*inch, 1.5*inch, 1.5*inch]))
+        self.story.append(Paragraph(
+            f"<b>Spread:</b> {summary['spread'] / 1e6:.2f} tez ({summary['spread_bps']:.1f} points de base)",
+            self.body_style
+        ))
+        self.story.append(self.chart(draw_depth_chart, bids, asks, height=2.6))
+
+    def create_concentration_section(self, holdings):
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Paragraph
+
+        self.story.append(Paragraph("3. Concentration des Détenteurs", self.section_style))
+        summary = concentration(holdings)
+        if summary is None:
+            self.story.append(Paragraph("Aucun solde indexé.", self.body_style))
+            return
+
+        rows = [
+            ['Indicateur', 'Valeur'],
+            ['Détenteurs', f"{summary['holders']:,}"],
+            ['Tokens détenus', f"{summary['total']:,}"],
+            ['Part du premier détenteur', f"{summary['top1']:.1%}"],
+            ['Part des 10 premiers', f"{summary['top10']:.1%}"],
+            ['Part des 100 premiers', f"{summary['top100']:.1%}"],
+            ['Indice de Herfindahl (0-10 000)', f"{summary['hhi']:,.0f}"],
+            ['Coefficient de Gini', f"{summary['gini']:.3f}"],
+        ]
+        self.story.append(self.table(rows, [3*inch, 3*inch]))
+        self.story.append(self.chart(draw_lorenz_chart, *summary["lorenz"], width=4.5, height=3.4))
+
+    def generate_report(self, trades, start, end, interval=3600, book=None, holdings=None):
+        """Build the report from trade chunks, and optionally the book and the holdings"""
+        from reportlab.platypus import PageBreak
+
+        print("Generating ActionChain Token market report...")
+        started = time.perf_counter()
+        aggregator = TradeAggregator(start, end, interval)
+        for chunk in trades:
+            aggregator.add(chunk)
+        aggregated = time.perf_counter()
+
+        self.create_report_title(start, end)
+        self.create_volume_section(aggregator)
+        if book is not None:
+            self.story.append(PageBreak())
+            self.create_book_section(*book)
+        if holdings is not None:
+            self.story.append(PageBreak())
+            self.create_concentration_section(holdings)
+
+        build_pdf(self.doc, self.story)
+        print(f"✅ Market report generated: {self.filename} ({aggregator.summary()['trades']:,} trades "
+              f"aggregated in {aggregated - started:.2f} s, {time.perf_counter() - started:.2f} s total)")
+        return aggregator
+
+
+def parse_date(value):
+    """YYYY-MM-DD (UTC) or a Unix timestamp"""
+    if value.isdigit():
+        return int(value)
+    return int(datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp())
+
 
 if __name__ == "__main__":
-    presentation = ActionChainPresentation()
-    presentation.generate_pdf()
+    parser = argparse.ArgumentParser(description="ActionChain Token presentation or market report")
+    parser.add_argument("--report", action="store_true", help="market report instead of the presentation")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--db", help="indexer.py store: trades, book and balances")
+    source.add_argument("--trades", help="CSV of trades with timestamp,price,quantity columns")
+    parser.add_argument("--start", help="first day (YYYY-MM-DD, UTC) or Unix timestamp")
+    parser.add_argument("--days", type=int, default=30, help="length of the period")
+    parser.add_argument("--interval", type=int, default=3600, help="aggregation interval in seconds")
+    parser.add_argument("--output", help="PDF file")
+    args = parser.parse_args()
+
+    if not args.report:
+        presentation = ActionChainPresentation(args.output or "ActionChain_Token_Presentation.pdf")
+        presentation.generate_pdf()
+    else:
+        if not (args.db or args.trades) or not args.start:
+            parser.error("--report needs --db or --trades, and --start")
+        start = parse_date(args.start)
+        end = start + args.days * DAY
+        report = MarketReport(args.output or "ActionChain_Market_Report.pdf")
+        if args.db:
+            report.generate_report(store_trades(args.db, start, end), start, end, args.interval,
+                                   book=store_book(args.db), holdings=store_holdings(args.db))
+        else:
+            report.generate_report(csv_trades(args.trades, start, end), start, end, args.interval)
@@ -4,9 +4,10 @@ Configuration et déploiement du contrat ActionChain Token
 
 import smartpy as sp
 from ActionChain import main
+from artifacts import compile_contract
 
 def deploy_contract():
-    """Déploie le contrat ActionChain Token"""
+    """Compile le contrat ActionChain Token (repris du cache si le source n'a pas changé)"""
     
     # Configuration des comptes
     admin = sp.test_account("Admin")
@@ -16,24 +17,20 @@ def deploy_contract():
     token_name = "ActionChain Token"
     token_symbol = "ACT"
     
-    # Création du contrat
-    contract = main.ActionChainToken(
-        admin=admin.address,
+    # Compilation (ou lecture du cache d'artifacts.py) des fichiers de déploiement
+    print("Compilation du contrat...")
+    code, storage = compile_contract(
+        admin="Admin",
         initial_supply=initial_supply,
         token_name=token_name,
         token_symbol=token_symbol
     )
     
-    # Compilation et génération des fichiers de déploiement
-    print("Compilation du contrat...")
-    scenario = sp.test_scenario("ActionChain Deployment", main)
-    scenario += contract
-    
     print("Contrat compilé avec succès!")
     print(f"Offre initiale: {initial_supply:,} {token_symbol}")
     print(f"Administrateur: {admin.address}")
     
-    return contract
+    return code, storage
 
 def test_contract_interactions():
     """Teste les interactions avec le contrat"""
@@ -57,9 +54,9 @@ def test_contract_interactions():
     
     # Étape 1: Mint des tokens pour les utilisateurs
     scenario.h2("🏭 Mint de tokens")
-    contract.mint(to_address=alice.address, amount=50_000).run(sender=admin)
-    contract.mint(to_address=bob.address, amount=30_000).run(sender=admin)
-    contract.mint(to_address=charlie.address, amount=20_000).run(sender=admin)
+    contract.dispatch(sp.variant.mint(sp.record(to_address=alice.address, amount=50_000))).run(sender=admin)
+    contract.dispatch(sp.variant.mint(sp.record(to_address=bob.address, amount=30_000))).run(sender=admin)
+    contract.dispatch(sp.variant.mint(sp.record(to_address=charlie.address, amount=20_000))).run(sender=admin)
     
     # Vérification des soldes
     scenario.verify(contract.get_balance(alice.address) == 50_000)
@@ -72,13 +69,17 @@ def test_contract_interactions():
     # Alice vend 1000 tokens à 1.25 tez chaque
     contract.place_sell_order(
         price=sp.mutez(1_250_000),  # 1.25 tez en mutez
-        quantity=1_000
+        quantity=1_000,
+        max_fills=10,
+        hint=None
     ).run(sender=alice)
     
     # Charlie vend 500 tokens à 1.30 tez chaque  
     contract.place_sell_order(
         price=sp.mutez(1_300_000),  # 1.30 tez en mutez
-        quantity=500
+        quantity=500,
+        max_fills=10,
+        hint=sp.Some(125)  # Nouveau niveau juste derriere 1.25
     ).run(sender=charlie)
     
     # Étape 3: Ordres d'achat (qui déclenchent des trades)
@@ -87,7 +88,9 @@ def test_contract_interactions():
     # Bob achète 500 tokens au prix de marché (1.25 tez)
     contract.place_buy_order(
         price=sp.mutez(1_250_000),  # 1.25 tez en mutez
-        quantity=500
+        quantity=500,
+        max_fills=10,
+        hint=None
     ).run(
         sender=bob,
         amount=sp.tez(625)  # 500 * 1.25 = 625 tez
@@ -97,22 +100,30 @@ def test_contract_interactions():
     scenario.verify(contract.get_balance(alice.address) == 49_500)  # 50_000 - 500
     scenario.verify(contract.get_balance(bob.address) == 30_500)    # 30_000 + 500
     
-    # Bob achète encore 300 tokens à un prix plus élevé
+    # Bob achète encore 300 tokens à un prix plus élevé:
+    # exécutés au prix d'Alice (1.25), l'écart lui est remboursé
     contract.place_buy_order(
         price=sp.mutez(1_300_000),  # 1.30 tez en mutez  
-        quantity=300
+        quantity=300,
+        max_fills=10,
+        hint=None
     ).run(
         sender=bob,
         amount=sp.tez(390)  # 300 * 1.30 = 390 tez
     )
     
+    scenario.verify(contract.get_balance(alice.address) == 49_200)  # 49_500 - 300
+    scenario.verify(contract.get_balance(bob.address) == 30_800)    # 30_500 + 300
+    
     # Étape 4: Ordre d'achat sans correspondance
     scenario.h2("Ordre d'achat en attente")
     
     # Bob place un ordre d'achat à un prix plus bas
     contract.place_buy_order(
         price=sp.mutez(1_200_000),  # 1.20 tez en mutez
-        quantity=200
+        quantity=200,
+        max_fills=10,
+        hint=None
     ).run(
         sender=bob,
         amount=sp.tez(240)  # 200 * 1.20 = 240 tez
@@ -123,7 +134,7 @@ def test_contract_interactions():
     
     # Bob annule son dernier ordre d'achat
     contract.cancel_order(
-        order_id=3,  # ID du dernier ordre
+        order_id=4,  # ID du dernier ordre
         order_type="buy"
     ).run(sender=bob)
     
@@ -136,16 +147,16 @@ def test_contract_interactions():
         amount=1_000
     ).run(sender=alice)
     
-    scenario.verify(contract.get_balance(alice.address) == 48_500)  # 49_500 - 1_000
-    scenario.verify(contract.get_balance(charlie.address) == 20_800) # 20_000 + 300 + 500 (achat) + 1_000
+    scenario.verify(contract.get_balance(alice.address) == 48_200)  # 49_200 - 1_000
+    scenario.verify(contract.get_balance(charlie.address) == 21_000) # 20_000 + 1_000
     
     # Étape 7: Test de burn
     scenario.h2("Burn de tokens")
     
     # Charlie burn 500 tokens
-    contract.burn(amount=500).run(sender=charlie)
-    scenario.verify(contract.get_balance(charlie.address) == 20_300)
-    scenario.verify(contract.get_total_supply() == 999_500)  # 1_000_000 - 500
+    contract.dispatch(sp.variant.burn(500)).run(sender=charlie)
+    scenario.verify(contract.get_balance(charlie.address) == 20_500)
+    scenario.verify(contract.get_total_supply() == 1_099_500)  # 1_000_000 + 100_000 (mint) - 500
     
     scenario.h2("Tests terminés avec succès!")
 
@@ -192,19 +203,23 @@ taquito get-contract KT1... --network ghostnet
 
 ### Mint de tokens (admin seulement)
 ```javascript
-await contract.methods.mint("tz1...", 10000).send()
+await contract.methodsObject.dispatch({ mint: { to_address: "tz1...", amount: 10000 } }).send()
 ```
 
 ### Placer un ordre d'achat
 ```javascript
-await contract.methods.place_buy_order(1250000, 100).send({
+await contract.methodsObject.place_buy_order({
+    price: 1250000, quantity: 100, max_fills: 10, hint: null
+}).send({
     amount: 125  // 100 * 1.25 tez
 })
 ```
 
 ### Placer un ordre de vente  
 ```javascript
-await contract.methods.place_sell_order(1300000, 50).send()
+await contract.methodsObject.place_sell_order({
+    price: 1300000, quantity: 50, max_fills: 10, hint: null
+}).send()
 ```
 """
     
@@ -238,13 +253,17 @@ const CONFIG = {
         maxOrderQuantity: 1000000,
         minPrice: 0.01,  // 0.01 tez
         maxPrice: 1000,  // 1000 tez
-        priceDecimals: 2 // Maximum 2 décimales
+        priceDecimals: 2, // Maximum 2 décimales
+        maxFills: 10      // Exécutions maximum par ordre placé
     },
     
     // Interface utilisateur
     UI: {
         refreshInterval: 5000,  // 5 secondes
         chartUpdateInterval: 30000,  // 30 secondes
+        chartResolution: 3600,  // Bougies d'une heure par défaut
+        chartHistory: 10080,  // Points conservés (une semaine en bougies d'une minute)
+        chartPoints: 300,  // Points dessinés après sous-échantillonnage
         maxOrderbookOrders: 10,
         maxTradeHistory: 50
     }
@@ -269,8 +288,8 @@ if __name__ == "__main__":
     print("ActionChain Token - Configuration de déploiement")
     print("=" * 50)
     
-    # Déployer et tester le contrat
-    contract = deploy_contract()
+    # Compiler et tester le contrat
+    deploy_contract()
     test_contract_interactions()
     generate_deployment_files()
     
@@ -0,0 +1,283 @@
+"""
+Etats pre-remplis d'ActionChain Token pour les scenarios de test
+
+Un scenario qui a besoin d'un carnet de 10 000 ordres ne peut pas les placer
+un par un dans SmartPy. Ici l'etat est construit en Python (modele de
+reference actionchain_model), converti en storage d'ActionChainToken
+(files des niveaux, chainage des ordres, meilleurs prix...) et origine en
+une seule etape avec main.ActionChainSnapshot.
+
+Deux sources d'etat:
+- une description declarative (soldes et ordres au repos), from_spec;
+- une suite d'operations rejouee sur le modele, from_run (par exemple un
+  flux de actionchain_model.random_flow), enregistrable en JSON.
+
+    model = fixtures.from_spec(fixtures.book_spec(["Alice", "Bob"], orders=10_000))
+    token = fixtures.originate(scenario, fixtures.snapshot(model))
+
+Usage:
+    python fixtures.py --operations 100000 --output book.json
+"""
+
+import argparse
+import json
+import random
+
+from actionchain_model import TICK_SIZE, ActionChainModel, Order, random_flow
+
+# Operations rares dont le code est range packe dans la big_map lambdas du contrat
+LAZY_OPERATIONS = ("mint", "burn", "set_trade_retention", "prune_trades", "cancel")
+
+# Champs du snapshot qui sont des maps (cle entiere, sauf levels: (est_achat, tick))
+MAP_FIELDS = ("balances", "reserved", "buy_orders", "sell_orders", "levels",
+              "order_links", "trades", "candles", "volume_buckets")
+
+
+def from_spec(spec):
+    """Modele dans l'etat decrit par `spec`, sans execution d'ordres.
+
+    spec = {
+        "admin": "Admin",
+        "balances": {"Alice": 100_000, ...},      # Soldes libres
+        "orders": [{"trader": "Alice", "order_type": "sell", "price": 1_100_000,
+                    "quantity": 500, "timestamp": 0}, ...],
+        "last_price": 1_000_000, "now": 0, "token_name": ..., "token_symbol": ...
+    }
+
+    Les ordres sont au repos dans l'ordre de la liste (priorite temporelle
+    par niveau); les tokens des ventes s'ajoutent aux soldes libres comme
+    tokens bloques, le depot des achats au solde en tez du contrat. Un
+    carnet croise est refuse: il n'existe pas dans le contrat.
+    """
+    model = ActionChainModel(spec["admin"], 0, spec.get("token_name", "ActionChain Token"),
+                             spec.get("token_symbol", "ACT"))
+    model.balances = {address: amount for address, amount in spec.get("balances", {}).items() if amount}
+    model.total_supply = sum(model.balances.values())
+    model.last_price = spec.get("last_price", model.last_price)
+    model.now = spec.get("now", 0)
+
+    for order in spec.get("orders", ()):
+        tick, remainder = divmod(order["price"], TICK_SIZE)
+        if remainder or tick <= 0 or order["quantity"] <= 0:
+            raise ValueError(f"Ordre invalide: {order}")
+        is_buy = order["order_type"] == "buy"
+        trader = order["trader"]
+        entry = Order(model.order_counter, trader, tick, order.get("timestamp", model.now),
+                      order["quantity"], is_buy)
+        if is_buy:
+            model.buy_orders[entry.order_id] = entry
+            model.balance += order["price"] * order["quantity"]
+        else:
+            model.sell_orders[entry.order_id] = entry
+            model.reserved[trader] = model.reserved.get(trader, 0) + order["quantity"]
+            model.total_supply += order["quantity"]
+        model._add_to_book(entry, model.level_hint(is_buy, tick))
+        model.order_counter += 1
+
+    best_bid, best_ask = model.best_bid_tick(), model.best_ask_tick()
+    if best_bid is not None and best_ask is not None and best_bid >= best_ask:
+        raise ValueError(f"Carnet croise: achat a {best_bid * TICK_SIZE}, vente a {best_ask * TICK_SIZE}")
+    return model
+
+
+def book_spec(traders, orders, admin="Admin", mid_price=1_000_000, levels=100, max_quantity=50,
+              funding=1_000_000, seed=0):
+    """Spec d'un carnet de `orders` ordres sur `levels` niveaux de chaque cote du prix milieu"""
+    rng = random.Random(seed)
+    mid_tick = mid_price // TICK_SIZE
+    spec_orders = []
+    for i in range(orders):
+        is_buy = i % 2 == 0
+        distance = rng.randint(1, levels)
+        tick = mid_tick - distance if is_buy else mid_tick + distance
+        spec_orders.append({"trader": rng.choice(traders), "order_type": "buy" if is_buy else "sell",
+                            "price": max(tick, 1) * TICK_SIZE, "quantity": rng.randint(1, max_quantity)})
+    balances = {trader: funding for trader in traders}
+    return {"admin": admin, "balances": balances, "orders": spec_orders, "last_price": mid_price}
+
+
+def from_run(calls, admin="Admin", initial_supply=0, model=None):
+    """Modele apres avoir rejoue les operations (entrypoint, arguments du modele).
+
+    Les operations refusees par le modele font echouer la construction.
+    """
+    model = model if model is not None else ActionChainModel(admin, initial_supply)
+    for entrypoint, kwargs in calls:
+        getattr(model, entrypoint)(**kwargs)
+    return model
+
+
+def level_chain(model, is_buy, levels, orders):
+    """Niveaux et chainage des ordres d'un cote du carnet, du meilleur prix au moins bon"""
+    ticks = sorted(model.bid_levels if is_buy else model.ask_levels, reverse=is_buy)
+    source = model.bid_levels if is_buy else model.ask_levels
+    for i, tick in enumerate(ticks):
+        queue = [order.order_id for order in source[tick].orders if order.quantity]
+        for position, order_id in enumerate(queue):
+            orders[order_id] = {"prev": queue[position - 1] if position else None,
+                                "next": queue[position + 1] if position + 1 < len(queue) else None}
+        levels[(is_buy, tick)] = {
+            "head": queue[0], "tail": queue[-1], "quantity": source[tick].quantity,
+            "better": ticks[i - 1] if i else None,
+            "worse": ticks[i + 1] if i + 1 < len(ticks) else None
+        }
+    return ticks[0] if ticks else None
+
+
+def snapshot(model):
+    """Storage d'ActionChainToken equivalent a l'etat du modele (valeurs Python, prix en mutez).
+
+    "balance" est le solde en tez du contrat, donne a l'origination.
+    """
+    levels, order_links = {}, {}
+    best_bid = level_chain(model, True, levels, order_links)
+    best_ask = level_chain(model, False, levels, order_links)
+
+    def orders(book):
+        return {order_id: {"trader": order.trader, "tick": order.tick, "quantity": order.quantity,
+                           "timestamp": order.timestamp}
+                for order_id, order in book.items()}
+
+    return {
+        "balances": dict(model.balances),
+        "reserved": dict(model.reserved),
+        "total_supply": model.total_supply,
+        "admin": model.admin,
+        "buy_orders": orders(model.buy_orders),
+        "sell_orders": orders(model.sell_orders),
+        "order_counter": model.order_counter,
+        "levels": levels,
+        "order_links": order_links,
+        "best_bid": best_bid,
+        "best_ask": best_ask,
+        "tick_size": model.tick_size,
+        "trades": {trade_id: dict(zip(("buyer", "seller", "price", "quantity", "timestamp"), trade))
+                   for trade_id, trade in model.trades.items()},
+        "trade_counter": model.trade_counter,
+        "trade_retention": model.trade_retention,
+        "candles": {period: dict(candle) for period, candle in model.candles.items()},
+        "candle_seconds": model.candle_seconds,
+        "last_price": model.last_price,
+        "volume_buckets": {slot: {"period": period, "volume": volume}
+                           for slot, (period, volume) in model.volume_buckets.items()},
+        "volume_bucket_seconds": model.volume_bucket_seconds,
+        "volume_bucket_count": model.volume_bucket_count,
+        "token_name": model.token_name,
+        "token_symbol": model.token_symbol,
+        "decimals": model.decimals,
+        "balance": model.balance
+    }
+
+
+def save(state, path):
+    """Ecrit un snapshot en JSON (les maps en listes de paires)"""
+    data = {field: [[key, value] for key, value in state[field].items()] if field in MAP_FIELDS else state[field]
+            for field in state}
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def load(path):
+    with open(path) as f:
+        data = json.load(f)
+    for field in MAP_FIELDS:
+        data[field] = {tuple(key) if isinstance(key, list) else key: value for key, value in data[field]}
+    return data
+
+
+def to_smartpy(state):
+    """Valeur SmartPy du storage (adresses: tz1.../KT1... ou noms de sp.test_account).
+
+    Le code packe des operations rares (lambdas) est celui du contrat courant.
+    """
+    import smartpy as sp
+    from ActionChain import main
+
+    def address(value):
+        return sp.address(value) if value[:2] in ("tz", "KT") else sp.test_account(value).address
+
+    def option(value):
+        return None if value is None else sp.Some(value)
+
+    return sp.record(
+        balances=sp.big_map({address(owner): amount for owner, amount in state["balances"].items()}),
+        reserved=sp.big_map({address(owner): amount for owner, amount in state["reserved"].items()}),
+        total_supply=state["total_supply"],
+        admin=address(state["admin"]),
+        buy_orders=sp.big_map({
+            order_id: sp.record(trader=address(order["trader"]), tick=order["tick"], quantity=order["quantity"],
+                                timestamp=sp.timestamp(order["timestamp"]))
+            for order_id, order in state["buy_orders"].items()
+        }),
+        sell_orders=sp.big_map({
+            order_id: sp.record(trader=address(order["trader"]), tick=order["tick"], quantity=order["quantity"],
+                                timestamp=sp.timestamp(order["timestamp"]))
+            for order_id, order in state["sell_orders"].items()
+        }),
+        order_counter=state["order_counter"],
+        levels=sp.big_map({
+            key: sp.record(head=level["head"], tail=level["tail"], quantity=level["quantity"],
+                           better=option(level["better"]), worse=option(level["worse"]))
+            for key, level in state["levels"].items()
+        }),
+        order_links=sp.big_map({
+            order_id: sp.record(prev=option(link["prev"]), next=option(link["next"]))
+            for order_id, link in state["order_links"].items()
+        }),
+        best_bid=option(state["best_bid"]),
+        best_ask=option(state["best_ask"]),
+        tick_size=sp.mutez(state["tick_size"]),
+        trades=sp.big_map({
+            trade_id: sp.record(buyer=address(trade["buyer"]), seller=address(trade["seller"]),
+                                price=sp.mutez(trade["price"]), quantity=trade["quantity"],
+                                timestamp=sp.timestamp(trade["timestamp"]))
+            for trade_id, trade in state["trades"].items()
+        }),
+        trade_counter=state["trade_counter"],
+        trade_retention=state["trade_retention"],
+        candles=sp.big_map({
+            period: sp.record(open=sp.mutez(candle["open"]), high=sp.mutez(candle["high"]),
+                              low=sp.mutez(candle["low"]), close=sp.mutez(candle["close"]),
+                              volume=candle["volume"], trades=candle["trades"])
+            for period, candle in state["candles"].items()
+        }),
+        candle_seconds=state["candle_seconds"],
+        last_price=sp.mutez(state["last_price"]),
+        volume_buckets={slot: sp.record(period=bucket["period"], volume=bucket["volume"])
+                        for slot, bucket in state["volume_buckets"].items()},
+        volume_bucket_seconds=state["volume_bucket_seconds"],
+        volume_bucket_count=state["volume_bucket_count"],
+        token_name=state["token_name"],
+        token_symbol=state["token_symbol"],
+        decimals=state["decimals"],
+        lambdas=sp.big_map({name: sp.pack(getattr(main, name + "_lambda")) for name in LAZY_OPERATIONS})
+    )
+
+
+def originate(scenario, state):
+    """Origine main.ActionChainSnapshot dans l'etat `state` (voir snapshot) et le renvoie"""
+    import smartpy as sp
+    from ActionChain import main
+
+    contract = main.ActionChainSnapshot(to_smartpy(state))
+    contract.set_initial_balance(sp.mutez(state["balance"]))
+    scenario += contract
+    return contract
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Enregistre l'etat du modele apres un flux d'operations aleatoires")
+    parser.add_argument("--operations", type=int, default=100_000)
+    parser.add_argument("--traders", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="snapshot.json")
+    args = parser.parse_args()
+
+    traders = ["trader%d" % i for i in range(args.traders)]
+    model = from_run((("mint", {"sender": "Admin", "to_address": trader, "amount": 10 ** 9}) for trader in traders))
+    for _ in random_flow(model, traders, args.operations, args.seed):
+        pass  # random_flow applique chaque operation au modele
+    state = snapshot(model)
+    save(state, args.output)
+    print(f"{len(state['buy_orders']) + len(state['sell_orders'])} ordres en attente, "
+          f"{state['trade_counter']} trades: {args.output}")
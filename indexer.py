@@ -0,0 +1,415 @@
+"""
+Indexeur hors chaine d'ActionChain Token
+
+Lit les blocs (operations du contrat et diffs des big_maps balances,
+reserved, buy_orders, sell_orders, trades et candles) depuis le
+noeud simule mock_rpc.py ou des fichiers de blocs enregistres, et les range
+dans une base SQLite: soldes, ordres, carnet agrege par niveau de prix,
+historique complet des trades et bougies a plusieurs resolutions. Les
+requetes lisent ces tables au lieu de parcourir les big_maps.
+
+Les bougies a la resolution du contrat (candle_seconds) et a ses multiples
+sont reprises du big_map candles: elles restent completes avec
+trade_retention a 0 ou apres prune_trades. Les resolutions plus fines sont
+calculees a partir des trades et demandent une retention non nulle.
+
+L'indexation reprend au curseur enregistre et applique les blocs par lots
+dans une meme transaction. Chaque ecriture garde l'ancienne ligne dans un
+journal d'annulation: en cas de reorganisation, la base revient au dernier
+point de controle encore present dans la chaine, puis reindexe.
+
+Usage:
+    python indexer.py --rpc http://127.0.0.1:8732 --db actionchain.db
+    python indexer.py --fixtures blocks.jsonl --db actionchain.db
+    python indexer.py --rpc http://127.0.0.1:8732 --follow
+"""
+
+import argparse
+import json
+import sqlite3
+import time
+import urllib.request
+
+from actionchain_model import TICK_SIZE
+
+CANDLE_RESOLUTIONS = (60, 300, 900, 3600, 14400, 86400)
+
+# Tables materialisees: colonnes de cle, colonnes de valeur
+TABLES = {
+    "balances": (("address",), ("available", "reserved")),
+    "orders": (("order_id",), ("side", "trader", "tick", "quantity", "timestamp")),
+    "levels": (("side", "tick"), ("quantity", "orders")),
+    "trades": (("trade_id",), ("level", "buyer", "seller", "price", "quantity", "timestamp")),
+    "candles": (("resolution", "period"), ("open", "high", "low", "close", "volume", "trades")),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cursor (id INTEGER PRIMARY KEY CHECK (id = 0), level INTEGER, hash TEXT);
+CREATE TABLE IF NOT EXISTS blocks (level INTEGER PRIMARY KEY, hash TEXT, predecessor TEXT, timestamp INTEGER);
+CREATE TABLE IF NOT EXISTS checkpoints (level INTEGER PRIMARY KEY, hash TEXT);
+CREATE TABLE IF NOT EXISTS undo (seq INTEGER PRIMARY KEY AUTOINCREMENT, level INTEGER, tbl TEXT, key TEXT, row TEXT);
+CREATE TABLE IF NOT EXISTS operations (
+    hash TEXT, level INTEGER, source TEXT, entrypoint TEXT, amount INTEGER, status TEXT
+);
+CREATE INDEX IF NOT EXISTS operations_level ON operations (level);
+CREATE TABLE IF NOT EXISTS balances (
+    address TEXT PRIMARY KEY, available INTEGER NOT NULL, reserved INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS orders (
+    order_id INTEGER PRIMARY KEY, side TEXT, trader TEXT, tick INTEGER, quantity INTEGER, timestamp INTEGER
+);
+CREATE INDEX IF NOT EXISTS orders_trader ON orders (trader);
+CREATE TABLE IF NOT EXISTS levels (
+    side TEXT, tick INTEGER, quantity INTEGER, orders INTEGER, PRIMARY KEY (side, tick)
+);
+CREATE TABLE IF NOT EXISTS trades (
+    trade_id INTEGER PRIMARY KEY, level INTEGER, buyer TEXT, seller TEXT,
+    price INTEGER, quantity INTEGER, timestamp INTEGER
+);
+CREATE INDEX IF NOT EXISTS trades_timestamp ON trades (timestamp);
+CREATE TABLE IF NOT EXISTS candles (
+    resolution INTEGER, period INTEGER, open INTEGER, high INTEGER, low INTEGER, close INTEGER,
+    volume INTEGER, trades INTEGER, PRIMARY KEY (resolution, period)
+);
+"""
+
+
+class ReorgError(Exception):
+    """Reorganisation plus profonde que le plus ancien point de controle"""
+
+
+class RpcSource:
+    """Blocs lus sur un noeud (mock_rpc.py)"""
+
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+
+    def get(self, path):
+        with urllib.request.urlopen(self.url + path) as response:
+            return json.loads(response.read())
+
+    def head(self):
+        return self.get("/chains/main/blocks/head/header")["level"]
+
+    def block(self, level):
+        return self.get(f"/chains/main/blocks/{level}")
+
+
+class FixtureSource:
+    """Blocs enregistres: un bloc JSON par ligne, au format de mock_rpc.py"""
+
+    def __init__(self, path):
+        self.blocks = {}
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    block = json.loads(line)
+                    self.blocks[block["level"]] = block  # Le dernier bloc d'un niveau l'emporte
+
+    def head(self):
+        return max(self.blocks) if self.blocks else 0
+
+    def block(self, level):
+        return self.blocks[level]
+
+
+class Indexer:
+    """Base SQLite alimentee bloc par bloc"""
+
+    def __init__(self, path=":memory:", checkpoint_interval=10, max_checkpoints=10, candle_seconds=3600):
+        self.db = sqlite3.connect(path, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self.checkpoint_interval = checkpoint_interval
+        self.max_checkpoints = max_checkpoints
+        self.candle_seconds = candle_seconds  # Periode des bougies du contrat
+        self.level = None  # Niveau du bloc en cours d'application
+
+    # Curseur et points de controle
+
+    def cursor(self):
+        """(niveau, hash) du dernier bloc indexe, ou (None, None)"""
+        row = self.db.execute("SELECT level, hash FROM cursor WHERE id = 0").fetchone()
+        return row if row else (None, None)
+
+    def checkpoints(self):
+        return self.db.execute("SELECT level, hash FROM checkpoints ORDER BY level DESC").fetchall()
+
+    def save_checkpoint(self, level, block_hash):
+        self.db.execute("INSERT OR REPLACE INTO checkpoints VALUES (?, ?)", (level, block_hash))
+        kept = self.checkpoints()[:self.max_checkpoints]
+        oldest = kept[-1][0]
+        self.db.execute("DELETE FROM checkpoints WHERE level < ?", (oldest,))
+        # Au-dela du plus ancien point de controle, les blocs sont consideres definitifs
+        self.db.execute("DELETE FROM undo WHERE level <= ?", (oldest,))
+
+    # Ecritures journalisees
+
+    def get(self, table, key):
+        keys, values = TABLES[table]
+        where = " AND ".join(f"{column} = ?" for column in keys)
+        return self.db.execute(f"SELECT {', '.join(values)} FROM {table} WHERE {where}", key).fetchone()
+
+    def journal(self, table, key):
+        previous = self.get(table, key)
+        self.db.execute("INSERT INTO undo (level, tbl, key, row) VALUES (?, ?, ?, ?)", (
+            self.level, table, json.dumps(key), None if previous is None else json.dumps(previous)
+        ))
+        return previous
+
+    def put(self, table, key, row):
+        keys, values = TABLES[table]
+        self.journal(table, key)
+        placeholders = ", ".join("?" * (len(keys) + len(values)))
+        self.db.execute(f"INSERT OR REPLACE INTO {table} VALUES ({placeholders})", tuple(key) + tuple(row))
+
+    def delete(self, table, key):
+        keys, _ = TABLES[table]
+        if self.journal(table, key) is not None:
+            where = " AND ".join(f"{column} = ?" for column in keys)
+            self.db.execute(f"DELETE FROM {table} WHERE {where}", key)
+
+    def rollback_to(self, level):
+        """Annule tous les blocs au-dessus de `level`"""
+        undo = self.db.execute(
+            "SELECT tbl, key, row FROM undo WHERE level > ? ORDER BY seq DESC", (level,)
+        ).fetchall()
+        for table, key, row in undo:
+            keys, values = TABLES[table]
+            key = json.loads(key)
+            where = " AND ".join(f"{column} = ?" for column in keys)
+            self.db.execute(f"DELETE FROM {table} WHERE {where}", key)
+            if row is not None:
+                placeholders = ", ".join("?" * (len(keys) + len(values)))
+                self.db.execute(f"INSERT INTO {table} VALUES ({placeholders})", key + json.loads(row))
+        self.db.execute("DELETE FROM undo WHERE level > ?", (level,))
+        self.db.execute("DELETE FROM operations WHERE level > ?", (level,))
+        self.db.execute("DELETE FROM blocks WHERE level > ?", (level,))
+        self.db.execute("DELETE FROM checkpoints WHERE level > ?", (level,))
+        block_hash = self.db.execute("SELECT hash FROM blocks WHERE level = ?", (level,)).fetchone()
+        self.db.execute("INSERT OR REPLACE INTO cursor VALUES (0, ?, ?)", (level, block_hash[0]))
+
+    # Application des diffs
+
+    def set_balance(self, address, available=None, reserved=None):
+        row = self.get("balances", (address,)) or (0, 0)
+        row = (row[0] if available is None else available, row[1] if reserved is None else reserved)
+        if row == (0, 0):
+            self.delete("balances", (address,))
+        else:
+            self.put("balances", (address,), row)
+
+    def adjust_level(self, side, tick, quantity, orders):
+        row = self.get("levels", (side, tick)) or (0, 0)
+        row = (row[0] + quantity, row[1] + orders)
+        if row[1] == 0:
+            self.delete("levels", (side, tick))
+        else:
+            self.put("levels", (side, tick), row)
+
+    def set_order(self, order_id, side, record):
+        previous = self.get("orders", (order_id,))
+        old_quantity = previous[3] if previous is not None else 0
+        trader, tick, quantity, timestamp = record["trader"], record["tick"], record["quantity"], record["timestamp"]
+        self.put("orders", (order_id,), (side, trader, tick, quantity, timestamp))
+        self.adjust_level(side, tick, quantity - old_quantity, 0 if previous is not None else 1)
+
+    def remove_order(self, order_id):
+        previous = self.get("orders", (order_id,))
+        if previous is not None:
+            side, _, tick, quantity, _ = previous
+            self.delete("orders", (order_id,))
+            self.adjust_level(side, tick, -quantity, -1)
+
+    def add_trade(self, trade_id, trade):
+        if self.get("trades", (trade_id,)) is not None:
+            return
+        price, quantity, timestamp = trade["price"], trade["quantity"], trade["timestamp"]
+        self.put("trades", (trade_id,), (self.level, trade["buyer"], trade["seller"], price, quantity, timestamp))
+        for resolution in CANDLE_RESOLUTIONS:
+            key = (resolution, timestamp // resolution)
+            candle = self.get("candles", key)
+            if candle is None:
+                candle = (price, price, price, price, quantity, 1)
+            else:
+                candle = (candle[0], max(candle[1], price), min(candle[2], price), price,
+                          candle[4] + quantity, candle[5] + 1)
+            self.put("candles", key, candle)
+
+    def set_contract_candle(self, period, candle):
+        """Bougie du contrat (valeur complete de la periode), puis resolutions multiples recalculees"""
+        seconds = self.candle_seconds
+        self.put("candles", (seconds, period), (candle["open"], candle["high"], candle["low"], candle["close"],
+                                                 candle["volume"], candle["trades"]))
+        for resolution in CANDLE_RESOLUTIONS:
+            if resolution <= seconds or resolution % seconds:
+                continue
+            coarse = period * seconds // resolution
+            rows = self.db.execute(
+                "SELECT open, high, low, close, volume, trades FROM candles "
+                "WHERE resolution = ? AND period >= ? AND period < ? ORDER BY period",
+                (seconds, coarse * resolution // seconds, (coarse + 1) * resolution // seconds)
+            ).fetchall()
+            self.put("candles", (resolution, coarse), (
+                rows[0][0], max(row[1] for row in rows), min(row[2] for row in rows), rows[-1][3],
+                sum(row[4] for row in rows), sum(row[5] for row in rows)
+            ))
+
+    def apply_block(self, block):
+        self.level = block["level"]
+        diffs = {}
+        for diff in block["big_map_diffs"]:
+            diffs.setdefault(diff["path"], []).append(diff)
+
+        for path, column in (("balances", "available"), ("reserved", "reserved")):
+            for diff in diffs.get(path, ()):
+                value = diff.get("value", 0) if diff["action"] == "update_key" else 0
+                self.set_balance(diff["key"], **{column: value})
+
+        # Ordres: chaque diff porte le record complet, quantite restante comprise
+        records, removed = {}, set()
+        for path, side in (("buy_orders", "buy"), ("sell_orders", "sell")):
+            for diff in diffs.get(path, ()):
+                if diff["action"] == "remove_key":
+                    removed.add(diff["key"])
+                else:
+                    records[diff["key"]] = (side, diff["value"])
+        for order_id in sorted(removed):
+            self.remove_order(order_id)
+        for order_id in sorted(set(records) - removed):
+            side, record = records[order_id]
+            self.set_order(order_id, side, record)
+
+        # Les trades supprimes par la retention du contrat restent dans l'historique
+        for diff in sorted(diffs.get("trades", ()), key=lambda diff: diff["key"]):
+            if diff["action"] == "update_key":
+                self.add_trade(diff["key"], diff["value"])
+        # Apres les trades: les bougies du contrat font foi, meme sans trades conserves
+        for diff in sorted(diffs.get("candles", ()), key=lambda diff: diff["key"]):
+            if diff["action"] == "update_key":
+                self.set_contract_candle(diff["key"], diff["value"])
+
+        self.db.executemany("INSERT INTO operations VALUES (?, ?, ?, ?, ?, ?)", [
+            (op["hash"], self.level, op["source"], op["entrypoint"], op["amount"], op["status"])
+            for op in block["operations"]
+        ])
+        self.db.execute("INSERT OR REPLACE INTO blocks VALUES (?, ?, ?, ?)", (
+            self.level, block["hash"], block["predecessor"], block["timestamp"]
+        ))
+        self.db.execute("INSERT OR REPLACE INTO cursor VALUES (0, ?, ?)", (self.level, block["hash"]))
+        if self.level % self.checkpoint_interval == 0:
+            self.save_checkpoint(self.level, block["hash"])
+
+    def handle_reorg(self, source):
+        """Revient au plus recent point de controle encore dans la chaine de la source"""
+        head = source.head()
+        for level, block_hash in self.checkpoints():
+            if level <= head and source.block(level)["hash"] == block_hash:
+                self.rollback_to(level)
+                return level
+        raise ReorgError("Aucun point de controle commun avec la chaine")
+
+    def sync(self, source, batch_size=100):
+        """Indexe jusqu'a la tete de la source; renvoie le nombre de blocs appliques"""
+        applied = 0
+        head = source.head()
+        level, block_hash = self.cursor()
+        if level is not None and (level > head or source.block(level)["hash"] != block_hash):
+            # La tete indexee n'est plus dans la chaine (chaine plus courte ou bloc remplace)
+            self.db.execute("BEGIN")
+            try:
+                self.handle_reorg(source)
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+            self.db.execute("COMMIT")
+            level, block_hash = self.cursor()
+        next_level = 0 if level is None else level + 1
+        while next_level <= head:
+            self.db.execute("BEGIN")
+            try:
+                end = min(head, next_level + batch_size - 1)
+                while next_level <= end:
+                    block = source.block(next_level)
+                    if block_hash is not None and block["predecessor"] != block_hash:
+                        next_level = self.handle_reorg(source) + 1
+                        level, block_hash = self.cursor()
+                        continue
+                    self.apply_block(block)
+                    block_hash = block["hash"]
+                    next_level += 1
+                    applied += 1
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+        return applied
+
+    # Requetes
+
+    def book(self, depth=10):
+        """Meilleurs niveaux agreges de chaque cote: {bids, asks} de {price, quantity, orders}"""
+        def side(name, order):
+            return [
+                {"price": tick * TICK_SIZE, "quantity": quantity, "orders": orders}
+                for tick, quantity, orders in self.db.execute(
+                    f"SELECT tick, quantity, orders FROM levels WHERE side = ? ORDER BY tick {order} LIMIT ?",
+                    (name, depth)
+                )
+            ]
+        return {"bids": side("buy", "DESC"), "asks": side("sell", "ASC")}
+
+    def balance(self, address):
+        row = self.get("balances", (address,)) or (0, 0)
+        return {"available": row[0], "reserved": row[1], "total": row[0] + row[1]}
+
+    def open_orders(self, trader):
+        return [
+            dict(zip(("order_id", "side", "price", "quantity", "timestamp"),
+                     (order_id, side, tick * TICK_SIZE, quantity, timestamp)))
+            for order_id, side, tick, quantity, timestamp in self.db.execute(
+                "SELECT order_id, side, tick, quantity, timestamp FROM orders WHERE trader = ? ORDER BY order_id",
+                (trader,)
+            )
+        ]
+
+    def recent_trades(self, limit=50):
+        columns = ("trade_id", "buyer", "seller", "price", "quantity", "timestamp")
+        return [dict(zip(columns, row)) for row in self.db.execute(
+            f"SELECT {', '.join(columns)} FROM trades ORDER BY trade_id DESC LIMIT ?", (limit,)
+        )]
+
+    def candles(self, resolution=3600, start=0, end=None):
+        columns = ("period", "open", "high", "low", "close", "volume", "trades")
+        rows = self.db.execute(
+            f"SELECT {', '.join(columns)} FROM candles WHERE resolution = ? AND period >= ? AND period <= ? "
+            "ORDER BY period", (resolution, start // resolution, (end if end is not None else 2 ** 62) // resolution)
+        )
+        return [dict(zip(columns, row), time=row[0] * resolution) for row in rows]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Indexeur SQLite d'ActionChain Token")
+    source_group = parser.add_mutually_exclusive_group(required=True)
+    source_group.add_argument("--rpc", help="URL du noeud (mock_rpc.py)")
+    source_group.add_argument("--fixtures", help="fichier de blocs enregistres (JSON par ligne)")
+    parser.add_argument("--db", default="actionchain.db")
+    parser.add_argument("--batch-size", type=int, default=100, help="blocs par transaction")
+    parser.add_argument("--follow", action="store_true", help="suivre la tete de la chaine")
+    parser.add_argument("--interval", type=float, default=1.0, help="secondes entre deux suivis")
+    parser.add_argument("--candle-seconds", type=int, default=3600, help="candle_seconds du contrat")
+    args = parser.parse_args()
+
+    source = RpcSource(args.rpc) if args.rpc else FixtureSource(args.fixtures)
+    indexer = Indexer(args.db, candle_seconds=args.candle_seconds)
+    while True:
+        started = time.perf_counter()
+        applied = indexer.sync(source, args.batch_size)
+        if applied or not args.follow:
+            level, _ = indexer.cursor()
+            print(f"{applied} blocs indexes en {time.perf_counter() - started:.2f} s (niveau {level})")
+            print(json.dumps(indexer.book(5), indent=2))
+        if not args.follow:
+            break
+        time.sleep(args.interval)
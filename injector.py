@@ -0,0 +1,316 @@
+"""
+Pipeline asynchrone d'injection d'ordres sur plusieurs cles
+
+Un compte Tezos n'a qu'un nombre limite d'operations en vol: un teneur de
+marche qui signe tout avec une seule cle est borne par la serialisation de
+son compteur. Ce pipeline repartit les ordres (place_buy_order /
+place_sell_order) sur un ensemble de cles; pour chaque cle, la preparation
+(simulation, forgeage, signature) du groupe suivant chevauche l'injection du
+groupe en cours, et toutes les cles avancent en parallele.
+
+Contre-pression: la file d'ordres et les files d'injection de chaque cle
+sont bornees; quand le noeud ralentit, les injections s'allongent, les files
+se remplissent et `submit` attend avant d'accepter de nouveaux ordres.
+
+Les etapes sont celles d'un Backend. MockBackend vise le noeud simule
+(mock_rpc.py): la simulation verifie localement les preconditions du
+contrat, le forgeage construit l'operation JSON non signee et la signature
+est l'identite (le noeud simule ne verifie pas de signature). Un backend pour
+un vrai noeud remplacerait ces trois etapes (simulate_operation, forge,
+signataire) sans toucher au pipeline.
+
+Indices de niveau: un ordre qui cree un niveau de prix designe le niveau
+voisin meilleur (hint). Ils sont calcules a la preparation de chaque groupe,
+d'apres le carnet du noeud (vue get_depth) sur lequel les groupes en vol de
+la cle puis les ordres du groupe sont executes un a un (BookView). Un groupe
+en vol d'une autre cle peut rendre un indice faux: le groupe refuse est alors
+remis en file et prepare de nouveau (au plus MAX_RETRIES fois par ordre).
+
+Usage:
+    python mock_rpc.py --latency 20 &
+    python injector.py --keys 8 --orders 5000 --batch 10
+"""
+
+import argparse
+import asyncio
+import bisect
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import mock_rpc
+from actionchain_client import COUNTER_ERRORS, ActionChainClient, ConnectionPool, RpcError
+from actionchain_model import TICK_SIZE, ContractError
+
+MAX_RETRIES = 3
+DEPTH_LEVELS = 100  # Niveaux lus par cote pour les indices (maximum de get_depth)
+HINT_ERROR = "Indice de niveau invalide"
+
+
+class BookView:
+    """Niveaux du carnet (tick -> quantite) vus par la preparation d'un groupe:
+    ceux du noeud, mis a jour par les ordres qui le precedent"""
+
+    def __init__(self, depth):
+        self.levels = {True: {level["price"] // TICK_SIZE: level["quantity"] for level in depth["bids"]},
+                       False: {level["price"] // TICK_SIZE: level["quantity"] for level in depth["asks"]}}
+        # Ticks croissants de chaque cote
+        self.ticks = {is_buy: sorted(levels) for is_buy, levels in self.levels.items()}
+
+    def place(self, is_buy, tick, quantity):
+        """Execute l'ordre contre le cote oppose (par niveaux, sans limite
+        d'executions), met le reste au repos et renvoie l'indice de l'ordre:
+        le niveau voisin meilleur, ou None.
+
+        L'indice est donne meme si le niveau existe (le contrat l'ignore alors):
+        il reste juste si ce niveau se vide avant l'injection.
+        """
+        opposite, ticks = self.levels[not is_buy], self.ticks[not is_buy]
+        while quantity and ticks:
+            best = ticks[0] if is_buy else ticks[-1]
+            if (best > tick) if is_buy else (best < tick):
+                break
+            filled = min(quantity, opposite[best])
+            quantity -= filled
+            opposite[best] -= filled
+            if not opposite[best]:
+                del opposite[best]
+                ticks.pop(0 if is_buy else -1)
+
+        levels, ticks = self.levels[is_buy], self.ticks[is_buy]
+        index = bisect.bisect_left(ticks, tick)
+        exists = index < len(ticks) and ticks[index] == tick
+        if is_buy:
+            better = index + exists
+            hint = ticks[better] if better < len(ticks) else None
+        else:
+            hint = ticks[index - 1] if index else None
+        if quantity:
+            if not exists:
+                ticks.insert(index, tick)
+            levels[tick] = levels.get(tick, 0) + quantity
+        return hint
+
+
+class MockBackend:
+    """Etapes simulate / forge / sign / inject contre le noeud simule"""
+
+    def __init__(self, url, keys):
+        self.pool = ConnectionPool(url, size=len(keys))
+        self.clients = {key: ActionChainClient(None, key, self.pool) for key in keys}
+        # Une requete bloquante en cours par cle au plus
+        self.executor = ThreadPoolExecutor(max_workers=len(keys))
+
+    async def request(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def counter(self, key):
+        return await self.request(self.clients[key].fetch_counter)
+
+    async def depth(self, key):
+        return await self.request(self.clients[key].get_depth, DEPTH_LEVELS)
+
+    async def simulate(self, key, contents):
+        # Pas de simulation sur le noeud simule: preconditions du contrat verifiees localement
+        for content in contents:
+            value = content["value"]
+            if value["quantity"] <= 0:
+                raise ContractError("Quantite doit etre positive")
+            if value["price"] <= 0:
+                raise ContractError("Prix doit etre positif")
+            if value["price"] % TICK_SIZE:
+                raise ContractError("Prix doit avoir maximum 2 decimales")
+
+    async def forge(self, key, counter, contents, now=None):
+        operation = {"source": key, "counter": counter, "contents": contents}
+        if now is not None:
+            operation["now"] = now
+        return operation
+
+    async def sign(self, key, forged):
+        return forged
+
+    async def inject(self, signed):
+        status, receipt = await self.request(self.pool.request, "POST", "/injection/operation", signed)
+        if status != 200:
+            raise RpcError(status, receipt.get("error") if isinstance(receipt, dict) else receipt)
+        return receipt
+
+
+class Injector:
+    """Repartit les ordres sur les cles et enchaine les etapes en pipeline"""
+
+    def __init__(self, backend, keys, batch_size=10, queue_size=1000, in_flight=2):
+        self.backend = backend
+        self.keys = list(keys)
+        self.batch_size = batch_size
+        self.orders = asyncio.Queue(maxsize=queue_size)
+        # Groupes signes en attente d'injection, par cle (au plus in_flight)
+        self.signed = {key: asyncio.Queue(maxsize=in_flight) for key in self.keys}
+        self.counters = {}   # Prochain compteur a forger, par cle
+        self.applied = {}    # Dernier compteur accepte par le noeud, par cle
+        self.tasks = []
+        self.stats = {"orders": 0, "groups": 0, "refused": 0, "retries": 0}
+        # Ordres des groupes prepares et pas encore injectes, par cle
+        self.pending = {key: [] for key in self.keys}
+
+    async def start(self):
+        for key in self.keys:
+            self.applied[key] = await self.backend.counter(key)
+            self.counters[key] = self.applied[key] + 1
+            self.tasks.append(asyncio.create_task(self.prepare(key)))
+            self.tasks.append(asyncio.create_task(self.send(key)))
+
+    async def submit(self, order_type, price, quantity, max_fills=10, now=None):
+        """Met un ordre en file (attend si la file est pleine); renvoie un futur du recu"""
+        future = asyncio.get_running_loop().create_future()
+        await self.orders.put((order_type, price, quantity, max_fills, now, 0, future))
+        return future
+
+    async def prepare(self, key):
+        """Simulation, forgeage et signature des groupes d'une cle"""
+        while True:
+            batch = [await self.orders.get()]
+            while len(batch) < self.batch_size and not self.orders.empty():
+                batch.append(self.orders.get_nowait())
+            contents = []
+            orders = []
+            # Carnet du noeud, suivi des groupes de la cle encore en vol (leur
+            # ordre d'inclusion est celui des compteurs)
+            book = BookView(await self.backend.depth(key))
+            for order_type, price, quantity, *_ in self.pending[key]:
+                book.place(order_type == "buy", price // TICK_SIZE, quantity)
+            for order in batch:
+                order_type, price, quantity, max_fills, _, _, future = order
+                is_buy = order_type == "buy"
+                hint = book.place(is_buy, price // TICK_SIZE, quantity)
+                content = {"entrypoint": "place_buy_order" if is_buy else "place_sell_order",
+                           "value": {"price": price, "quantity": quantity, "max_fills": max_fills,
+                                     "hint": hint},
+                           "amount": price * quantity if order_type == "buy" else 0}
+                try:
+                    await self.backend.simulate(key, [content])
+                except ContractError as error:
+                    # Ecarte avant de consommer un compteur, sans faire echouer le groupe
+                    self.fail([future], error)
+                    continue
+                contents.append(content)
+                orders.append(order)
+            if not contents:
+                continue
+            now = batch[-1][4]
+            counter = self.counters[key]
+            self.counters[key] += len(contents)
+            self.pending[key].extend(orders)
+            signed = await self.backend.sign(key, await self.backend.forge(key, counter, contents, now))
+            await self.signed[key].put((counter, contents, now, signed, orders))
+
+    async def send(self, key):
+        """Injection des groupes signes d'une cle, dans l'ordre des compteurs"""
+        queue = self.signed[key]
+        while True:
+            counter, contents, now, signed, orders = await queue.get()
+            futures = [order[-1] for order in orders]
+            for attempt in range(MAX_RETRIES + 1):
+                if counter != self.applied[key] + 1:
+                    # Un groupe precedent a ete refuse: reforger au bon compteur
+                    counter = self.applied[key] + 1
+                    signed = await self.backend.sign(key, await self.backend.forge(key, counter, contents, now))
+                try:
+                    receipt = await self.backend.inject(signed)
+                except RpcError as error:
+                    if error.error in COUNTER_ERRORS and attempt < MAX_RETRIES:
+                        # Compteur modifie hors du pipeline: relire celui du noeud
+                        self.stats["retries"] += 1
+                        self.applied[key] = await self.backend.counter(key)
+                        continue
+                    if error.error == HINT_ERROR:
+                        self.requeue(orders, error)
+                        break
+                    self.fail(futures, error)
+                    break
+                except OSError as error:
+                    self.fail(futures, error)
+                    break
+                self.applied[key] = counter + len(contents) - 1
+                self.stats["groups"] += 1
+                self.stats["orders"] += len(contents)
+                for future in futures:
+                    if not future.done():
+                        future.set_result(receipt)
+                break
+            del self.pending[key][:len(orders)]
+            if self.counters[key] <= self.applied[key]:
+                self.counters[key] = self.applied[key] + 1
+            queue.task_done()
+
+    def requeue(self, orders, error):
+        """Remet en file les ordres d'un groupe refuse pour un indice perime
+        (niveau cree ou vide par un groupe en vol): la preparation suivante
+        relit le carnet du noeud"""
+        retry = []
+        for order in orders:
+            if order[5] < MAX_RETRIES:
+                retry.append(order[:5] + (order[5] + 1, order[6]))
+            else:
+                self.fail([order[6]], error)
+        self.stats["retries"] += len(retry)
+        if retry:
+            # Tache separee: la file d'ordres bornee ne doit pas bloquer l'injection
+            self.tasks.append(asyncio.create_task(self.put_all(retry)))
+
+    async def put_all(self, orders):
+        for order in orders:
+            await self.orders.put(order)
+
+    def fail(self, futures, error):
+        self.stats["refused"] += len(futures)
+        for future in futures:
+            if not future.done():
+                future.set_exception(error)
+
+    async def close(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+
+async def run(url, keys, orders, batch_size, in_flight, admin=mock_rpc.ADMIN, funding=1_000_000, seed=0):
+    from loadgen import order_flow
+
+    # Provision des cles: un seul groupe de mint par l'admin du contrat
+    funder = ActionChainClient(url, admin)
+    with funder.batch() as batch:
+        for key in keys:
+            batch.mint(key, funding)
+
+    injector = Injector(MockBackend(url, keys), keys, batch_size, in_flight=in_flight)
+    await injector.start()
+    started = time.perf_counter()
+    futures = []
+    for now, _, order_type, price, quantity in order_flow(keys, orders, cancel_ratio=0, seed=seed):
+        futures.append(await injector.submit(order_type, price, quantity, now=now))
+    await asyncio.gather(*futures, return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    await injector.close()
+    return dict(injector.stats, keys=len(keys), seconds=elapsed,
+                orders_per_second=injector.stats["orders"] / elapsed if elapsed else None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Injection d'ordres en pipeline sur plusieurs cles")
+    parser.add_argument("--rpc-url", default="http://127.0.0.1:8732")
+    parser.add_argument("--rpc-admin", default=mock_rpc.ADMIN, help="admin du contrat (provision des cles)")
+    parser.add_argument("--keys", type=int, default=4, help="nombre de cles de signature")
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=10, help="ordres par groupe d'operations")
+    parser.add_argument("--in-flight", type=int, default=2, help="groupes signes en attente par cle")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    keys = ["tz1MarketMaker%02d" % i for i in range(args.keys)]
+    stats = asyncio.run(run(args.rpc_url, keys, args.orders, args.batch, args.in_flight,
+                            args.rpc_admin, seed=args.seed))
+    print(f"Cles:                {stats['keys']}")
+    print(f"Ordres injectes:     {stats['orders']} en {stats['groups']} groupes "
+          f"({stats['refused']} refuses, {stats['retries']} relances)")
+    print(f"Debit:               {stats['orders_per_second']:,.0f} ordres/s")
@@ -0,0 +1,273 @@
+"""
+Keeper d'execution d'ActionChain Token
+
+Les ordres laisses en attente par max_fills (ou places avec max_fills=0)
+peuvent rester croises dans le carnet tant que personne n'appelle
+execute_trade. Ce keeper suit les nouveaux blocs, tient a jour des tas
+d'achats et de ventes a partir des diffs de big_map, et soumet a chaque
+bloc les croisements les plus rentables dans un budget de gas.
+
+Detection: un croisement associe le meilleur achat et la meilleure vente
+(prix puis anciennete) tant que prix d'achat >= prix de vente; l'echange se
+fait au prix du vendeur, comme execute_trade. Trouver k croisements coute
+O(k log n) (les entrees retirees du carnet sont ecartees paresseusement).
+
+Classement: valeur echangee par unite de gas estimee; les paires retenues
+sont envoyees dans l'ordre du carnet, en un seul appel execute_trades.
+
+Reorganisation: comme l'indexeur, le keeper garde quelques points de
+controle (copies du carnet) et revient au plus recent encore present dans
+la chaine, puis rejoue les blocs suivants.
+
+Usage:
+    python keeper.py --rpc http://127.0.0.1:8732 --key tz1... --gas-budget 400000
+    python keeper.py --rpc ... --key tz1... --gas-profile bench.json
+"""
+
+import argparse
+import heapq
+import json
+import time
+
+from actionchain_client import ActionChainClient, RpcError
+from actionchain_model import TICK_SIZE
+from indexer import RpcSource
+
+# Estimations par defaut (a recaler avec --gas-profile sur un rapport de benchmark.py)
+GAS_PER_OPERATION = 3000      # Appel execute_trades hors paires
+GAS_PER_PAIR = 2500           # Echange, transferts et statistiques
+GAS_PER_FILLED_ORDER = 800    # Retrait d'un ordre entierement execute du carnet
+MAX_CROSSINGS = 1000
+
+
+class KeeperBook:
+    """Carnet suivi bloc par bloc: ordres ouverts et tas d'achats / ventes"""
+
+    def __init__(self):
+        self.orders = {}  # order_id -> [is_buy, tick, quantity]
+        self.bids = []    # (-tick, order_id): meilleur prix puis plus ancien
+        self.asks = []    # (tick, order_id)
+        self.stale = 0
+
+    def apply_block(self, block):
+        orders = self.orders
+        for diff in block["big_map_diffs"]:
+            path = diff["path"]
+            if path not in ("buy_orders", "sell_orders"):
+                continue
+            order_id = int(diff["key"])
+            if diff["action"] == "remove_key":
+                if orders.pop(order_id, None) is not None:
+                    self.stale += 1
+            elif order_id in orders:
+                orders[order_id][2] = diff["value"]["quantity"]
+            else:
+                is_buy = path == "buy_orders"
+                tick = diff["value"]["tick"]
+                orders[order_id] = [is_buy, tick, diff["value"]["quantity"]]
+                if is_buy:
+                    heapq.heappush(self.bids, (-tick, order_id))
+                else:
+                    heapq.heappush(self.asks, (tick, order_id))
+        if self.stale > len(orders):
+            self.compact()
+
+    def copy(self):
+        """Copie du carnet, pour un point de controle"""
+        book = KeeperBook()
+        book.orders = {order_id: list(order) for order_id, order in self.orders.items()}
+        book.bids = [(-order[1], order_id) for order_id, order in book.orders.items() if order[0]]
+        book.asks = [(order[1], order_id) for order_id, order in book.orders.items() if not order[0]]
+        heapq.heapify(book.bids)
+        heapq.heapify(book.asks)
+        return book
+
+    def compact(self):
+        """Reconstruit les tas sans les entrees d'ordres retires"""
+        self.bids = [entry for entry in self.bids if entry[1] in self.orders]
+        self.asks = [entry for entry in self.asks if entry[1] in self.orders]
+        heapq.heapify(self.bids)
+        heapq.heapify(self.asks)
+        self.stale = 0
+
+    def pop_live(self, heap, taken):
+        """Retire la meilleure entree encore ouverte (a remettre ensuite via taken)"""
+        while heap:
+            entry = heapq.heappop(heap)
+            order = self.orders.get(entry[1])
+            if order is not None and order[2] > 0:
+                taken.append(entry)
+                return entry[1], order
+            if order is None:
+                self.stale -= 1
+            else:
+                taken.append(entry)  # Quantite pas encore connue: garder l'entree
+        return None, None
+
+    def crossings(self, limit=MAX_CROSSINGS):
+        """Croisements dans l'ordre du carnet: (buy_id, sell_id, prix, quantite, ordres soldes)"""
+        taken_bids, taken_asks = [], []
+        result = []
+        buy_id, buy = self.pop_live(self.bids, taken_bids)
+        sell_id, sell = self.pop_live(self.asks, taken_asks)
+        buy_left = buy[2] if buy else 0
+        sell_left = sell[2] if sell else 0
+        while buy and sell and buy[1] >= sell[1] and len(result) < limit:
+            quantity = buy_left if buy_left < sell_left else sell_left
+            buy_left -= quantity
+            sell_left -= quantity
+            result.append((buy_id, sell_id, sell[1] * TICK_SIZE, quantity, (buy_left == 0) + (sell_left == 0)))
+            if buy_left == 0:
+                buy_id, buy = self.pop_live(self.bids, taken_bids)
+                buy_left = buy[2] if buy else 0
+            if sell_left == 0:
+                sell_id, sell = self.pop_live(self.asks, taken_asks)
+                sell_left = sell[2] if sell else 0
+        for entry in taken_bids:
+            heapq.heappush(self.bids, entry)
+        for entry in taken_asks:
+            heapq.heappush(self.asks, entry)
+        return result
+
+
+def load_gas_profile(path):
+    """Gas par operation et par paire d'apres un rapport benchmark.py (plus grand carnet mesure)"""
+    with open(path) as f:
+        results = json.load(f)["results"]
+    operations = results[max(results, key=int)]
+    single = operations["execute_trade"]["gas"]
+    double = operations["execute_trades"]["gas"]
+    per_pair = double - single
+    return {"operation": max(single - per_pair, 0), "pair": per_pair, "filled_order": 0}
+
+
+def select(crossings, gas_budget, gas):
+    """Paires retenues dans le budget, par valeur echangee par gas, renvoyees dans l'ordre du carnet"""
+    costs = [gas["pair"] + gas["filled_order"] * filled for _, _, _, _, filled in crossings]
+    ranked = sorted(range(len(crossings)),
+                    key=lambda i: crossings[i][2] * crossings[i][3] / costs[i], reverse=True)
+    budget = gas_budget - gas["operation"]
+    chosen = []
+    for i in ranked:
+        if costs[i] <= budget:
+            budget -= costs[i]
+            chosen.append(i)
+    return [crossings[i] for i in sorted(chosen)]
+
+
+def feasible(pairs, orders):
+    """Ecarte les paires dont un ordre serait deja solde par les paires precedentes du lot"""
+    left = {}
+    kept = []
+    for buy_id, sell_id, price, _, _ in pairs:
+        buy_left = left.get(buy_id, orders[buy_id][2])
+        sell_left = left.get(sell_id, orders[sell_id][2])
+        if buy_left == 0 or sell_left == 0:
+            continue
+        quantity = min(buy_left, sell_left)
+        left[buy_id] = buy_left - quantity
+        left[sell_id] = sell_left - quantity
+        kept.append({"buy_order_id": buy_id, "sell_order_id": sell_id})
+    return kept
+
+
+class Keeper:
+    """Suit la chaine et soumet les croisements a chaque nouveau bloc"""
+
+    def __init__(self, source, client, gas_budget=400_000, gas=None, checkpoint_interval=10,
+                 max_checkpoints=10):
+        self.source = source
+        self.client = client
+        self.gas_budget = gas_budget
+        self.gas = gas or {"operation": GAS_PER_OPERATION, "pair": GAS_PER_PAIR,
+                           "filled_order": GAS_PER_FILLED_ORDER}
+        self.book = KeeperBook()
+        self.level = -1
+        self.block_hash = None
+        self.checkpoint_interval = checkpoint_interval
+        self.max_checkpoints = max_checkpoints
+        self.checkpoints = []  # (niveau, hash, copie du carnet), du plus ancien au plus recent
+        self.stats = {"submissions": 0, "pairs": 0, "refused": 0}
+
+    def save_checkpoint(self):
+        self.checkpoints.append((self.level, self.block_hash, self.book.copy()))
+        del self.checkpoints[:-self.max_checkpoints]
+
+    def handle_reorg(self, head):
+        """Revient au plus recent point de controle encore dans la chaine de la source"""
+        while self.checkpoints:
+            level, block_hash, book = self.checkpoints[-1]
+            if level <= head and self.source.block(level)["hash"] == block_hash:
+                self.book = book.copy()
+                self.level, self.block_hash = level, block_hash
+                return
+            self.checkpoints.pop()
+        # Aucun point de controle commun: reconstruire le carnet depuis le debut de la chaine
+        self.book = KeeperBook()
+        self.level, self.block_hash = -1, None
+
+    def sync(self):
+        """Applique les nouveaux blocs; renvoie leur nombre"""
+        head = self.source.head()
+        applied = 0
+        if self.block_hash is not None and (self.level > head
+                                            or self.source.block(self.level)["hash"] != self.block_hash):
+            # Le dernier bloc lu n'est plus dans la chaine (chaine plus courte ou bloc remplace)
+            self.handle_reorg(head)
+        while self.level < head:
+            block = self.source.block(self.level + 1)
+            if self.block_hash is not None and block["predecessor"] != self.block_hash:
+                self.handle_reorg(head)
+                continue
+            self.book.apply_block(block)
+            self.level = block["level"]
+            self.block_hash = block["hash"]
+            if self.level % self.checkpoint_interval == 0:
+                self.save_checkpoint()
+            applied += 1
+        return applied
+
+    def step(self):
+        """Synchronise puis soumet les croisements rentables; renvoie les paires envoyees"""
+        if not self.sync():
+            return []
+        crossings = self.book.crossings()
+        if not crossings:
+            return []
+        pairs = feasible(select(crossings, self.gas_budget, self.gas), self.book.orders)
+        if not pairs:
+            return []
+        try:
+            self.client.execute_trades(pairs)
+        except RpcError as error:
+            # Carnet modifie depuis le dernier bloc lu: nouvel essai au bloc suivant
+            self.stats["refused"] += 1
+            print(f"Execution refusee: {error}")
+            return []
+        self.stats["submissions"] += 1
+        self.stats["pairs"] += len(pairs)
+        return pairs
+
+    def run(self, interval=1.0):
+        while True:
+            pairs = self.step()
+            if pairs:
+                print(f"Bloc {self.level}: {len(pairs)} croisements executes")
+            time.sleep(interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keeper d'execution des ordres croises")
+    parser.add_argument("--rpc", default="http://127.0.0.1:8732", help="URL du noeud")
+    parser.add_argument("--key", required=True, help="compte qui paie les executions")
+    parser.add_argument("--gas-budget", type=int, default=400_000, help="gas par bloc")
+    parser.add_argument("--gas-profile", help="rapport benchmark.py pour le gas par paire")
+    parser.add_argument("--interval", type=float, default=1.0, help="secondes entre deux lectures")
+    args = parser.parse_args()
+
+    keeper = Keeper(RpcSource(args.rpc), ActionChainClient(args.rpc, args.key), args.gas_budget,
+                    load_gas_profile(args.gas_profile) if args.gas_profile else None)
+    try:
+        keeper.run(args.interval)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,285 @@
+"""
+Generateur de flux d'ordres pour ActionChain Token
+
+Produit un flux configurable (arrivees de Poisson, prix distribues autour
+d'un prix milieu, part d'annulations, nombreux traders) et le rejoue sur une
+cible: le modele Python en memoire, le noeud RPC simule (mock_rpc.py) ou un
+scenario SmartPy. Un modele fantome suit les ordres pour mesurer le taux
+d'execution et le delai entre placement et execution complete (en temps
+simule).
+
+Usage:
+    python loadgen.py --orders 100000 --rate 20 --traders 500
+    python loadgen.py --target rpc --rpc-url http://127.0.0.1:8732
+    python loadgen.py --target scenario --orders 200
+"""
+
+import argparse
+import json
+import math
+import random
+import time
+
+import mock_rpc
+from actionchain_client import ActionChainClient, ConnectionPool, RpcError
+from actionchain_model import TICK_SIZE, ActionChainModel, ContractError
+
+ADMIN = "Admin"
+
+
+class TrackingModel(ActionChainModel):
+    """Modele fantome qui note les ordres du carnet entierement executes"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.completed = []
+
+    def _consume_order(self, order, quantity):
+        super()._consume_order(order, quantity)
+        if not order.quantity:
+            self.completed.append(order.order_id)
+
+
+def order_flow(traders, orders, rate=10.0, mid_price=1_000_000, spread=5.0, distribution="normal",
+               cancel_ratio=0.2, max_quantity=50, start=1_700_000_000, seed=0):
+    """Genere des evenements (timestamp, trader, type, prix, quantite) ou (timestamp, trader, "cancel", None, None).
+
+    Les arrivees suivent un processus de Poisson de `rate` evenements par
+    seconde; les prix (en ticks autour de `mid_price`) suivent une loi normale
+    d'ecart-type `spread`, ou uniforme sur +/- `spread`.
+    """
+    rng = random.Random(seed)
+    mid_tick = mid_price // 10000
+    now = float(start)
+    for _ in range(orders):
+        now += rng.expovariate(rate)
+        trader = rng.choice(traders)
+        if rng.random() < cancel_ratio:
+            yield int(now), trader, "cancel", None, None
+            continue
+        if distribution == "normal":
+            offset = round(rng.gauss(0, spread))
+        else:
+            offset = rng.randint(-int(spread), int(spread))
+        tick = max(1, mid_tick + offset)
+        order_type = "buy" if rng.random() < 0.5 else "sell"
+        yield int(now), trader, order_type, tick * 10000, rng.randint(1, max_quantity)
+
+
+class ModelTarget:
+    """Cible en memoire: un second modele Python"""
+
+    def __init__(self, traders, funding):
+        self.model = ActionChainModel(ADMIN, 0)
+        for trader in traders:
+            self.model.mint(ADMIN, trader, funding)
+
+    def submit(self, sender, entrypoint, args, amount, now):
+        try:
+            getattr(self.model, entrypoint)(sender=sender, amount=amount, now=now, **args)
+        except ContractError:
+            return False
+        return True
+
+
+class RpcTarget:
+    """Cible HTTP: noeud simule mock_rpc.py, via le client (connexion persistante, compteurs locaux)"""
+
+    def __init__(self, url, traders, funding, admin=mock_rpc.ADMIN):
+        self.pool = ConnectionPool(url, size=1)
+        self.clients = {}
+        with self.client(admin).batch() as batch:
+            for trader in traders:
+                batch.mint(trader, funding)
+
+    def client(self, sender):
+        if sender not in self.clients:
+            self.clients[sender] = ActionChainClient(None, sender, self.pool)
+        return self.clients[sender]
+
+    def submit(self, sender, entrypoint, args, amount, now):
+        try:
+            self.client(sender).inject([{"entrypoint": entrypoint, "value": args, "amount": amount}], now)
+        except RpcError:
+            return False
+        return True
+
+
+class ScenarioTarget:
+    """Cible SmartPy: appels du contrat dans un sp.test_scenario"""
+
+    def __init__(self, traders, funding):
+        import smartpy as sp
+        from ActionChain import main
+        self.sp = sp
+        self.scenario = sp.test_scenario("Generateur de charge", main)
+        self.accounts = {name: sp.test_account(name) for name in [ADMIN] + list(traders)}
+        self.token = main.ActionChainToken(
+            admin=self.accounts[ADMIN].address,
+            initial_supply=0,
+            token_name="ActionChain Token",
+            token_symbol="ACT"
+        )
+        self.scenario += self.token
+        for trader in traders:
+            self.token.dispatch(sp.variant.mint(sp.record(to_address=self.accounts[trader].address,
+                                                          amount=funding))).run(sender=self.accounts[ADMIN])
+
+    def submit(self, sender, entrypoint, args, amount, now, expected_error=None):
+        sp = self.sp
+        params = dict(args)
+        if "price" in params:
+            params["price"] = sp.mutez(params["price"])
+        if "hint" in params and params["hint"] is not None:
+            params["hint"] = sp.Some(params["hint"])
+        run = {"sender": self.accounts[sender], "amount": sp.mutez(amount), "now": sp.timestamp(now)}
+        if expected_error is not None:
+            run.update(valid=False, exception=expected_error)
+        getattr(self.token, entrypoint)(**params).run(**run)
+        return expected_error is None
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def run(target, events, shadow, max_fills=10, seed=0):
+    """Rejoue le flux sur la cible et renvoie les statistiques de la session"""
+    rng = random.Random(seed)
+    placed_at = {}
+    open_orders = {}   # trader -> [(order_id, type)]
+    delays = []
+    placed = filled = failures = operations = 0
+    started = time.perf_counter()
+
+    for now, trader, kind, price, quantity in events:
+        if kind == "cancel":
+            # Un ordre encore en attente du trader, tire au hasard
+            mine = open_orders.get(trader, [])
+            chosen = None
+            while mine and chosen is None:
+                index = rng.randrange(len(mine))
+                mine[index], mine[-1] = mine[-1], mine[index]
+                candidate = mine.pop()
+                if shadow.order_quantity(candidate[0]) is not None:
+                    chosen = candidate
+            if chosen is None:
+                continue
+            order_id, order_type = chosen
+            entrypoint, args, amount = "cancel_order", {"order_id": order_id, "order_type": order_type}, 0
+        else:
+            if kind == "sell" and shadow.get_available_balance(trader) < quantity:
+                kind = "buy"
+            entrypoint = "place_buy_order" if kind == "buy" else "place_sell_order"
+            args = {"price": price, "quantity": quantity, "max_fills": max_fills,
+                    "hint": shadow.level_hint(kind == "buy", price // TICK_SIZE)}
+            amount = price * quantity if kind == "buy" else 0
+
+        order_id = shadow.order_counter
+        error = None
+        try:
+            getattr(shadow, entrypoint)(sender=trader, amount=amount, now=now, **args)
+        except ContractError as exception:
+            error = str(exception)
+        if entrypoint == "cancel_order":
+            placed_at.pop(args["order_id"], None)
+            shadow.completed.clear()
+
+        if isinstance(target, ScenarioTarget):
+            ok = target.submit(trader, entrypoint, args, amount, now, expected_error=error)
+        else:
+            ok = target.submit(trader, entrypoint, args, amount, now)
+        operations += 1
+        if not ok:
+            failures += 1
+            continue
+
+        if entrypoint != "cancel_order":
+            placed += 1
+            if shadow.order_quantity(order_id) is None:
+                # Entierement execute a l'arrivee
+                filled += 1
+                delays.append(0)
+            else:
+                placed_at[order_id] = now
+                open_orders.setdefault(trader, []).append((order_id, kind))
+        for completed_id in shadow.completed:
+            if completed_id in placed_at:
+                filled += 1
+                delays.append(now - placed_at.pop(completed_id))
+        shadow.completed.clear()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "operations": operations,
+        "failures": failures,
+        "seconds": elapsed,
+        "ops_per_second": operations / elapsed if elapsed else None,
+        "orders_placed": placed,
+        "orders_filled": filled,
+        "fill_rate": filled / placed if placed else None,
+        "trades": shadow.trade_counter,
+        "fill_delay_p50": percentile(delays, 0.50),
+        "fill_delay_p99": percentile(delays, 0.99),
+    }
+
+
+def print_stats(stats):
+    print(f"Operations:          {stats['operations']} ({stats['failures']} refusees)")
+    print(f"Debit:               {stats['ops_per_second']:,.0f} ops/s")
+    print(f"Ordres places:       {stats['orders_placed']}")
+    print(f"Taux d'execution:    {stats['fill_rate'] or 0:.1%}")
+    print(f"Trades:              {stats['trades']}")
+    print(f"Delai p50 / p99:     {stats['fill_delay_p50']} s / {stats['fill_delay_p99']} s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generateur de flux d'ordres ActionChain")
+    parser.add_argument("--target", choices=("model", "rpc", "scenario"), default="model")
+    parser.add_argument("--rpc-url", default="http://127.0.0.1:8732")
+    parser.add_argument("--rpc-admin", default=mock_rpc.ADMIN, help="admin du contrat du noeud")
+    parser.add_argument("--orders", type=int, default=10000, help="nombre d'evenements")
+    parser.add_argument("--rate", type=float, default=10.0, help="evenements par seconde (Poisson)")
+    parser.add_argument("--traders", type=int, default=100)
+    parser.add_argument("--funding", type=int, default=10_000, help="tokens mintes par trader")
+    parser.add_argument("--mid-price", type=int, default=1_000_000, help="prix milieu en mutez")
+    parser.add_argument("--spread", type=float, default=5.0, help="dispersion des prix en ticks")
+    parser.add_argument("--distribution", choices=("normal", "uniform"), default="normal")
+    parser.add_argument("--cancel-ratio", type=float, default=0.2)
+    parser.add_argument("--max-fills", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="statistiques JSON")
+    args = parser.parse_args(argv)
+
+    traders = ["Trader%d" % i for i in range(args.traders)]
+    events = order_flow(traders, args.orders, args.rate, args.mid_price, args.spread,
+                        args.distribution, args.cancel_ratio, seed=args.seed)
+    shadow = TrackingModel(ADMIN, 0)
+    for trader in traders:
+        shadow.mint(ADMIN, trader, args.funding)
+
+    def session(target):
+        stats = run(target, events, shadow, args.max_fills, args.seed)
+        print_stats(stats)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(stats, f, indent=2)
+
+    if args.target == "model":
+        session(ModelTarget(traders, args.funding))
+    elif args.target == "rpc":
+        # Le noeud simule doit etre neuf pour que le modele fantome reste aligne
+        session(RpcTarget(args.rpc_url, traders, args.funding, args.rpc_admin))
+    else:
+        import smartpy as sp
+
+        @sp.add_test()
+        def test_load():
+            session(ScenarioTarget(traders, args.funding))
+
+
+if __name__ == "__main__":
+    main()
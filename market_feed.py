@@ -0,0 +1,297 @@
+"""
+Flux de marche pousse d'ActionChain Token (Server-Sent Events)
+
+Un seul processus suit la chaine (indexer.py) et pousse a tous les
+navigateurs les changements du carnet et les nouveaux trades, au lieu que
+chaque onglet interroge le RPC. Un client recoit d'abord un instantane L2
+(niveaux agreges), puis des deltas numerotes: un delta de numero seq
+s'applique sur l'etat de numero seq - 1, une quantite nulle retire le
+niveau.
+
+    GET /stream     flux SSE: evenement "snapshot" puis evenements "delta"
+                    (l'en-tete Last-Event-ID rejoue les deltas manques s'ils
+                    sont encore en memoire, sinon un nouvel instantane est
+                    envoye)
+    GET /snapshot   instantane JSON, pour se resynchroniser apres un trou
+    GET /candles?resolution=3600&limit=500
+                    dernieres bougies OHLCV (historique du graphique)
+
+Usage:
+    python market_feed.py --rpc http://127.0.0.1:8732 --port 8765
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlparse
+
+from indexer import CANDLE_RESOLUTIONS, FixtureSource, Indexer, RpcSource
+
+DEPTH = 100           # Niveaux publies de chaque cote
+HISTORY = 1000        # Deltas conserves pour rejouer une reconnexion
+RECENT_TRADES = 50
+MAX_CANDLES = 10080   # Une semaine de bougies d'une minute
+CLIENT_QUEUE = 256    # Un client plus en retard est deconnecte et se resynchronise
+HEARTBEAT = 15.0
+
+
+class MarketFeed:
+    """Etat publie (carnet L2, trades) et diffusion des deltas aux clients"""
+
+    def __init__(self, source, db=":memory:", interval=0.2, depth=DEPTH):
+        self.source = source
+        self.interval = interval
+        self.depth = depth
+        # SQLite reste sur un seul thread: indexation et requetes passent par cet executor
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.db = db
+        self.indexer = None
+        self.seq = 0
+        self.level = None
+        self.bids = {}
+        self.asks = {}
+        self.trades = collections.deque(maxlen=RECENT_TRADES)
+        self.last_trade_id = -1
+        self.last_price = None
+        self.stats = {}
+        self.history = collections.deque(maxlen=HISTORY)
+        self.clients = set()
+
+    def refresh(self):
+        """Indexe les nouveaux blocs et calcule l'etat suivant (thread de l'executor)
+
+        L'etat publie, lu par snapshot() et replay() sur la boucle, n'est pas
+        modifie ici: renvoie (delta ou None, nouvel etat), que publish() applique
+        sur la boucle, ou None si aucun bloc n'a ete indexe.
+        """
+        if self.indexer is None:
+            self.indexer = Indexer(self.db)
+        if not self.indexer.sync(self.source) and self.level is not None:
+            return None
+
+        book = self.indexer.book(self.depth)
+        trades, last_trade_id, last_price = self.new_trades()
+        state = {
+            "level": self.indexer.cursor()[0],
+            "bids": {level["price"]: level["quantity"] for level in book["bids"]},
+            "asks": {level["price"]: level["quantity"] for level in book["asks"]},
+            "last_trade_id": last_trade_id,
+            "last_price": last_price
+        }
+        delta = {
+            "bids": diff_levels(self.bids, state["bids"]),
+            "asks": diff_levels(self.asks, state["asks"]),
+            "trades": trades
+        }
+        if not delta["bids"] and not delta["asks"] and not delta["trades"]:
+            return None, state
+        if delta["trades"]:
+            state["stats"] = delta["stats"] = self.market_stats(last_price)
+
+        delta.update(seq=self.seq + 1, level=state["level"])
+        return delta, state
+
+    def publish(self, delta, state):
+        """Applique le resultat de refresh (boucle asyncio) et renvoie le delta a diffuser"""
+        for name, value in state.items():
+            setattr(self, name, value)
+        if delta is not None:
+            self.seq = delta["seq"]
+            self.trades.extend(delta["trades"])
+            self.history.append(delta)
+        return delta
+
+    def new_trades(self):
+        """Trades indexes depuis le dernier publie: (trades, dernier trade_id, dernier prix)"""
+        last_trade_id, last_price = self.last_trade_id, self.last_price
+        latest = self.indexer.db.execute("SELECT MAX(trade_id) FROM trades").fetchone()[0]
+        if latest is None or latest < last_trade_id:
+            # Trades annules par une reorganisation: repartir du dernier trade conserve
+            last_trade_id = -1 if latest is None else latest
+        rows = self.indexer.db.execute(
+            "SELECT trade_id, price, quantity, timestamp FROM trades WHERE trade_id > ? ORDER BY trade_id",
+            (last_trade_id,)
+        ).fetchall()
+        trades = []
+        for trade_id, price, quantity, timestamp in rows[-RECENT_TRADES:]:
+            # Le contrat n'enregistre pas l'initiateur: regle du tick sur le prix precedent
+            side = "sell" if last_price is not None and price < last_price else "buy"
+            trades.append({"id": trade_id, "side": side, "price": price,
+                           "quantity": quantity, "timestamp": timestamp})
+            last_price = price
+        if rows:
+            last_trade_id = rows[-1][0]
+        return trades, last_trade_id, last_price
+
+    def market_stats(self, last_price):
+        """Dernier prix et statistiques des bougies horaires des dernieres 24 heures"""
+        now = self.indexer.db.execute("SELECT MAX(timestamp) FROM blocks").fetchone()[0] or 0
+        candles = self.indexer.candles(3600, now - 86400 + 3600)
+        return {
+            "last_price": last_price,
+            "open_24h": candles[0]["open"] if candles else None,
+            "high_24h": max(candle["high"] for candle in candles) if candles else None,
+            "low_24h": min(candle["low"] for candle in candles) if candles else None,
+            "volume_24h": sum(candle["volume"] for candle in candles)
+        }
+
+    def snapshot(self):
+        return {
+            "seq": self.seq,
+            "level": self.level,
+            "bids": sorted(self.bids.items(), reverse=True),
+            "asks": sorted(self.asks.items()),
+            "trades": list(self.trades),
+            "stats": self.stats
+        }
+
+    def candles(self, resolution, limit):
+        """Les `limit` dernieres bougies de la resolution (thread de l'executor)"""
+        if self.indexer is None:
+            return []
+        row = self.indexer.db.execute(
+            "SELECT MAX(period) FROM candles WHERE resolution = ?", (resolution,)
+        ).fetchone()
+        if row[0] is None:
+            return []
+        return self.indexer.candles(resolution, (row[0] - limit + 1) * resolution)
+
+    def replay(self, last_seq):
+        """Deltas posterieurs a last_seq, ou None s'ils ne sont plus tous en memoire"""
+        if last_seq > self.seq:
+            return None
+        missed = [delta for delta in self.history if delta["seq"] > last_seq]
+        if len(missed) != self.seq - last_seq:
+            return None
+        return missed
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                result = await loop.run_in_executor(self.executor, self.refresh)
+            except OSError as error:
+                print(f"Source indisponible: {error}")
+                result = None
+            # L'etat publie n'est modifie que sur la boucle, entre deux lectures des clients
+            delta = self.publish(*result) if result is not None else None
+            if delta is not None:
+                for queue in list(self.clients):
+                    try:
+                        queue.put_nowait(delta)
+                    except asyncio.QueueFull:
+                        # Client trop lent: il sera deconnecte et se resynchronisera
+                        self.clients.discard(queue)
+            await asyncio.sleep(self.interval)
+
+
+def diff_levels(previous, current):
+    """Niveaux modifies [[prix, quantite]], quantite 0 pour un niveau retire"""
+    changes = [[price, quantity] for price, quantity in current.items() if previous.get(price) != quantity]
+    changes += [[price, 0] for price in previous if price not in current]
+    return changes
+
+
+def sse(event, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append("data: " + json.dumps(data, separators=(",", ":")))
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+async def handle(feed, reader, writer):
+    try:
+        request = (await reader.readline()).decode("latin-1").split()
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        url = urlparse(request[1] if len(request) > 1 else "/")
+        path = url.path
+
+        if path in ("/snapshot", "/candles"):
+            if path == "/snapshot":
+                body = feed.snapshot()
+            else:
+                query = parse_qs(url.query)
+                resolution = int(query.get("resolution", ["3600"])[0])
+                limit = min(int(query.get("limit", [str(MAX_CANDLES)])[0]), MAX_CANDLES)
+                if resolution not in CANDLE_RESOLUTIONS:
+                    resolution = 3600
+                body = await asyncio.get_running_loop().run_in_executor(
+                    feed.executor, feed.candles, resolution, limit
+                )
+            body = json.dumps(body).encode()
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                         b"Access-Control-Allow-Origin: *\r\nConnection: close\r\n"
+                         b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body)
+            await writer.drain()
+            return
+        if path != "/stream":
+            writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            await writer.drain()
+            return
+
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                     b"Access-Control-Allow-Origin: *\r\nConnection: keep-alive\r\n\r\n")
+        queue = asyncio.Queue(maxsize=CLIENT_QUEUE)
+        feed.clients.add(queue)
+        try:
+            last_id = headers.get("last-event-id")
+            missed = feed.replay(int(last_id)) if last_id and last_id.isdigit() else None
+            if missed is None:
+                writer.write(sse("snapshot", feed.snapshot(), feed.seq))
+            else:
+                for delta in missed:
+                    writer.write(sse("delta", delta, delta["seq"]))
+            await writer.drain()
+
+            while True:
+                try:
+                    delta = await asyncio.wait_for(queue.get(), HEARTBEAT)
+                except asyncio.TimeoutError:
+                    writer.write(b": ping\n\n")
+                else:
+                    if queue not in feed.clients:
+                        # Client ecarte pour retard: il se reconnecte avec Last-Event-ID
+                        break
+                    writer.write(sse("delta", delta, delta["seq"]))
+                await writer.drain()
+        finally:
+            feed.clients.discard(queue)
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(feed, host="127.0.0.1", port=8765):
+    server = await asyncio.start_server(lambda r, w: handle(feed, r, w), host, port)
+    print(f"Flux de marche sur http://{host}:{port}/stream")
+    async with server:
+        await asyncio.gather(server.serve_forever(), feed.run())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Flux de marche SSE d'ActionChain Token")
+    source_group = parser.add_mutually_exclusive_group(required=True)
+    source_group.add_argument("--rpc", help="URL du noeud (mock_rpc.py)")
+    source_group.add_argument("--fixtures", help="fichier de blocs enregistres (JSON par ligne)")
+    parser.add_argument("--db", default=":memory:", help="base de l'indexeur")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--interval", type=float, default=0.2, help="secondes entre deux lectures de la chaine")
+    args = parser.parse_args()
+
+    source = RpcSource(args.rpc) if args.rpc else FixtureSource(args.fixtures)
+    try:
+        asyncio.run(serve(MarketFeed(source, args.db, args.interval), args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,287 @@
+"""
+Outils Micheline pour ActionChain Token
+
+Lecture des fichiers .tz produits par SmartPy, et conversion entre valeurs
+Python (dict par nom de champ) et valeurs Micheline (JSON) guidee par les
+annotations du type. Permet de construire les parametres d'entrypoint sans
+dependre de la disposition des records choisie par le compilateur.
+"""
+
+import json
+import re
+
+_TOKEN = re.compile(
+    r'\s+|#[^\n]*|/\*.*?\*/'
+    r'|(?P<string>"(?:[^"\\]|\\.)*")'
+    r'|(?P<bytes>0x[0-9a-fA-F]*)'
+    r'|(?P<int>-?\d+)'
+    r'|(?P<word>[A-Za-z_][A-Za-z0-9_.]*|[%@:][A-Za-z0-9_.%@:]*)'
+    r'|(?P<punct>[(){};])',
+    re.S
+)
+
+
+def _tokenize(text):
+    tokens = []
+    for match in _TOKEN.finditer(text):
+        kind = match.lastgroup
+        if kind is not None:
+            tokens.append((kind, match.group(kind)))
+    return tokens
+
+
+def parse(text):
+    """Parse une expression Micheline textuelle en Micheline JSON"""
+    tokens = _tokenize(text)
+    position = 0
+
+    def parse_expr(allow_args):
+        nonlocal position
+        kind, value = tokens[position]
+        position += 1
+        if kind == 'int':
+            return {'int': value}
+        if kind == 'string':
+            return {'string': json.loads(value)}
+        if kind == 'bytes':
+            return {'bytes': value[2:]}
+        if value == '(':
+            node = parse_expr(True)
+            assert tokens[position][1] == ')', "Parenthese fermante attendue"
+            position += 1
+            return node
+        if value == '{':
+            return parse_sequence()
+        node = {'prim': value}
+        args, annots = [], []
+        while allow_args and position < len(tokens):
+            kind, value = tokens[position]
+            if value in (')', '}', ';'):
+                break
+            if kind == 'word' and value[0] in '%@:':
+                annots.append(value)
+                position += 1
+            else:
+                args.append(parse_expr(False))
+        if args:
+            node['args'] = args
+        if annots:
+            node['annots'] = annots
+        return node
+
+    def parse_sequence():
+        nonlocal position
+        items = []
+        while tokens[position][1] != '}':
+            if tokens[position][1] == ';':
+                position += 1
+                continue
+            items.append(parse_expr(True))
+        position += 1
+        return items
+
+    if not tokens:
+        return []
+    # Un fichier de contrat est une sequence implicite "parameter ...; storage ...; code ..."
+    nodes = []
+    while position < len(tokens):
+        if tokens[position][1] == ';':
+            position += 1
+            continue
+        nodes.append(parse_expr(True))
+    return nodes[0] if len(nodes) == 1 else nodes
+
+
+def to_text(node):
+    """Ecrit une valeur Micheline JSON sous forme textuelle"""
+    if isinstance(node, list):
+        return '{' + '; '.join(to_text(item) for item in node) + '}'
+    if 'int' in node:
+        return node['int']
+    if 'string' in node:
+        return json.dumps(node['string'])
+    if 'bytes' in node:
+        return '0x' + node['bytes']
+    parts = [node['prim']] + node.get('annots', [])
+    for arg in node.get('args', []):
+        text = to_text(arg)
+        if isinstance(arg, dict) and ('args' in arg or 'annots' in arg):
+            text = '(' + text + ')'
+        parts.append(text)
+    return ' '.join(parts)
+
+
+def section(contract, name):
+    """Renvoie le type de la section `parameter` ou `storage` d'un contrat parse"""
+    for node in contract:
+        if isinstance(node, dict) and node.get('prim') == name:
+            return node['args'][0]
+    raise KeyError(name)
+
+
+def field_name(type_node):
+    for annot in type_node.get('annots', []):
+        if annot.startswith('%'):
+            return annot[1:]
+    return None
+
+
+def entrypoints(parameter_type):
+    """Associe chaque entrypoint a son type (feuilles annotees de l'arbre `or`)"""
+    found = {}
+
+    def walk(node):
+        name = field_name(node)
+        if name is not None:
+            found[name] = node
+        elif node.get('prim') == 'or':
+            for arg in node['args']:
+                walk(arg)
+
+    walk(parameter_type)
+    return found
+
+
+def _pair_leaves(type_node):
+    """Aplatit un peigne de `pair` non annotees en liste de champs"""
+    if type_node.get('prim') == 'pair' and field_name(type_node) is None:
+        leaves = []
+        for arg in type_node['args']:
+            leaves.extend(_pair_leaves(arg))
+        return leaves
+    return [type_node]
+
+
+def _pair_tree(type_node, values):
+    if type_node.get('prim') == 'pair' and field_name(type_node) is None:
+        return {'prim': 'Pair', 'args': [_pair_tree(arg, values) for arg in type_node['args']]}
+    return values.pop(0)
+
+
+def encode(type_node, value):
+    """Convertit une valeur Python en Micheline JSON selon son type"""
+    prim = type_node['prim']
+    args = type_node.get('args', [])
+    if prim == 'pair':
+        leaves = _pair_leaves({'prim': 'pair', 'args': args})
+        if isinstance(value, dict):
+            encoded = [encode(leaf, value[field_name(leaf)]) for leaf in leaves]
+        else:
+            encoded = [encode(leaf, item) for leaf, item in zip(leaves, value)]
+        return _pair_tree({'prim': 'pair', 'args': args}, encoded)
+    if prim in ('nat', 'int', 'mutez'):
+        return {'int': str(int(value))}
+    if prim == 'timestamp' and isinstance(value, int):
+        return {'int': str(value)}
+    if prim in ('string', 'address', 'key_hash', 'key', 'signature', 'timestamp', 'chain_id', 'contract'):
+        return {'string': value}
+    if prim == 'bytes':
+        return {'bytes': value.hex() if isinstance(value, (bytes, bytearray)) else value}
+    if prim == 'bool':
+        return {'prim': 'True' if value else 'False'}
+    if prim == 'unit':
+        return {'prim': 'Unit'}
+    if prim == 'option':
+        if value is None:
+            return {'prim': 'None'}
+        return {'prim': 'Some', 'args': [encode(args[0], value)]}
+    if prim in ('list', 'set'):
+        return [encode(args[0], item) for item in value]
+    if prim in ('map', 'big_map'):
+        if isinstance(value, int):
+            return {'int': str(value)}
+        items = sorted(value.items()) if prim == 'map' else value.items()
+        return [{'prim': 'Elt', 'args': [encode(args[0], k), encode(args[1], v)]} for k, v in items]
+    if prim == 'or':
+        # Variante: {"nom": valeur} designe la feuille annotee %nom
+        (name, inner), = value.items()
+        for side, arg in zip(('Left', 'Right'), args):
+            if field_name(arg) == name:
+                return {'prim': side, 'args': [encode(arg, inner)]}
+            if arg['prim'] == 'or' and name in _variant_names(arg):
+                return {'prim': side, 'args': [encode(arg, value)]}
+        raise KeyError(name)
+    if prim == 'lambda':
+        return value
+    raise ValueError(f"Type Michelson non supporte: {prim}")
+
+
+def _variant_names(type_node):
+    names = set()
+    for arg in type_node.get('args', []):
+        name = field_name(arg)
+        if name is not None:
+            names.add(name)
+        elif arg['prim'] == 'or':
+            names |= _variant_names(arg)
+    return names
+
+
+def _pair_values(node, count):
+    """Aplatit une valeur Pair (y compris la forme n-aire ou sequence)"""
+    if count == 1:
+        return [node]
+    if isinstance(node, list):
+        items = node
+    else:
+        items = node['args']
+    if len(items) == count:
+        return items
+    return [items[0]] + _pair_values(
+        {'prim': 'Pair', 'args': items[1:]} if len(items) > 2 else items[1], count - 1
+    )
+
+
+def decode(type_node, node):
+    """Convertit une valeur Micheline JSON en valeur Python selon son type"""
+    prim = type_node['prim']
+    args = type_node.get('args', [])
+    if prim == 'pair':
+        leaves = []
+        for arg in args:
+            leaves.extend(_pair_leaves(arg))
+        values = []
+        for arg, item in zip(args, _pair_values(node, len(args))):
+            sub_leaves = _pair_leaves(arg)
+            values.extend(_pair_values(item, len(sub_leaves)) if len(sub_leaves) > 1 else [item])
+        decoded = [decode(leaf, item) for leaf, item in zip(leaves, values)]
+        names = [field_name(leaf) for leaf in leaves]
+        if all(names):
+            return dict(zip(names, decoded))
+        return tuple(decoded)
+    if prim in ('nat', 'int', 'mutez'):
+        return int(node['int'])
+    if prim == 'timestamp':
+        return int(node['int']) if 'int' in node else node['string']
+    if prim in ('string', 'address', 'key_hash', 'key', 'signature', 'chain_id', 'contract'):
+        return node.get('string', node.get('bytes'))
+    if prim == 'bytes':
+        return bytes.fromhex(node['bytes'])
+    if prim == 'bool':
+        return node['prim'] == 'True'
+    if prim == 'unit':
+        return None
+    if prim == 'option':
+        if node['prim'] == 'None':
+            return None
+        return decode(args[0], node['args'][0])
+    if prim in ('list', 'set'):
+        return [decode(args[0], item) for item in node]
+    if prim in ('map', 'big_map'):
+        if isinstance(node, dict) and 'int' in node:
+            return int(node['int'])  # Identifiant de big_map
+        return {_hashable(decode(args[0], elt['args'][0])): decode(args[1], elt['args'][1]) for elt in node}
+    if prim == 'or':
+        arg = args[0] if node['prim'] == 'Left' else args[1]
+        name = field_name(arg)
+        inner = decode(arg, node['args'][0])
+        return {name: inner} if name is not None else inner
+    return node
+
+
+def _hashable(value):
+    if isinstance(value, dict):
+        return tuple(value.values())
+    if isinstance(value, list):
+        return tuple(value)
+    return value
@@ -0,0 +1,333 @@
+"""
+Noeud RPC local simule pour ActionChain Token
+
+Serveur HTTP qui imite le sous-ensemble du RPC d'un noeud Tezos utilise par
+nos outils (compteurs, en-tete de bloc, injection, vues), adosse au modele
+Python actionchain_model au lieu d'un vrai contrat. Permet de tester les
+clients et generateurs de charge sans reseau ni octez-client.
+
+Differences avec un vrai noeud: les operations sont injectees en JSON non
+signe, chaque injection est incluse immediatement dans un nouveau bloc, et
+les blocs donnent les diffs de big_map par nom de champ avec des valeurs
+JSON (cle/valeur deja decodees, comme un indexeur de type TzKT).
+
+    POST /injection/operation
+        {"source": "tz1..", "counter": 12, "now": 1700000000,
+         "contents": [{"entrypoint": "place_buy_order",
+                       "value": {"price": 1000000, "quantity": 1, "max_fills": 10},
+                       "amount": 1000000}]}
+    GET  /chains/main/blocks/head/header
+    GET  /chains/main/blocks/<niveau>
+        {"level": 3, "hash": "B..", "predecessor": "B..", "timestamp": 1700000000,
+         "operations": [{"hash": "o..", "source": "tz1..", "entrypoint": "..",
+                         "value": {..}, "amount": 0, "status": "applied"}],
+         "big_map_diffs": [{"path": "balances", "action": "update_key",
+                            "key": "tz1..", "value": 10}, ..]}
+    GET  /chains/main/blocks/head/context/contracts/<adresse>/counter
+    POST /chains/main/blocks/head/helpers/scripts/run_script_view
+        {"view": "get_balance", "input": "tz1.."}
+
+Usage:
+    python mock_rpc.py --port 8732
+"""
+
+import argparse
+import hashlib
+import json
+import pickle
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from actionchain_model import ActionChainModel, ContractError
+
+CONTRACT_ADDRESS = "KT1ActionChainMockRpc000000000000000"
+ADMIN = "tz1KqTpEZ7Yob7QbPE4Hy4Wo8fHG8LhKxZSx"
+
+# Entrypoints du contrat (mint, burn, set_trade_retention et prune_trades passent par dispatch)
+ENTRYPOINTS = ("place_buy_order", "place_sell_order", "place_orders", "execute_trade", "execute_trades",
+               "cancel_order", "cancel_orders", "transfer", "dispatch")
+
+# Entrypoints dont le parametre n'est pas un record: nom de l'argument du modele
+SINGLE_ARGUMENTS = {
+    "execute_trades": "pairs",
+    "cancel_orders": "orders",
+    "dispatch": "action",
+}
+
+# Entrypoints dont l'argument `amount` est une quantite de tokens
+TOKEN_AMOUNT_ENTRYPOINTS = ("transfer",)
+
+COUNTER_PATH = "/chains/main/blocks/head/context/contracts/"
+BLOCKS_PATH = "/chains/main/blocks/"
+
+# Big_maps du contrat suivies dans les blocs
+JOURNALED_MAPS = ("balances", "reserved", "buy_orders", "sell_orders", "trades")
+
+
+class JournalDict(dict):
+    """Dict qui note les cles modifiees depuis le dernier bloc"""
+    __slots__ = ("touched",)
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.touched = set(self)  # Le contenu initial fait partie du premier diff
+
+    def __setitem__(self, key, value):
+        self.touched.add(key)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self.touched.add(key)
+        super().__delitem__(key)
+
+    def pop(self, key, *default):
+        self.touched.add(key)
+        return super().pop(key, *default)
+
+    def __reduce__(self):
+        return restore_journal_dict, (dict(self), set(self.touched))
+
+
+def restore_journal_dict(items, touched):
+    values = JournalDict(items)
+    values.touched = touched
+    return values
+
+
+class JournalModel(ActionChainModel):
+    """Modele dont les big_maps notent leurs modifications, pour produire les diffs des blocs"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in JOURNALED_MAPS:
+            setattr(self, name, JournalDict(getattr(self, name)))
+        self.touched_candles = set()
+
+    def _settle_trade(self, buyer, seller, price, quantity):
+        # Les bougies sont modifiees sur place: noter la periode touchee
+        self.touched_candles.add(self.now // self.candle_seconds)
+        super()._settle_trade(buyer, seller, price, quantity)
+
+    def _consume_order(self, order, quantity):
+        # La quantite restante est modifiee sur place: noter l'ordre touche
+        (self.buy_orders if order.is_buy else self.sell_orders).touched.add(order.order_id)
+        super()._consume_order(order, quantity)
+
+    def discard_journal(self):
+        for name in JOURNALED_MAPS:
+            getattr(self, name).touched.clear()
+        self.touched_candles.clear()
+
+    def big_map_diffs(self):
+        """Diffs depuis le dernier appel: valeur finale de chaque cle modifiee"""
+        diffs = []
+
+        def emit(path, key, value):
+            if value is None:
+                diffs.append({"path": path, "action": "remove_key", "key": key})
+            else:
+                diffs.append({"path": path, "action": "update_key", "key": key, "value": value})
+
+        for path in ("balances", "reserved"):
+            values = getattr(self, path)
+            for key in sorted(values.touched):
+                emit(path, key, values.get(key))
+
+        for path in ("buy_orders", "sell_orders"):
+            orders = getattr(self, path)
+            for order_id in sorted(orders.touched):
+                order = orders.get(order_id)
+                emit(path, order_id, None if order is None else {
+                    "trader": order.trader, "tick": order.tick, "quantity": order.quantity,
+                    "timestamp": order.timestamp
+                })
+
+        for trade_id in sorted(self.trades.touched):
+            trade = self.trades.get(trade_id)
+            emit("trades", trade_id, None if trade is None else dict(
+                zip(("buyer", "seller", "price", "quantity", "timestamp"), trade)
+            ))
+
+        for period in sorted(self.touched_candles):
+            candle = self.candles.get(period)
+            emit("candles", period, None if candle is None else dict(candle))
+
+        self.discard_journal()
+        return diffs
+
+
+class MockNode:
+    """Etat de la chaine simulee: modele du contrat, compteurs et blocs"""
+
+    def __init__(self, model=None):
+        self.model = model if model is not None else JournalModel(ADMIN, 1_000_000)
+        self.counters = {}
+        self.level = 0
+        # Le bloc 0 porte le stockage initial du contrat
+        self.blocks = [{"level": 0, "hash": self.block_hash("genesis"), "predecessor": None,
+                        "timestamp": 0, "operations": [],
+                        "big_map_diffs": (self.model.big_map_diffs()
+                                          if isinstance(self.model, JournalModel) else [])}]
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def block_hash(content):
+        return "B" + hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()[:50]
+
+    def counter(self, source):
+        return self.counters.get(source, 0)
+
+    def apply(self, source, value, entrypoint, amount, now):
+        if entrypoint not in ENTRYPOINTS:
+            raise ContractError(f"Entrypoint inconnu: {entrypoint}")
+        args = {SINGLE_ARGUMENTS[entrypoint]: value} if entrypoint in SINGLE_ARGUMENTS else dict(value)
+        if entrypoint in TOKEN_AMOUNT_ENTRYPOINTS:
+            args["tez"] = amount
+        else:
+            args["amount"] = amount
+        return getattr(self.model, entrypoint)(sender=source, now=now, **args)
+
+    def inject(self, operation):
+        """Applique un groupe d'operations de facon atomique et renvoie le recu"""
+        with self.lock:
+            source = operation["source"]
+            contents = operation["contents"]
+            counter = int(operation["counter"])
+            expected = self.counter(source) + 1
+            if counter < expected:
+                raise ContractError("counter_in_the_past")
+            if counter > expected:
+                raise ContractError("counter_in_the_future")
+
+            now = int(operation.get("now", time.time()))
+            # Etat sauvegarde pour annuler un groupe refuse (pickle: bien plus rapide que deepcopy)
+            saved = pickle.dumps(self.model.__dict__, -1) if len(contents) > 1 else None
+            transfers = []
+            try:
+                for content in contents:
+                    transfers.append(self.apply(
+                        source, content.get("value", {}), content["entrypoint"],
+                        int(content.get("amount", 0)), now
+                    ))
+            except ContractError:
+                if saved is not None:
+                    self.model.__dict__.clear()
+                    self.model.__dict__.update(pickle.loads(saved))
+                # L'etat est celui du bloc precedent: rien a publier
+                if isinstance(self.model, JournalModel):
+                    self.model.discard_journal()
+                raise
+
+            # Le compteur n'avance que pour une operation incluse
+            self.counters[source] = counter + len(contents) - 1
+            self.level += 1
+            digest = hashlib.sha256(json.dumps(operation, sort_keys=True).encode()).hexdigest()
+            operation_hash = "o" + digest[:50]
+            block = {
+                "level": self.level,
+                "predecessor": self.blocks[-1]["hash"],
+                "timestamp": now,
+                "operations": [
+                    {"hash": operation_hash, "source": source, "entrypoint": content["entrypoint"],
+                     "value": content.get("value", {}), "amount": int(content.get("amount", 0)),
+                     "status": "applied"}
+                    for content in contents
+                ],
+                "big_map_diffs": (self.model.big_map_diffs()
+                                  if isinstance(self.model, JournalModel) else [])
+            }
+            block["hash"] = self.block_hash([block["predecessor"], operation_hash])
+            self.blocks.append(block)
+            return {"hash": operation_hash, "level": self.level, "transfers": transfers}
+
+    def block(self, level):
+        with self.lock:
+            if level == "head":
+                return self.blocks[-1]
+            level = int(level)
+            return self.blocks[level] if 0 <= level < len(self.blocks) else None
+
+    def view(self, name, value):
+        with self.lock:
+            view = getattr(self.model, name)
+            if name == "get_volume_24h":
+                return view(int(time.time()) if value is None else value)
+            return view() if value is None else view(value)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Connexions persistantes
+    disable_nagle_algorithm = True  # En-tetes et corps sont ecrits separement
+    node = None
+    latency = 0.0  # Delai ajoute a chaque requete (aller-retour reseau simule)
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status, body):
+        if self.latency:
+            time.sleep(self.latency)
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"null")
+
+    def do_GET(self):
+        if self.path == "/chains/main/blocks/head/header":
+            head = self.node.block("head")
+            self.reply(200, {key: head[key] for key in ("level", "hash", "predecessor", "timestamp")})
+        elif self.path.startswith(COUNTER_PATH) and self.path.endswith("/counter"):
+            source = self.path[len(COUNTER_PATH):-len("/counter")]
+            self.reply(200, str(self.node.counter(source)))
+        elif self.path.startswith(BLOCKS_PATH) and "/" not in self.path[len(BLOCKS_PATH):]:
+            block = self.node.block(self.path[len(BLOCKS_PATH):])
+            if block is None:
+                self.reply(404, {"error": "not_found"})
+            else:
+                self.reply(200, block)
+        else:
+            self.reply(404, {"error": "not_found"})
+
+    def do_POST(self):
+        body = self.read_body()
+        try:
+            if self.path == "/injection/operation":
+                self.reply(200, self.node.inject(body))
+            elif self.path == "/chains/main/blocks/head/helpers/scripts/run_script_view":
+                self.reply(200, {"data": self.node.view(body["view"], body.get("input"))})
+            else:
+                self.reply(404, {"error": "not_found"})
+        except ContractError as error:
+            self.reply(400, {"error": str(error)})
+
+
+def serve(port=8732, node=None, latency=0.0):
+    """Lance le noeud simule; renvoie le serveur (a arreter avec shutdown())"""
+    handler = type("MockHandler", (Handler,), {"node": node if node is not None else MockNode(),
+                                                "latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Noeud RPC simule adosse au modele ActionChain")
+    parser.add_argument("--port", type=int, default=8732)
+    parser.add_argument("--admin", default=ADMIN, help="adresse admin du contrat simule")
+    parser.add_argument("--supply", type=int, default=1_000_000, help="offre initiale")
+    parser.add_argument("--latency", type=float, default=0.0, help="delai par requete en ms")
+    args = parser.parse_args()
+
+    server = serve(args.port, MockNode(JournalModel(args.admin, args.supply)), args.latency / 1000)
+    print(f"Noeud simule sur http://127.0.0.1:{args.port} (contrat {CONTRACT_ADDRESS})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,279 @@
+"""
+Lanceur parallele des scenarios SmartPy d'ActionChain Token
+
+Trouve dans les scripts de test les fonctions @sp.add_test et les
+constructeurs de scenario (fonctions test_* qui appellent
+sp.test_scenario), puis les execute dans un pool de processus. Les modules
+du projet (dont ActionChain et son module `main`) sont importes une seule
+fois par le processus parent avant de creer le pool: les workers heritent
+du module compile au lieu de le recompiler pour chaque scenario. Les
+decorateurs @sp.add_test sont retires au chargement pour que chaque
+fonction ne s'execute qu'une fois, dans le worker qui la recoit.
+
+Le temps de chaque scenario et de chaque phase (scenario.h1 / h2) est
+enregistre. Les resultats sont ecrits en JUnit XML et en trace Chrome
+(chrome://tracing ou https://ui.perfetto.dev).
+
+Un script dont tous les scenarios passent est marque dans le cache
+d'artifacts.py et ignore ensuite tant que ses sources ne changent pas
+(--all pour tout relancer).
+
+Usage:
+    python run_tests.py                                  # Scripts par defaut
+    python run_tests.py test_complete.py --workers 4
+    python run_tests.py --all --junit output/junit.xml --trace output/trace.json
+"""
+
+import argparse
+import ast
+import contextlib
+import importlib.abc
+import importlib.machinery
+import importlib.util
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+
+import artifacts
+
+TEST_SCRIPTS = ("ActionChain.py", "test_complete.py", "deploy.py", "test_model.py")
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def is_add_test(decorator):
+    """Vrai pour @sp.add_test() / @sp.add_test / @smartpy.add_test(...)"""
+    target = decorator.func if isinstance(decorator, ast.Call) else decorator
+    return isinstance(target, ast.Attribute) and target.attr == "add_test"
+
+
+def calls_test_scenario(function):
+    return any(
+        isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "test_scenario"
+        for node in ast.walk(function)
+    )
+
+
+def discover(script):
+    """Scenarios d'un script: fonctions @sp.add_test et fonctions test_* construisant un scenario"""
+    with open(os.path.join(SOURCE_DIR, script)) as f:
+        tree = ast.parse(f.read(), script)
+    found = []
+    for node in tree.body:
+        if not isinstance(node, ast.FunctionDef):
+            continue
+        if any(is_add_test(decorator) for decorator in node.decorator_list):
+            found.append(node.name)
+        elif node.name.startswith("test_") and not node.args.args and calls_test_scenario(node):
+            found.append(node.name)
+    return found
+
+
+class ProjectLoader(importlib.machinery.SourceFileLoader):
+    """Charge un module du projet sans ses decorateurs @sp.add_test"""
+
+    def source_to_code(self, data, path, *, _optimize=-1):
+        tree = ast.parse(data, path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.FunctionDef):
+                node.decorator_list = [d for d in node.decorator_list if not is_add_test(d)]
+        return compile(tree, path, "exec", dont_inherit=True, optimize=_optimize)
+
+
+class ProjectFinder(importlib.abc.MetaPathFinder):
+    """Oriente l'import des scripts de test (et d'ActionChain) vers ProjectLoader"""
+
+    def __init__(self, modules):
+        self.modules = set(modules)
+
+    def find_spec(self, name, path=None, target=None):
+        if name not in self.modules:
+            return None
+        location = os.path.join(SOURCE_DIR, name + ".py")
+        return importlib.util.spec_from_file_location(name, location, loader=ProjectLoader(name, location))
+
+
+def module_name(script):
+    return os.path.splitext(os.path.basename(script))[0]
+
+
+def load_modules(scripts):
+    """Importe les scripts (et ActionChain) une fois; les imports suivants reutilisent sys.modules"""
+    modules = {module_name(script) for script in scripts} | {"ActionChain"}
+    if not any(isinstance(finder, ProjectFinder) for finder in sys.meta_path):
+        sys.meta_path.insert(0, ProjectFinder(modules))
+    if SOURCE_DIR not in sys.path:
+        sys.path.insert(0, SOURCE_DIR)
+    for name in sorted(modules, key=lambda name: name != "ActionChain"):
+        importlib.import_module(name)
+
+
+class PhaseRecorder:
+    """Enregistre les titres scenario.h1 / h2 avec leur horodatage"""
+
+    def __init__(self):
+        self.marks = []
+        self.patched = set()
+
+    def install(self):
+        import smartpy as sp
+        original = sp.test_scenario
+        recorder = self
+
+        def test_scenario(*args, **kwargs):
+            scenario = original(*args, **kwargs)
+            recorder.wrap(type(scenario))
+            return scenario
+
+        sp.test_scenario = test_scenario
+
+    def wrap(self, cls):
+        if cls in self.patched:
+            return
+        self.patched.add(cls)
+        for level, method in ((1, "h1"), (2, "h2")):
+            heading = getattr(cls, method, None)
+            if heading is None:
+                continue
+
+            def timed(scenario, title, *args, _heading=heading, _level=level, **kwargs):
+                self.marks.append((_level, str(title), time.time()))
+                return _heading(scenario, title, *args, **kwargs)
+
+            setattr(cls, method, timed)
+
+    def phases(self, end):
+        """Intervalles des phases: une phase dure jusqu'au titre suivant de niveau egal ou superieur"""
+        phases = []
+        for i, (level, title, start) in enumerate(self.marks):
+            stop = next((t for other, _, t in self.marks[i + 1:] if other <= level), end)
+            phases.append({"name": title, "level": level, "start": start, "end": stop})
+        return phases
+
+
+recorder = PhaseRecorder()
+
+
+def init_worker(scripts):
+    # Avec fork le parent a deja tout fait: les workers n'ont plus qu'a verifier sys.modules
+    if not getattr(init_worker, "installed", False):
+        recorder.install()
+        init_worker.installed = True
+    load_modules(scripts)
+
+
+def run_scenario(script, function):
+    """Execute un scenario dans le worker; renvoie son resultat et ses phases"""
+    module = sys.modules[module_name(script)]
+    recorder.marks = []
+    output = io.StringIO()
+    start = time.time()
+    error = None
+    try:
+        with contextlib.redirect_stdout(output):
+            getattr(module, function)()
+    except Exception:
+        error = traceback.format_exc()
+    end = time.time()
+    return {
+        "script": script, "name": function, "pid": os.getpid(),
+        "start": start, "end": end, "passed": error is None, "error": error,
+        "output": output.getvalue(), "phases": recorder.phases(end)
+    }
+
+
+def junit_report(results, path):
+    suites = ET.Element("testsuites")
+    for script in dict.fromkeys(result["script"] for result in results):
+        cases = [result for result in results if result["script"] == script]
+        suite = ET.SubElement(suites, "testsuite", name=module_name(script), tests=str(len(cases)),
+                              failures=str(sum(not case["passed"] for case in cases)),
+                              time=f"{sum(case['end'] - case['start'] for case in cases):.3f}")
+        for case in cases:
+            element = ET.SubElement(suite, "testcase", classname=module_name(script), name=case["name"],
+                                    time=f"{case['end'] - case['start']:.3f}")
+            if not case["passed"]:
+                failure = ET.SubElement(element, "failure", message=case["error"].strip().splitlines()[-1])
+                failure.text = case["error"]
+            if case["output"]:
+                ET.SubElement(element, "system-out").text = case["output"]
+    ET.ElementTree(suites).write(path, encoding="utf-8", xml_declaration=True)
+
+
+def chrome_trace(results, origin, path):
+    """Evenements complets (ph "X") en microsecondes: un fil par worker"""
+    events = []
+    for result in results:
+        events.append({
+            "name": f"{module_name(result['script'])}.{result['name']}", "cat": "scenario", "ph": "X",
+            "ts": (result["start"] - origin) * 1e6, "dur": (result["end"] - result["start"]) * 1e6,
+            "pid": 1, "tid": result["pid"], "args": {"passed": result["passed"]}
+        })
+        for phase in result["phases"]:
+            events.append({
+                "name": phase["name"], "cat": f"h{phase['level']}", "ph": "X",
+                "ts": (phase["start"] - origin) * 1e6, "dur": (phase["end"] - phase["start"]) * 1e6,
+                "pid": 1, "tid": result["pid"]
+            })
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scenarios SmartPy en parallele, avec profil de temps")
+    parser.add_argument("scripts", nargs="*", default=list(TEST_SCRIPTS))
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--all", action="store_true", help="relancer aussi les scripts inchanges")
+    parser.add_argument("--junit", default="output/junit.xml")
+    parser.add_argument("--trace", default="output/trace.json")
+    args = parser.parse_args(argv)
+
+    scripts = [script for script in args.scripts
+               if args.all or not os.path.exists(artifacts.test_stamp(script, SOURCE_DIR))]
+    for script in set(args.scripts) - set(scripts):
+        print(f"{script}: inchange, ignore")
+    tasks = [(script, function) for script in scripts for function in discover(script)]
+    if not tasks:
+        return 0
+
+    origin = time.time()
+    # fork: les workers heritent des modules compiles par le parent
+    context = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else None)
+    if context.get_start_method() == "fork":
+        init_worker(scripts)
+    results = []
+    with ProcessPoolExecutor(max_workers=min(args.workers or 1, len(tasks)), mp_context=context,
+                             initializer=init_worker, initargs=(scripts,)) as pool:
+        futures = [pool.submit(run_scenario, script, function) for script, function in tasks]
+        for future in futures:
+            result = future.result()
+            results.append(result)
+            status = "ok" if result["passed"] else "ECHEC"
+            print(f"{status:<5} {result['script']}::{result['name']} ({result['end'] - result['start']:.2f} s)")
+            for phase in result["phases"]:
+                print(f"{'':<8}{'  ' * phase['level']}{phase['name']}: {phase['end'] - phase['start']:.2f} s")
+            if not result["passed"]:
+                print(result["error"])
+
+    for path in (args.junit, args.trace):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+    junit_report(results, args.junit)
+    chrome_trace(results, origin, args.trace)
+
+    failed = {result["script"] for result in results if not result["passed"]}
+    for script in scripts:
+        if script not in failed:
+            artifacts.mark_passed(script, SOURCE_DIR)
+    print(f"{len(results) - sum(not r['passed'] for r in results)}/{len(results)} scenarios reussis "
+          f"en {time.time() - origin:.2f} s (JUnit: {args.junit}, trace: {args.trace})")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
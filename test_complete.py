@@ -32,10 +32,10 @@ def test_complete_trading_scenario():
     
     # Distribution initiale des tokens
     scenario.h2("Distribution des tokens")
-    contract.mint(to_address=alice.address, amount=100_000).run(sender=admin)   # Market maker
-    contract.mint(to_address=bob.address, amount=50_000).run(sender=admin)      # Trader
-    contract.mint(to_address=charlie.address, amount=75_000).run(sender=admin)  # Investisseur
-    contract.mint(to_address=dave.address, amount=25_000).run(sender=admin)     # Day trader
+    contract.dispatch(sp.variant.mint(sp.record(to_address=alice.address, amount=100_000))).run(sender=admin)   # Market maker
+    contract.dispatch(sp.variant.mint(sp.record(to_address=bob.address, amount=50_000))).run(sender=admin)      # Trader
+    contract.dispatch(sp.variant.mint(sp.record(to_address=charlie.address, amount=75_000))).run(sender=admin)  # Investisseur
+    contract.dispatch(sp.variant.mint(sp.record(to_address=dave.address, amount=25_000))).run(sender=admin)     # Day trader
     
     # Vérification des soldes initiaux
     scenario.verify(contract.get_balance(alice.address) == 100_000)
@@ -51,20 +51,21 @@ def test_complete_trading_scenario():
     scenario.h2("Alice crée de la liquidité")
     
     # Ordres de vente échelonnés
-    contract.place_sell_order(price=sp.mutez(1_100_000), quantity=500).run(sender=alice)  # 1.10 tez
-    contract.place_sell_order(price=sp.mutez(1_150_000), quantity=750).run(sender=alice)  # 1.15 tez
-    contract.place_sell_order(price=sp.mutez(1_200_000), quantity=1000).run(sender=alice) # 1.20 tez
-    contract.place_sell_order(price=sp.mutez(1_250_000), quantity=1500).run(sender=alice) # 1.25 tez
+    # Chaque nouveau niveau est place derriere le precedent (hint: niveau voisin)
+    contract.place_sell_order(price=sp.mutez(1_100_000), quantity=500, max_fills=10, hint=None).run(sender=alice)  # 1.10 tez
+    contract.place_sell_order(price=sp.mutez(1_150_000), quantity=750, max_fills=10, hint=sp.Some(110)).run(sender=alice)  # 1.15 tez
+    contract.place_sell_order(price=sp.mutez(1_200_000), quantity=1000, max_fills=10, hint=sp.Some(115)).run(sender=alice) # 1.20 tez
+    contract.place_sell_order(price=sp.mutez(1_250_000), quantity=1500, max_fills=10, hint=sp.Some(120)).run(sender=alice) # 1.25 tez
     
     # Charlie place des ordres d'achat pour créer du support
     scenario.h2("Charlie place des ordres de support")
-    contract.place_buy_order(price=sp.mutez(1_050_000), quantity=300).run(
+    contract.place_buy_order(price=sp.mutez(1_050_000), quantity=300, max_fills=10, hint=None).run(
         sender=charlie, amount=sp.tez(315)  # 300 * 1.05 = 315 tez
     )
-    contract.place_buy_order(price=sp.mutez(1_000_000), quantity=500).run(
+    contract.place_buy_order(price=sp.mutez(1_000_000), quantity=500, max_fills=10, hint=sp.Some(105)).run(
         sender=charlie, amount=sp.tez(500)  # 500 * 1.00 = 500 tez
     )
-    contract.place_buy_order(price=sp.mutez(950_000), quantity=1000).run(
+    contract.place_buy_order(price=sp.mutez(950_000), quantity=1000, max_fills=10, hint=sp.Some(100)).run(
         sender=charlie, amount=sp.tez(950)  # 1000 * 0.95 = 950 tez
     )
     
@@ -73,12 +74,12 @@ def test_complete_trading_scenario():
     
     # Bob achète au marché (prix le plus bas disponible)
     scenario.h2("Bob achète au prix du marché")
-    contract.place_buy_order(price=sp.mutez(1_100_000), quantity=200).run(
+    contract.place_buy_order(price=sp.mutez(1_100_000), quantity=200, max_fills=10, hint=None).run(
         sender=bob, amount=sp.tez(220)  # 200 * 1.10 = 220 tez
     )
     
     # Vérification du trade
-    scenario.verify(contract.get_balance(alice.address) == 99_700)  # 100_000 - 300 (vendu)
+    scenario.verify(contract.get_balance(alice.address) == 99_800)  # 100_000 - 200 (vendu)
     scenario.verify(contract.get_balance(bob.address) == 50_200)    # 50_000 + 200 (acheté)
     scenario.verify(contract.get_last_price() == sp.mutez(1_100_000))  # Prix du dernier trade
     
@@ -86,55 +87,57 @@ def test_complete_trading_scenario():
     scenario.h2("Dave fait du day trading")
     
     # Dave achète rapidement
-    contract.place_buy_order(price=sp.mutez(1_100_000), quantity=300).run(
+    contract.place_buy_order(price=sp.mutez(1_100_000), quantity=300, max_fills=10, hint=None).run(
         sender=dave, amount=sp.tez(330)  # 300 * 1.10 = 330 tez
     )
     
     # Vérification que l'ordre partiel d'Alice a été complètement exécuté
-    scenario.verify(contract.get_balance(alice.address) == 99_500)  # 99_700 - 200 restants
+    scenario.verify(contract.get_balance(alice.address) == 99_500)  # 99_800 - 300 restants
     scenario.verify(contract.get_balance(dave.address) == 25_300)   # 25_000 + 300
     
     # Dave revend immédiatement avec profit
-    contract.place_sell_order(price=sp.mutez(1_120_000), quantity=250).run(sender=dave)  # +2 centimes
+    contract.place_sell_order(price=sp.mutez(1_120_000), quantity=250, max_fills=10, hint=None).run(sender=dave)  # +2 centimes
     
     # === PHASE 3: ORDRES COMPLEXES ===
     scenario.h1("Phase 3: Stratégies complexes")
     
     # Bob place un ordre d'achat important à un prix attractif
     scenario.h2("Bob place un gros ordre d'achat")
-    contract.place_buy_order(price=sp.mutez(1_150_000), quantity=500).run(
+    contract.place_buy_order(price=sp.mutez(1_150_000), quantity=500, max_fills=10, hint=None).run(
         sender=bob, amount=sp.tez(575)  # 500 * 1.15 = 575 tez
     )
     
-    # Cet ordre devrait matcher partiellement avec l'ordre de vente d'Alice à 1.15
+    # Cet ordre exécute d'abord la vente de Dave à 1.12, puis 250 tokens d'Alice à 1.15
+    scenario.verify(contract.get_balance(dave.address) == 25_050)   # Vente de 250 tokens
     scenario.verify(contract.get_balance(alice.address) == 99_250)  # Vente de 250 tokens
-    scenario.verify(contract.get_balance(bob.address) == 50_450)    # Achat de 250 tokens (partiel)
+    scenario.verify(contract.get_balance(bob.address) == 50_700)    # Achat de 500 tokens
     
     # Alice ajuste ses prix à la baisse
     scenario.h2("Alice ajuste ses prix")
-    contract.place_sell_order(price=sp.mutez(1_130_000), quantity=400).run(sender=alice)  # 1.13 tez
+    contract.place_sell_order(price=sp.mutez(1_130_000), quantity=400, max_fills=10, hint=None).run(sender=alice)  # 1.13 tez
     
-    # Cela devrait déclencher l'ordre de Bob restant
-    scenario.verify(contract.get_balance(bob.address) == 50_700)    # +250 tokens supplémentaires
+    # Aucun achat à 1.13 ou plus: l'ordre devient le meilleur prix de vente
+    scenario.verify(contract.get_balance(bob.address) == 50_700)
+    scenario.verify(contract.data.best_ask == sp.Some(113))
     
     # === PHASE 4: GESTION DES ORDRES ===
     scenario.h1("Phase 4: Gestion des ordres")
     
     # Dave place un ordre puis l'annule
     scenario.h2("Dave annule un ordre")
-    contract.place_buy_order(price=sp.mutez(1_080_000), quantity=100).run(
+    contract.place_buy_order(price=sp.mutez(1_080_000), quantity=100, max_fills=10, hint=None).run(
         sender=dave, amount=sp.tez(108)
     )
     
     # Annulation avec remboursement
-    contract.cancel_order(order_id=10, order_type="buy").run(sender=dave)
+    contract.cancel_order(order_id=12, order_type="buy").run(sender=dave)
     
     # Charlie modifie sa stratégie (annule et replace)
     scenario.h2("Charlie modifie sa stratégie")
-    contract.cancel_order(order_id=7, order_type="buy").run(sender=charlie)  # Annule ordre à 0.95
+    contract.cancel_order(order_id=6, order_type="buy").run(sender=charlie)  # Annule ordre à 0.95
     
     # Place un nouvel ordre plus agressif
-    contract.place_buy_order(price=sp.mutez(1_080_000), quantity=800).run(
+    contract.place_buy_order(price=sp.mutez(1_080_000), quantity=800, max_fills=10, hint=None).run(
         sender=charlie, amount=sp.tez(864)  # 800 * 1.08 = 864 tez
     )
     
@@ -147,12 +150,12 @@ def test_complete_trading_scenario():
     # Alice et Bob font plusieurs petits échanges
     for i in range(3):
         # Bob achète
-        contract.place_buy_order(price=sp.mutez(1_140_000), quantity=50).run(
+        contract.place_buy_order(price=sp.mutez(1_140_000), quantity=50, max_fills=10, hint=None).run(
             sender=bob, amount=sp.tez(57)  # 50 * 1.14 = 57 tez
         )
         
         # Alice replace des ordres de vente
-        contract.place_sell_order(price=sp.mutez(1_160_000), quantity=75).run(sender=alice)
+        contract.place_sell_order(price=sp.mutez(1_160_000), quantity=75, max_fills=10, hint=sp.Some(115)).run(sender=alice)
     
     # Vérification du volume (approximatif car calculé automatiquement)
     # Le volume devrait inclure tous les trades effectués
@@ -164,7 +167,7 @@ def test_complete_trading_scenario():
     
     # Admin mint des tokens supplémentaires
     scenario.h2("Mint de tokens supplémentaires")
-    contract.mint(to_address=admin.address, amount=50_000).run(sender=admin)
+    contract.dispatch(sp.variant.mint(sp.record(to_address=admin.address, amount=50_000))).run(sender=admin)
     scenario.verify(contract.get_total_supply() > 2_250_000)
     
     # Transfert direct entre utilisateurs
@@ -177,16 +180,16 @@ def test_complete_trading_scenario():
     
     # Test: Prix avec trop de décimales (doit échouer)
     scenario.h2("Test prix invalide")
-    contract.place_buy_order(price=sp.mutez(1_123_456), quantity=10).run(
+    contract.place_buy_order(price=sp.mutez(1_123_456), quantity=10, max_fills=10, hint=None).run(
         sender=bob, 
         amount=sp.tez(11.23456),
         valid=False,  # Doit échouer
-        exception="Prix doit avoir maximum 2 décimales"
+        exception="Prix doit avoir maximum 2 decimales"
     )
     
     # Test: Vente sans solde suffisant (doit échouer)
     scenario.h2("Test solde insuffisant")
-    contract.place_sell_order(price=sp.mutez(1_200_000), quantity=1_000_000).run(
+    contract.place_sell_order(price=sp.mutez(1_200_000), quantity=1_000_000, max_fills=10, hint=None).run(
         sender=dave,
         valid=False,  # Doit échouer
         exception="Solde insuffisant"
@@ -194,7 +197,7 @@ def test_complete_trading_scenario():
     
     # Test: Mint par non-admin (doit échouer)
     scenario.h2("Test mint non autorisé")
-    contract.mint(to_address=bob.address, amount=1000).run(
+    contract.dispatch(sp.variant.mint(sp.record(to_address=bob.address, amount=1000))).run(
         sender=bob,
         valid=False,  # Doit échouer
         exception="Seul l'admin peut mint"
@@ -251,32 +254,87 @@ def test_edge_cases():
     scenario += contract
     
     # Distribution
-    contract.mint(to_address=alice.address, amount=1_000).run(sender=admin)
-    contract.mint(to_address=bob.address, amount=1_000).run(sender=admin)
+    contract.dispatch(sp.variant.mint(sp.record(to_address=alice.address, amount=1_000))).run(sender=admin)
+    contract.dispatch(sp.variant.mint(sp.record(to_address=bob.address, amount=1_000))).run(sender=admin)
     
     scenario.h2("Tests des cas limites")
     
     # Test 1: Prix minimum
-    contract.place_sell_order(price=sp.mutez(10_000), quantity=1).run(sender=alice)  # 0.01 tez
-    contract.place_buy_order(price=sp.mutez(10_000), quantity=1).run(
+    contract.place_sell_order(price=sp.mutez(10_000), quantity=1, max_fills=10, hint=None).run(sender=alice)  # 0.01 tez
+    contract.place_buy_order(price=sp.mutez(10_000), quantity=1, max_fills=10, hint=None).run(
         sender=bob, amount=sp.mutez(10_000)
     )
     
     # Test 2: Quantité de 1 token
-    contract.place_sell_order(price=sp.mutez(1_000_000), quantity=1).run(sender=alice)
+    contract.place_sell_order(price=sp.mutez(1_000_000), quantity=1, max_fills=10, hint=None).run(sender=alice)
     
     # Test 3: Ordre avec montant exact
-    contract.place_buy_order(price=sp.mutez(1_000_000), quantity=1).run(
+    contract.place_buy_order(price=sp.mutez(1_000_000), quantity=1, max_fills=10, hint=None).run(
         sender=bob, amount=sp.mutez(1_000_000)
     )
     
     # Test 4: Burn jusqu'à 0
     alice_balance = contract.get_balance(alice.address)
-    contract.burn(amount=alice_balance).run(sender=alice)
+    contract.dispatch(sp.variant.burn(alice_balance)).run(sender=alice)
     scenario.verify(contract.get_balance(alice.address) == 0)
     
     scenario.h2("Cas limites validés")
 
+@sp.add_test()
+def test_large_order_book():
+    """Carnet de 10 000 ordres origine directement dans son etat (fixtures.py)"""
+    import fixtures
+
+    scenario = sp.test_scenario("Carnet de 10 000 ordres", main)
+    dave = sp.test_account("Dave")
+
+    scenario.h1("Origination dans un etat pre-rempli")
+    model = fixtures.from_spec(fixtures.book_spec(["Alice", "Bob", "Charlie"], orders=10_000))
+    contract = fixtures.originate(scenario, fixtures.snapshot(model))
+
+    # Le scenario n'expose pas les vues heritees par ActionChainSnapshot:
+    # les meilleurs prix sont verifies sur le storage
+    def verify_best(is_buy):
+        tick = model.best_bid_tick() if is_buy else model.best_ask_tick()
+        levels = model.bid_levels if is_buy else model.ask_levels
+        scenario.verify((contract.data.best_bid if is_buy else contract.data.best_ask) == sp.Some(tick))
+        scenario.verify(contract.data.levels[(is_buy, tick)].quantity == levels[tick].quantity)
+
+    verify_best(True)
+    verify_best(False)
+    scenario.verify(contract.data.order_counter == 10_000)
+    scenario.verify(contract.balance == sp.mutez(model.balance))
+
+    scenario.h2("Achat execute contre le carnet")
+    price = (model.best_ask_tick() + 5) * model.tick_size
+    hint = model.level_hint(True, price // model.tick_size)
+    model.place_buy_order("Dave", price, 200, 10, hint)
+    contract.place_buy_order(price=sp.mutez(price), quantity=200, max_fills=10, hint=hint).run(
+        sender=dave, amount=sp.mutez(price * 200)
+    )
+    scenario.verify(contract.data.balances[dave.address] == model.get_balance("Dave"))
+    scenario.verify(contract.data.trade_counter == model.trade_counter)
+    verify_best(False)
+    scenario.verify(contract.balance == sp.mutez(model.balance))
+
+    scenario.h2("Nouveau niveau derriere les 100 niveaux du carnet")
+    alice = sp.test_account("Alice")
+    worst_ask = max(model.ask_levels)
+    tick = worst_ask + 1
+    hint = model.level_hint(False, tick)
+    assert hint == worst_ask
+    model.place_sell_order("Alice", tick * model.tick_size, 1, 10, hint)
+    contract.place_sell_order(price=sp.mutez(tick * model.tick_size), quantity=1, max_fills=10, hint=sp.Some(hint)).run(
+        sender=alice
+    )
+    scenario.verify(contract.data.levels[(False, worst_ask)].worse == sp.Some(tick))
+    # Un indice qui n'est plus voisin du prix est refuse
+    contract.place_sell_order(price=sp.mutez((tick + 2) * model.tick_size), quantity=1, max_fills=10,
+                              hint=sp.Some(worst_ask)).run(
+        sender=alice, valid=False, exception="Indice de niveau invalide"
+    )
+    scenario.verify(contract.data.order_counter == model.order_counter)
+
 if __name__ == "__main__":
     # Exécution de tous les tests
     print("Lancement des tests ActionChain Token")
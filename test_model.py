@@ -0,0 +1,188 @@
+"""
+Verification differentielle du modele Python contre le contrat
+
+Les memes operations aleatoires (valides ou non) sont appliquees au modele
+actionchain_model et au contrat SmartPy; soldes, carnet d'ordres, compteurs
+et tez detenus doivent rester identiques apres chaque operation.
+"""
+
+import random
+
+import smartpy as sp
+from ActionChain import main
+from actionchain_model import ActionChainModel, ContractError
+
+TRADERS = ["Alice", "Bob", "Charlie", "Dave"]
+OPERATIONS = 300
+SEED = 42
+
+
+def random_call(rng, model):
+    """Tire une operation (entrypoint, arguments du modele), parfois invalide"""
+    sender = rng.choice(TRADERS)
+    kind = rng.random()
+    if kind < 0.5:
+        price = rng.randint(95, 105) * model.tick_size
+        if rng.random() < 0.05:
+            price += 1  # Prix hors tick
+        is_buy = rng.random() < 0.5
+        hint = model.level_hint(is_buy, price // model.tick_size)
+        if rng.random() < 0.05:
+            hint = rng.randint(94, 106)  # Indice quelconque, souvent invalide
+        args = {"sender": sender, "price": price, "quantity": rng.randint(0, 30),
+                "max_fills": rng.randint(0, 3), "hint": hint}
+        if is_buy:
+            args["amount"] = price * args["quantity"]
+            if rng.random() < 0.05:
+                args["amount"] += 1  # Depot incorrect
+            return "place_buy_order", args
+        return "place_sell_order", args
+    if kind < 0.65:
+        order_type = "buy" if rng.random() < 0.5 else "sell"
+        orders = model.buy_orders if order_type == "buy" else model.sell_orders
+        if orders and rng.random() < 0.7:
+            order_id = rng.choice(sorted(orders))
+            if rng.random() < 0.9:
+                sender = orders[order_id].trader
+        else:
+            order_id = rng.randrange(model.order_counter + 1)
+        return "cancel_order", {"sender": sender, "order_id": order_id, "order_type": order_type}
+    if kind < 0.72:
+        bids = sorted(model.buy_orders)
+        asks = sorted(model.sell_orders)
+        buy_order_id = rng.choice(bids) if bids else 0
+        sell_order_id = rng.choice(asks) if asks else 0
+        return "execute_trade", {"sender": sender, "buy_order_id": buy_order_id,
+                                 "sell_order_id": sell_order_id}
+    if kind < 0.74:
+        pairs = [{"buy_order_id": buy_order_id, "sell_order_id": sell_order_id}
+                 for buy_order_id in sorted(model.buy_orders)[:2]
+                 for sell_order_id in sorted(model.sell_orders)[:2]]
+        return "execute_trades", {"sender": sender, "pairs": pairs}
+    if kind < 0.77:
+        orders = []
+        for _ in range(rng.randint(1, 3)):
+            order_type = "buy" if rng.random() < 0.5 else "sell"
+            tick = rng.randint(95, 105)
+            # Indice calcule avant le lot: perime si un ordre precedent du lot cree le niveau voisin
+            orders.append({"order_type": order_type, "price": tick * model.tick_size,
+                           "quantity": rng.randint(1, 20), "hint": model.level_hint(order_type == "buy", tick)})
+        return "place_orders", {"sender": sender, "orders": orders, "max_fills": rng.randint(0, 4)}
+    if kind < 0.82:
+        orders = [{"order_id": order_id, "order_type": "buy"}
+                  for order_id, order in sorted(model.buy_orders.items()) if order.trader == sender]
+        orders += [{"order_id": order_id, "order_type": "sell"}
+                   for order_id, order in sorted(model.sell_orders.items()) if order.trader == sender]
+        orders = [order for order in orders if rng.random() < 0.5]
+        if rng.random() < 0.1:
+            # Un ordre inconnu en fin de lot: tout le lot doit etre annule
+            orders.append({"order_id": model.order_counter, "order_type": "buy"})
+        return "cancel_orders", {"sender": sender, "orders": orders}
+    if kind < 0.9:
+        return "transfer", {"sender": sender, "to_address": rng.choice(TRADERS),
+                            "amount": rng.randint(0, 200)}
+    if kind < 0.95:
+        return "dispatch", {"sender": sender, "action": {"burn": rng.randint(0, 50)}}
+    return "dispatch", {"sender": rng.choice(TRADERS + ["Admin"]),
+                        "action": {"mint": {"to_address": sender, "amount": rng.randint(1, 500)}}}
+
+
+def option(value):
+    return None if value is None else sp.Some(value)
+
+
+def contract_call(token, accounts, entrypoint, args):
+    """Construit l'appel SmartPy et les parametres de run() d'une operation du modele"""
+    params = dict(args)
+    run = {"sender": accounts[params.pop("sender")]}
+    if "to_address" in params:
+        params["to_address"] = accounts[params["to_address"]].address
+    if "price" in params:
+        params["price"] = sp.mutez(params["price"])
+    if "hint" in params:
+        params["hint"] = option(params["hint"])
+    if entrypoint == "place_buy_order":
+        run["amount"] = sp.mutez(params.pop("amount", args["price"] * args["quantity"]))
+    if entrypoint == "place_orders":
+        run["amount"] = sp.mutez(sum(order["price"] * order["quantity"] for order in params["orders"]
+                                     if order["order_type"] == "buy"))
+        params["orders"] = [
+            sp.record(order_type=order["order_type"], price=sp.mutez(order["price"]),
+                      quantity=order["quantity"], hint=option(order["hint"]))
+            for order in params["orders"]
+        ]
+    if entrypoint == "cancel_orders":
+        params["orders"] = [sp.record(order_id=order["order_id"], order_type=order["order_type"])
+                            for order in params["orders"]]
+    if entrypoint == "execute_trades":
+        params["pairs"] = [sp.record(**pair) for pair in params["pairs"]]
+    if entrypoint == "dispatch":
+        (name, value), = params["action"].items()
+        if name == "mint":
+            value = sp.record(to_address=accounts[value["to_address"]].address, amount=value["amount"])
+        params["action"] = getattr(sp.variant, name)(value)
+    return getattr(token, entrypoint)(**params), run
+
+
+def verify_state(scenario, token, model, accounts):
+    for name in TRADERS + ["Admin"]:
+        address = accounts[name].address
+        scenario.verify(token.get_available_balance(address) == model.get_available_balance(name))
+        scenario.verify(token.get_reserved_balance(address) == model.get_reserved_balance(name))
+    scenario.verify(token.balance == sp.mutez(model.balance))
+    scenario.verify(token.data.total_supply == model.total_supply)
+    scenario.verify(token.data.order_counter == model.order_counter)
+    scenario.verify(token.data.trade_counter == model.trade_counter)
+    scenario.verify(token.data.last_price == sp.mutez(model.last_price))
+
+    depth = model.get_depth(100)
+    scenario.verify_equal(token.get_depth(100), sp.record(
+        bids=[sp.record(price=sp.mutez(level["price"]), quantity=level["quantity"])
+              for level in depth["bids"]],
+        asks=[sp.record(price=sp.mutez(level["price"]), quantity=level["quantity"])
+              for level in depth["asks"]]
+    ))
+
+
+@sp.add_test()
+def test_model_matches_contract():
+    scenario = sp.test_scenario("Modele Python vs contrat", main)
+
+    accounts = {name: sp.test_account(name) for name in TRADERS + ["Admin"]}
+    token = main.ActionChainToken(
+        admin=accounts["Admin"].address,
+        initial_supply=1_000_000,
+        token_name="ActionChain Token",
+        token_symbol="ACT"
+    )
+    scenario += token
+    model = ActionChainModel("Admin", 1_000_000)
+
+    scenario.h2("Distribution des tokens")
+    for name in TRADERS:
+        token.dispatch(sp.variant.mint(sp.record(to_address=accounts[name].address, amount=1_000))).run(
+            sender=accounts["Admin"]
+        )
+        model.mint("Admin", name, 1_000)
+
+    scenario.h2("Operations aleatoires")
+    rng = random.Random(SEED)
+    now = 0
+    for _ in range(OPERATIONS):
+        now += rng.choice([0, 0, 60, 3600, 6 * 3600])
+        entrypoint, args = random_call(rng, model)
+        call, run = contract_call(token, accounts, entrypoint, args)
+        try:
+            getattr(model, entrypoint)(now=now, **args)
+            call.run(now=sp.timestamp(now), **run)
+        except ContractError as error:
+            call.run(now=sp.timestamp(now), valid=False, exception=str(error), **run)
+        verify_state(scenario, token, model, accounts)
+
+    scenario.h2("Statistiques")
+    for slot, (period, volume) in model.volume_buckets.items():
+        scenario.verify(token.data.volume_buckets[slot].period == period)
+        scenario.verify(token.data.volume_buckets[slot].volume == volume)
+    for trade_id, (buyer, seller, price, quantity, timestamp) in model.trades.items():
+        scenario.verify(token.data.trades[trade_id].quantity == quantity)
+        scenario.verify(token.data.trades[trade_id].price == sp.mutez(price))
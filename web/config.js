@@ -23,13 +23,17 @@ const CONFIG = {
         maxOrderQuantity: 1000000,
         minPrice: 0.01,  // 0.01 tez
         maxPrice: 1000,  // 1000 tez
-        priceDecimals: 2 // Maximum 2 décimales
+        priceDecimals: 2, // Maximum 2 décimales
+        maxFills: 10      // Exécutions maximum par ordre placé
     },
     
     // Interface utilisateur
     UI: {
         refreshInterval: 5000,  // 5 secondes
         chartUpdateInterval: 30000,  // 30 secondes
+        chartResolution: 3600,  // Bougies d'une heure par défaut
+        chartHistory: 10080,  // Points conservés (une semaine en bougies d'une minute)
+        chartPoints: 300,  // Points dessinés après sous-échantillonnage
         maxOrderbookOrders: 10,
         maxTradeHistory: 50
     }
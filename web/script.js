@@ -1,6 +1,7 @@
 // Configuration du contrat
 const CONTRACT_ADDRESS = 'KT1...'; // Adresse du contrat déployé
 const RPC_URL = 'https://mainnet-tezos.giganode.io'; // RPC Tezos
+const FEED_URL = 'http://127.0.0.1:8765'; // Flux de marché poussé (market_feed.py)
 
 // Variables globales
 let tezos = null;
@@ -8,6 +9,23 @@ let userAddress = null;
 let contractInstance = null;
 let priceChart = null;
 
+// Historique du graphique: un point (clôture) par période de la résolution choisie,
+// dans un tampon circulaire de taille fixe
+let chartResolution = CONFIG.UI.chartResolution;
+let chartHistory = createRing(CONFIG.UI.chartHistory);
+let chartRenderPending = false;
+
+// État du flux de marché: dernier numéro de delta appliqué
+let feedSource = null;
+let feedSeq = null;
+
+// Carnet d'ordres côté client: niveaux triés (meilleur prix d'abord, en mutez),
+// quantité par prix et lignes affichées, mis à jour niveau par niveau
+let orderBook = {
+    bids: { descending: true, prices: [], quantities: new Map(), rows: [] },
+    asks: { descending: false, prices: [], quantities: new Map(), rows: [] }
+};
+
 // Données de démonstration (à remplacer par les vraies données du contrat)
 let mockData = {
     currentPrice: 1.20,
@@ -55,27 +73,29 @@ document.addEventListener('DOMContentLoaded', function() {
     console.log('ActionChain Token Interface chargée');
     
     initializeChart();
+    resetOrderbook(
+        mockData.buyOrders.map(order => [Math.round(order.price * 1000000), order.quantity]),
+        mockData.sellOrders.map(order => [Math.round(order.price * 1000000), order.quantity])
+    );
     updateUI();
     setupEventListeners();
     
-    // Simulation de mise à jour en temps réel
-    setInterval(updateMarketData, 5000);
+    // Mises à jour poussées par le serveur au lieu d'un polling par onglet
+    connectMarketFeed();
 });
 
 // Configuration du graphique
 function initializeChart() {
     const ctx = document.getElementById('priceChart').getContext('2d');
     
-    // Données de prix historiques (simulation)
-    const priceData = generateMockPriceData();
-    
+    // Historique chargé depuis les bougies du flux de marché
     priceChart = new Chart(ctx, {
         type: 'line',
         data: {
-            labels: priceData.labels,
+            labels: [],
             datasets: [{
                 label: 'Prix ACT (ꜩ)',
-                data: priceData.prices,
+                data: [],
                 borderColor: '#6366f1',
                 backgroundColor: 'rgba(99, 102, 241, 0.1)',
                 borderWidth: 3,
@@ -84,7 +104,7 @@ function initializeChart() {
                 pointBackgroundColor: '#6366f1',
                 pointBorderColor: '#ffffff',
                 pointBorderWidth: 2,
-                pointRadius: 4,
+                pointRadius: 0,
                 pointHoverRadius: 6
             }]
         },
@@ -145,23 +165,157 @@ function initializeChart() {
     });
 }
 
-// Génération de données de prix de démonstration
-function generateMockPriceData() {
-    const labels = [];
-    const prices = [];
-    const now = new Date();
-    
-    for (let i = 23; i >= 0; i--) {
-        const time = new Date(now.getTime() - i * 60 * 60 * 1000);
-        labels.push(time.toLocaleTimeString('fr-FR', { hour: '2-digit', minute: '2-digit' }));
-        
-        // Simulation de prix avec variation aléatoire
-        const basePrice = 1.20;
-        const variation = (Math.random() - 0.5) * 0.1;
-        prices.push((basePrice + variation).toFixed(2));
+// Tampon circulaire de points (temps en secondes, prix en tez)
+function createRing(capacity) {
+    return {
+        times: new Float64Array(capacity),
+        prices: new Float64Array(capacity),
+        start: 0,
+        length: 0
+    };
+}
+
+function ringIndex(ring, i) {
+    return (ring.start + i) % ring.times.length;
+}
+
+function ringPush(ring, time, price) {
+    const capacity = ring.times.length;
+    const index = (ring.start + ring.length) % capacity;
+    ring.times[index] = time;
+    ring.prices[index] = price;
+    if (ring.length < capacity) {
+        ring.length++;
+    } else {
+        ring.start = (ring.start + 1) % capacity; // Écrase le plus ancien
+    }
+}
+
+// Clôture d'une période: nouveau point après le dernier, ou mise à jour du dernier
+// ('push', 'update', ou null pour une période plus ancienne, ignorée)
+function ringRecord(ring, time, price) {
+    const last = ring.length ? ringIndex(ring, ring.length - 1) : -1;
+    if (last === -1 || time > ring.times[last]) {
+        ringPush(ring, time, price);
+        return 'push';
+    }
+    if (time === ring.times[last]) {
+        ring.prices[last] = price;
+        return 'update';
+    }
+    return null;
+}
+
+// Ajoute un trade à la période courante du graphique (idempotent: un trade
+// déjà compté dans une bougie ne fait que réécrire la même clôture)
+function addChartTrade(time, price) {
+    const change = ringRecord(chartHistory, time - time % chartResolution, price);
+    if (change === 'push') {
+        scheduleChartRender();
+    } else if (change === 'update') {
+        if (!chartRenderPending && priceChart && priceChart.data.datasets[0].data.length) {
+            // Seule la clôture du dernier point change: pas de rééchantillonnage
+            const data = priceChart.data.datasets[0].data;
+            data[data.length - 1] = price;
+            priceChart.update('none');
+        }
     }
-    
-    return { labels, prices };
+}
+
+// Largest-Triangle-Three-Buckets: garde `threshold` points qui conservent la
+// forme de la courbe (indices dans le tampon)
+function downsampleLTTB(ring, threshold) {
+    const n = ring.length;
+    const x = i => ring.times[ringIndex(ring, i)];
+    const y = i => ring.prices[ringIndex(ring, i)];
+    if (n <= threshold || threshold < 3) {
+        return Array.from({ length: n }, (_, i) => i);
+    }
+    const selected = [0];
+    const bucketSize = (n - 2) / (threshold - 2);
+    let a = 0;
+    for (let bucket = 0; bucket < threshold - 2; bucket++) {
+        // Moyenne du seau suivant
+        const nextStart = Math.floor((bucket + 1) * bucketSize) + 1;
+        const nextEnd = Math.min(Math.floor((bucket + 2) * bucketSize) + 1, n);
+        let averageX = 0;
+        let averageY = 0;
+        for (let i = nextStart; i < nextEnd; i++) {
+            averageX += x(i);
+            averageY += y(i);
+        }
+        averageX /= nextEnd - nextStart;
+        averageY /= nextEnd - nextStart;
+
+        // Point du seau courant formant le plus grand triangle
+        const start = Math.floor(bucket * bucketSize) + 1;
+        const end = Math.floor((bucket + 1) * bucketSize) + 1;
+        const ax = x(a);
+        const ay = y(a);
+        let maxArea = -1;
+        let chosen = start;
+        for (let i = start; i < end; i++) {
+            const area = Math.abs((ax - averageX) * (y(i) - ay) - (ax - x(i)) * (averageY - ay));
+            if (area > maxArea) {
+                maxArea = area;
+                chosen = i;
+            }
+        }
+        selected.push(chosen);
+        a = chosen;
+    }
+    selected.push(n - 1);
+    return selected;
+}
+
+// Redessine au plus une fois par frame, sur au plus CONFIG.UI.chartPoints points
+function scheduleChartRender() {
+    if (chartRenderPending) return;
+    chartRenderPending = true;
+    requestAnimationFrame(() => {
+        chartRenderPending = false;
+        if (!priceChart) return;
+        const ring = chartHistory;
+        const points = downsampleLTTB(ring, CONFIG.UI.chartPoints);
+        const dateFormat = chartResolution >= 86400
+            ? { day: '2-digit', month: '2-digit' }
+            : { day: '2-digit', month: '2-digit', hour: '2-digit', minute: '2-digit' };
+        priceChart.data.labels = points.map(i =>
+            new Date(ring.times[ringIndex(ring, i)] * 1000).toLocaleString('fr-FR', dateFormat)
+        );
+        priceChart.data.datasets[0].data = points.map(i => ring.prices[ringIndex(ring, i)]);
+        priceChart.update('none'); // Animation désactivée pour les mises à jour en temps réel
+    });
+}
+
+// Remplit l'historique avec les bougies OHLCV de la résolution choisie
+async function loadChartHistory() {
+    const resolution = chartResolution;
+    try {
+        const response = await fetch(
+            `${FEED_URL}/candles?resolution=${resolution}&limit=${CONFIG.UI.chartHistory}`
+        );
+        const candles = await response.json();
+        if (resolution !== chartResolution) return; // Résolution changée entre-temps
+        const ring = createRing(CONFIG.UI.chartHistory);
+        candles.forEach(candle => ringPush(ring, candle.time, candle.close / 1000000));
+        // Trades reçus pendant le chargement
+        for (let i = 0; i < chartHistory.length; i++) {
+            const index = ringIndex(chartHistory, i);
+            ringRecord(ring, chartHistory.times[index], chartHistory.prices[index]);
+        }
+        chartHistory = ring;
+        scheduleChartRender();
+    } catch (error) {
+        console.error('Erreur lors du chargement des bougies:', error);
+    }
+}
+
+function changeChartResolution(event) {
+    chartResolution = parseInt(event.target.value);
+    chartHistory = createRing(CONFIG.UI.chartHistory);
+    scheduleChartRender();
+    loadChartHistory();
 }
 
 // Configuration des événements
@@ -179,6 +333,11 @@ function setupEventListeners() {
     // Wallet
     document.getElementById('connectWallet').addEventListener('click', connectWallet);
     document.getElementById('refreshBalance').addEventListener('click', refreshBalance);
+    
+    // Résolution du graphique
+    const resolutionSelect = document.getElementById('chartResolution');
+    resolutionSelect.value = String(chartResolution);
+    resolutionSelect.addEventListener('change', changeChartResolution);
 }
 
 // Calculs des totaux
@@ -228,7 +387,9 @@ async function handleBuyOrder(event) {
         // Simulation de l'appel au contrat
         await simulateContractCall('place_buy_order', {
             price: priceInMutez,
-            quantity: quantity
+            quantity: quantity,
+            max_fills: CONFIG.LIMITS.maxFills,
+            hint: levelHint(orderBook.bids, priceInMutez)
         }, totalAmount);
         
         alert(`Ordre d'achat placé: ${quantity} ACT à ${price} ꜩ`);
@@ -283,7 +444,9 @@ async function handleSellOrder(event) {
         // Simulation de l'appel au contrat
         await simulateContractCall('place_sell_order', {
             price: priceInMutez,
-            quantity: quantity
+            quantity: quantity,
+            max_fills: CONFIG.LIMITS.maxFills,
+            hint: levelHint(orderBook.asks, priceInMutez)
         }, 0);
         
         alert(`Ordre de vente placé: ${quantity} ACT à ${price} ꜩ`);
@@ -399,43 +562,95 @@ function updateMarketStats() {
     document.getElementById('marketCap').textContent = `${mockData.marketCap.toLocaleString()} ꜩ`;
 }
 
-// Mise à jour du carnet d'ordres
+// Position d'un prix dans les niveaux triés d'un côté (recherche dichotomique)
+function levelIndex(side, price) {
+    let low = 0;
+    let high = side.prices.length;
+    while (low < high) {
+        const middle = (low + high) >> 1;
+        const better = side.descending ? side.prices[middle] > price : side.prices[middle] < price;
+        if (better) {
+            low = middle + 1;
+        } else {
+            high = middle;
+        }
+    }
+    return low;
+}
+
+// Indice d'insertion attendu par le contrat: tick (prix / 0.01 ꜩ) du niveau voisin
+// meilleur qu'un nouveau prix, null si le niveau existe ou devient le meilleur prix
+function levelHint(side, price) {
+    if (side.quantities.has(price)) return null;
+    const index = levelIndex(side, price);
+    return index > 0 ? side.prices[index - 1] / 10000 : null;
+}
+
+// Fixe la quantité d'un niveau (0 le retire) sans retrier le carnet
+function setLevel(side, price, quantity) {
+    const known = side.quantities.has(price);
+    if (quantity === 0) {
+        if (!known) return;
+        side.quantities.delete(price);
+        side.prices.splice(levelIndex(side, price), 1);
+    } else {
+        if (!known) side.prices.splice(levelIndex(side, price), 0, price);
+        side.quantities.set(price, quantity);
+    }
+}
+
+// Remplace tout le carnet (niveaux [prix en mutez, quantité])
+function resetOrderbook(bids, asks) {
+    for (const [side, levels] of [[orderBook.bids, bids], [orderBook.asks, asks]]) {
+        side.prices = [];
+        side.quantities.clear();
+        levels.forEach(([price, quantity]) => setLevel(side, price, quantity));
+    }
+}
+
+// Mise à jour du carnet d'ordres: seules les lignes modifiées sont réécrites
 function updateOrderbook() {
-    // Ordres de vente (triés par prix croissant)
-    const sellOrdersList = document.getElementById('sellOrdersList');
-    sellOrdersList.innerHTML = '';
-    
-    mockData.sellOrders.sort((a, b) => a.price - b.price).forEach(order => {
-        const orderElement = document.createElement('div');
-        orderElement.className = 'order-item';
-        orderElement.innerHTML = `
-            <span>${order.price.toFixed(2)}</span>
-            <span>${order.quantity}</span>
-            <span>${order.total.toFixed(2)}</span>
-        `;
-        sellOrdersList.appendChild(orderElement);
-    });
-    
-    // Ordres d'achat (triés par prix décroissant)
-    const buyOrdersList = document.getElementById('buyOrdersList');
-    buyOrdersList.innerHTML = '';
-    
-    mockData.buyOrders.sort((a, b) => b.price - a.price).forEach(order => {
-        const orderElement = document.createElement('div');
-        orderElement.className = 'order-item';
-        orderElement.innerHTML = `
-            <span>${order.price.toFixed(2)}</span>
-            <span>${order.quantity}</span>
-            <span>${order.total.toFixed(2)}</span>
-        `;
-        buyOrdersList.appendChild(orderElement);
-    });
-    
+    renderBookSide(orderBook.asks, document.getElementById('sellOrdersList'));
+    renderBookSide(orderBook.bids, document.getElementById('buyOrdersList'));
+
     // Calcul et affichage du spread
-    const bestSell = Math.min(...mockData.sellOrders.map(o => o.price));
-    const bestBuy = Math.max(...mockData.buyOrders.map(o => o.price));
-    const spread = bestSell - bestBuy;
-    document.querySelector('.spread').textContent = `Spread: ${spread.toFixed(2)} ꜩ`;
+    const bestSell = orderBook.asks.prices[0];
+    const bestBuy = orderBook.bids.prices[0];
+    const spread = document.querySelector('.spread');
+    if (bestSell === undefined || bestBuy === undefined) {
+        spread.textContent = 'Spread: -';
+    } else {
+        spread.textContent = `Spread: ${((bestSell - bestBuy) / 1000000).toFixed(2)} ꜩ`;
+    }
+}
+
+function renderBookSide(side, list) {
+    const count = Math.min(side.prices.length, CONFIG.UI.maxOrderbookOrders);
+    const rows = side.rows;
+    if (rows.length === 0) list.innerHTML = '';
+
+    while (rows.length < count) {
+        const element = document.createElement('div');
+        element.className = 'order-item';
+        const cells = [0, 1, 2].map(() => element.appendChild(document.createElement('span')));
+        list.appendChild(element);
+        rows.push({ element, cells, price: null, quantity: null });
+    }
+    while (rows.length > count) {
+        rows.pop().element.remove();
+    }
+
+    for (let i = 0; i < count; i++) {
+        const row = rows[i];
+        const price = side.prices[i];
+        const quantity = side.quantities.get(price);
+        if (row.price === price && row.quantity === quantity) continue;
+        if (row.price !== price) row.cells[0].textContent = (price / 1000000).toFixed(2);
+        if (row.quantity !== quantity) row.cells[1].textContent = quantity;
+        row.cells[2].textContent = (price * quantity / 1000000).toFixed(2);
+        row.price = price;
+        row.quantity = quantity;
+    }
 }
 
 // Mise à jour de l'historique des trades
@@ -466,40 +681,88 @@ function updateWalletInfo() {
     document.getElementById('totalValue').textContent = `${totalValue.toFixed(2)} ꜩ`;
 }
 
-// Simulation de mise à jour du marché
-function updateMarketData() {
-    // Petites variations aléatoires du prix
-    const variation = (Math.random() - 0.5) * 0.02;
-    mockData.currentPrice = Math.max(0.01, mockData.currentPrice + variation);
-    
-    // Mise à jour du changement de prix
-    mockData.priceChange = mockData.currentPrice - 1.20; // Prix de référence
-    mockData.priceChangePercent = (mockData.priceChange / 1.20) * 100;
-    
-    // Mise à jour des prix min/max
-    mockData.highPrice = Math.max(mockData.highPrice, mockData.currentPrice);
-    mockData.lowPrice = Math.min(mockData.lowPrice, mockData.currentPrice);
-    
-    // Mise à jour de l'interface
-    updatePriceDisplay();
-    
-    // Mise à jour du graphique
-    if (priceChart) {
-        const now = new Date();
-        const timeLabel = now.toLocaleTimeString('fr-FR', { hour: '2-digit', minute: '2-digit' });
-        
-        // Ajouter le nouveau point
-        priceChart.data.labels.push(timeLabel);
-        priceChart.data.datasets[0].data.push(mockData.currentPrice.toFixed(2));
-        
-        // Garder seulement les 24 derniers points
-        if (priceChart.data.labels.length > 24) {
-            priceChart.data.labels.shift();
-            priceChart.data.datasets[0].data.shift();
+// Connexion au flux de marché: un instantané L2, puis des deltas numérotés
+function connectMarketFeed() {
+    feedSeq = null;
+    feedSource = new EventSource(`${FEED_URL}/stream`);
+    feedSource.addEventListener('snapshot', event => applySnapshot(JSON.parse(event.data)));
+    feedSource.addEventListener('delta', event => applyDelta(JSON.parse(event.data)));
+    // Après une coupure, EventSource se reconnecte seul et envoie Last-Event-ID:
+    // le serveur rejoue les deltas manqués ou renvoie un instantané
+}
+
+// Resynchronisation après un trou: une nouvelle connexion commence par un instantané
+function resyncMarketFeed() {
+    console.warn(`Flux de marché désynchronisé (seq ${feedSeq}), resynchronisation`);
+    feedSource.close();
+    connectMarketFeed();
+}
+
+function applySnapshot(snapshot) {
+    resetOrderbook(snapshot.bids, snapshot.asks);
+    feedSeq = snapshot.seq;
+    mockData.tradeHistory = [];
+    addTrades(snapshot.trades);
+    applyStats(snapshot.stats);
+    renderMarket(true);
+    loadChartHistory();
+}
+
+function applyDelta(delta) {
+    if (feedSeq === null || delta.seq <= feedSeq) return; // Déjà inclus
+    if (delta.seq !== feedSeq + 1) {
+        resyncMarketFeed();
+        return;
+    }
+    for (const side of ['bids', 'asks']) {
+        for (const [price, quantity] of delta[side]) {
+            setLevel(orderBook[side], price, quantity);
         }
-        
-        priceChart.update('none'); // Animation désactivée pour les mises à jour en temps réel
     }
+    feedSeq = delta.seq;
+    addTrades(delta.trades);
+    if (delta.stats) applyStats(delta.stats);
+    renderMarket(delta.trades.length > 0);
+}
+
+// Trades du flux (du plus ancien au plus récent), affichés du plus récent au plus ancien
+function addTrades(trades) {
+    trades.forEach(trade => {
+        mockData.tradeHistory.unshift({
+            time: new Date(trade.timestamp * 1000).toLocaleTimeString('fr-FR'),
+            type: trade.side,
+            price: trade.price / 1000000,
+            quantity: trade.quantity,
+            total: trade.price * trade.quantity / 1000000
+        });
+        addChartTrade(trade.timestamp, trade.price / 1000000);
+    });
+    mockData.tradeHistory.length = Math.min(mockData.tradeHistory.length, CONFIG.UI.maxTradeHistory);
+}
+
+function applyStats(stats) {
+    if (stats.last_price === null || stats.last_price === undefined) return;
+    mockData.currentPrice = stats.last_price / 1000000;
+    const open = (stats.open_24h ?? stats.last_price) / 1000000;
+    mockData.priceChange = mockData.currentPrice - open;
+    mockData.priceChangePercent = (mockData.priceChange / open) * 100;
+    mockData.highPrice = (stats.high_24h ?? stats.last_price) / 1000000;
+    mockData.lowPrice = (stats.low_24h ?? stats.last_price) / 1000000;
+    mockData.volume24h = stats.volume_24h;
+}
+
+function renderMarket(withTrades) {
+    updateOrderbook();
+    if (withTrades) {
+        updateTradeHistory();
+        updateMarketStats();
+        updateMarketData();
+    }
+}
+
+// Mise à jour du prix après de nouveaux trades (le graphique suit addChartTrade)
+function updateMarketData() {
+    updatePriceDisplay();
 }
 
 // Utilitaires